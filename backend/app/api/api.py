@@ -1,8 +1,9 @@
 from fastapi import APIRouter
-from app.api.endpoints import auth, moods, users, appointments
+from app.api.endpoints import auth, moods, users, appointments, sync
 
 api_router = APIRouter()
 api_router.include_router(auth.router, prefix="/auth", tags=["auth"])
 api_router.include_router(moods.router, prefix="/moods", tags=["moods"])
 api_router.include_router(users.router, prefix="/users", tags=["users"])
 api_router.include_router(appointments.router, prefix="/appointments", tags=["appointments"])
+api_router.include_router(sync.router, prefix="/sync", tags=["sync"])
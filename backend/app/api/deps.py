@@ -1,12 +1,33 @@
-from typing import Optional
+from typing import Optional, Tuple
+import hashlib
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from firebase_admin import auth as firebase_auth
-from app.core.firebase import auth
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.firebase import auth, get_app
+from app.core import metrics, timing
+from app.services.user_records import user_record_service
 import jwt
 
 security = HTTPBearer()
 
+# Verified principals keyed by a hash of the bearer token. Each entry expires
+# at the token's own exp claim, so a dashboard fan-out verifies a token once.
+token_cache = TTLCache(maxsize=settings.AUTH_TOKEN_CACHE_SIZE)
+
+def _token_key(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+def invalidate_token(token: str) -> None:
+    """Drop a cached principal (e.g. after logout or token revocation)"""
+    token_cache.pop(_token_key(token))
+
+def invalidate_user(user_id: str) -> int:
+    """Drop every cached principal of a user (e.g. after disabling the account)"""
+    return token_cache.pop_where(lambda _, user: user['id'] == user_id)
+
+@timing.timed(timing.AUTH)
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ) -> dict:
@@ -14,19 +35,40 @@ async def get_current_user(
     Verify Firebase ID token or custom token and return user info
     """
     token = credentials.credentials
-    
+    key = _token_key(token)
+
+    cached_user = token_cache.get(key)
+    if cached_user is not None:
+        metrics.auth_verifications.inc('cached')
+        return dict(cached_user)
+
+    try:
+        user, expires_at = await _verify_token(token)
+    except HTTPException:
+        metrics.auth_verifications.inc('rejected')
+        raise
+    if expires_at is not None:
+        token_cache.set(key, user, expires_at=expires_at)
+    return dict(user)
+
+async def _verify_token(token: str) -> Tuple[dict, Optional[float]]:
+    """
+    Verify the token against Firebase and return (user, exp claim)
+    """
+    get_app()
     try:
         # First, try to verify as ID token (standard Firebase token)
         try:
             decoded_token = firebase_auth.verify_id_token(token)
             user_id = decoded_token['uid']
             email = decoded_token.get('email')
+            metrics.auth_verifications.inc('id_token')
             
             return {
                 'id': user_id,
                 'email': email,
                 'is_active': True
-            }
+            }, decoded_token.get('exp')
         except Exception as id_token_error:
             # If ID token verification fails, try to decode as custom token
             # Custom tokens are JWTs signed by Firebase Admin SDK
@@ -43,13 +85,14 @@ async def get_current_user(
                 if user_id:
                     # Get user info from Firebase Admin SDK to verify user exists
                     try:
-                        user = firebase_auth.get_user(user_id)
+                        user = await user_record_service.get_user(user_id)
+                        metrics.auth_verifications.inc('custom_token')
                         
                         return {
                             'id': user.uid,
                             'email': user.email,
                             'is_active': not user.disabled
-                        }
+                        }, decoded.get('exp')
                     except firebase_auth.UserNotFoundError:
                          raise HTTPException(
                             status_code=status.HTTP_403_FORBIDDEN,
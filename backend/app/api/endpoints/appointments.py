@@ -1,20 +1,53 @@
-from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import datetime, timezone
+from typing import Any, List, Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from app import schemas
 from app.api import deps
-from app.services.firestore_service import firestore_service
+from app.core import etag
+from app.core.config import settings
+from app.core.timing import TimedRoute
+from app.services.storage import storage
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
+
+def _as_utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
 
 @router.get("/", response_model=List[schemas.Appointment])
 async def read_appointments(
-    current_user: dict = Depends(deps.get_current_user)
+    request: Request,
+    response: Response,
+    current_user: dict = Depends(deps.get_current_user),
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    limit: Optional[int] = Query(None, ge=1, le=settings.MAX_PAGE_SIZE),
+    order: Literal['asc', 'desc'] = 'desc'
 ) -> Any:
     """
-    Get all appointments for current user
+    Get appointments for current user (conditional: honours If-None-Match).
+
+    `from` (inclusive) and `to` (exclusive) bound the appointment date and
+    `limit` caps the count, all applied by the database; naive times are UTC.
+    Latest first by default. The upcoming-appointments widget asks for
+    `?from=<now>&order=asc&limit=3`.
     """
-    appointments = await firestore_service.get_appointments(current_user['id'])
-    return appointments
+    if start and end and _as_utc(start) >= _as_utc(end):
+        raise HTTPException(status_code=400, detail="from must be before to")
+    ascending = order == 'asc'
+    # A range usually starts at "now" and so differs on every call: only the
+    # full list has its ETag memoized (and invalidated by writes)
+    filtered = start is not None or end is not None or limit is not None or ascending
+    return await etag.conditional_get(
+        request, response, current_user['id'], 'appointments',
+        lambda: storage.get_appointments(
+            current_user['id'],
+            start=_as_utc(start) if start else None,
+            end=_as_utc(end) if end else None,
+            limit=limit,
+            ascending=ascending
+        ),
+        memoize=not filtered
+    )
 
 @router.post("/", response_model=schemas.Appointment)
 async def create_appointment(
@@ -26,13 +59,9 @@ async def create_appointment(
     Create a new appointment
     """
     appointment_data = appointment_in.model_dump()
-    appointment_id = await firestore_service.create_appointment(
+    appointment = await storage.create_appointment(
         current_user['id'],
         appointment_data
     )
-    # Return the created appointment
-    appointments = await firestore_service.get_appointments(current_user['id'])
-    created_appointment = next((a for a in appointments if a['id'] == appointment_id), None)
-    if created_appointment:
-        return created_appointment
-    raise HTTPException(status_code=500, detail="Failed to create appointment")
+    etag.invalidate(current_user['id'], 'appointments')
+    return appointment
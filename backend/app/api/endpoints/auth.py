@@ -3,9 +3,12 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from firebase_admin import auth as firebase_auth
 from app import schemas
-from app.services.firestore_service import firestore_service
+from app.core.firebase import get_app
+from app.core.timing import TimedRoute
+from app.services.storage import storage
+from app.services.user_records import user_record_service
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 @router.post("/signup", response_model=schemas.User)
 async def create_user_signup(
@@ -17,14 +20,18 @@ async def create_user_signup(
     """
     try:
         # Create user in Firebase Auth
+        get_app()
         user_record = firebase_auth.create_user(
             email=user_in.email,
             password=user_in.password,
             email_verified=False
         )
+        # Clear any cached "not found" from earlier login attempts
+        user_record_service.invalidate(email=user_in.email)
+        user_record_service.remember(user_record)
         
         # Create default settings in Firestore
-        await firestore_service.update_user_settings(
+        await storage.update_user_settings(
             user_record.uid,
             {'theme': 'system', 'language': 'he'}
         )
@@ -61,12 +68,12 @@ async def login_access_token(
     """
     try:
         # Get user by email (form_data.username contains the email in OAuth2PasswordRequestForm)
-        user = firebase_auth.get_user_by_email(form_data.username)
+        user = await user_record_service.get_user_by_email(form_data.username)
         
         # Create custom token
         # Note: Password verification should be done client-side with Firebase SDK
         # This endpoint assumes the client has already verified the password
-        custom_token = firebase_auth.create_custom_token(user.uid)
+        custom_token = firebase_auth.create_custom_token(user.uid, app=get_app())
         
         return {
             "access_token": custom_token,
@@ -1,27 +1,119 @@
-from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, List, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from fastapi import APIRouter, BackgroundTasks, Depends, File, HTTPException, Query, Response, UploadFile
 from app import schemas
 from app.api import deps
-from app.services.firestore_service import firestore_service
+from app.core.config import settings
+from app.core.pagination import NEXT_CURSOR_HEADER, encode_cursor
+from app.core.timing import TimedRoute
+from app.services import mood_import, mood_stats
+from app.services.storage import storage
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 @router.get("/", response_model=List[schemas.Mood])
 async def read_moods(
+    response: Response,
     current_user: dict = Depends(deps.get_current_user),
     skip: int = 0,
-    limit: int = 100
+    limit: int = 100,
+    cursor: Optional[str] = None
 ) -> Any:
     """
-    Retrieve mood entries for current user.
+    Retrieve mood entries for current user, newest first.
+
+    Pages are cursor based: pass the X-Next-Cursor header of a response as
+    `cursor` to get the next page. `skip` is still accepted for older clients,
+    but Firestore bills every skipped document, so prefer `cursor`.
     """
-    entries = await firestore_service.get_mood_entries(
-        user_id=current_user['id'],
-        skip=skip,
-        limit=limit
-    )
+    limit = max(1, min(limit, settings.MAX_PAGE_SIZE))
+    if skip and not cursor:
+        entries = await storage.get_mood_entries(
+            user_id=current_user['id'],
+            skip=skip,
+            limit=limit
+        )
+        next_cursor = (
+            encode_cursor(entries[-1]['created_at'], entries[-1]['id'])
+            if len(entries) == limit else None
+        )
+    else:
+        try:
+            entries, next_cursor = await storage.get_mood_entries_page(
+                user_id=current_user['id'],
+                limit=limit,
+                cursor=cursor
+            )
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     return entries
 
+@router.get("/stats", response_model=schemas.MoodStats)
+async def read_mood_stats(
+    current_user: dict = Depends(deps.get_current_user),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    tz: Optional[str] = None,
+    window: int = Query(7, ge=1, le=90)
+) -> Any:
+    """
+    Mood, energy and stress statistics per day, week and month.
+
+    Entries are bucketed in `tz` (IANA name), falling back to the user's
+    `timezone` setting and then UTC. The range defaults to the last 90 days;
+    `window` is the length in days of the rolling average.
+    """
+    if tz is None:
+        user_settings = await storage.get_user_settings(current_user['id'])
+        tz = user_settings.get('timezone') or 'UTC'
+    try:
+        zone = ZoneInfo(tz)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise HTTPException(status_code=400, detail=f"Unknown timezone: {tz}")
+
+    end = _as_utc(end) if end else datetime.now(timezone.utc)
+    start = _as_utc(start) if start else end - timedelta(days=90)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+
+    timestamps, values = await mood_stats.load_columns(
+        storage.stream_mood_metrics(current_user['id'], start, end)
+    )
+    return {
+        'start': start,
+        'end': end,
+        **mood_stats.compute_mood_stats(timestamps, values, zone, window),
+    }
+
+@router.get("/daily", response_model=List[schemas.MoodDailyRollup])
+async def read_mood_daily(
+    current_user: dict = Depends(deps.get_current_user),
+    start: Optional[date] = None,
+    end: Optional[date] = None
+) -> Any:
+    """
+    Per-day (UTC) count and mean/min/max/std of each metric, for charts.
+
+    Served from daily rollup documents, so the cost follows the number of
+    days in the range rather than the number of entries. Defaults to the
+    last 180 days.
+    """
+    end = end or datetime.now(timezone.utc).date()
+    start = start or end - timedelta(days=179)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    return await storage.get_mood_daily_rollups(
+        current_user['id'],
+        start.isoformat(),
+        end.isoformat()
+    )
+
+def _as_utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
 @router.post("/", response_model=schemas.Mood)
 async def create_mood(
     *,
@@ -32,28 +124,74 @@ async def create_mood(
     Create new mood entry.
     """
     mood_data = mood_in.model_dump()
-    mood_id = await firestore_service.create_mood_entry(
+    return await storage.create_mood_entry(
         user_id=current_user['id'],
         data=mood_data
     )
-    # Return the created entry
-    entries = await firestore_service.get_mood_entries(
-        user_id=current_user['id'],
-        skip=0,
-        limit=1
-    )
-    if entries:
-        return entries[0]
-    raise HTTPException(status_code=500, detail="Failed to create mood entry")
+
+@router.post("/import", response_model=schemas.MoodImportReport)
+async def import_moods(
+    file: UploadFile = File(...),
+    format: Optional[str] = None,
+    current_user: dict = Depends(deps.get_current_user)
+) -> Any:
+    """
+    Bulk import mood history from a CSV or NDJSON file.
+
+    Each row needs mood_level, energy_level and stress_level and may have
+    note, custom_metrics and an ISO 8601 created_at, which is preserved.
+    The format is taken from `format` or guessed from the file name.
+    """
+    fmt = format or mood_import.detect_format(file.filename, file.content_type)
+    if fmt not in mood_import.SUPPORTED_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported import format, expected one of: {', '.join(mood_import.SUPPORTED_FORMATS)}"
+        )
+    try:
+        return await mood_import.import_mood_file(current_user['id'], file.file, fmt)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.delete("/", response_model=dict)
 async def delete_all_moods(
+    background_tasks: BackgroundTasks,
     current_user: dict = Depends(deps.get_current_user)
 ) -> Any:
     """
     Delete all mood entries for current user. (Used by 'Clean History' button)
+
+    The history is cleared logically right away; the old documents are
+    purged in the background (see GET /moods/cleanup-status).
     """
-    count = await firestore_service.delete_all_mood_entries(
+    generation = await storage.clear_mood_history(
         user_id=current_user['id']
     )
-    return {"msg": f"Deleted {count} mood entries"}
+    background_tasks.add_task(
+        storage.purge_superseded_mood_entries,
+        current_user['id']
+    )
+    return {"msg": "Mood history cleared", "generation": generation}
+
+@router.delete("/{entry_id}", response_model=dict)
+async def delete_mood(
+    entry_id: str,
+    current_user: dict = Depends(deps.get_current_user)
+) -> Any:
+    """
+    Delete a single mood entry
+    """
+    deleted = await storage.delete_mood_entry(current_user['id'], entry_id)
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Mood entry not found")
+    return {"msg": "Mood entry deleted"}
+
+@router.get("/cleanup-status", response_model=dict)
+async def read_cleanup_status(
+    current_user: dict = Depends(deps.get_current_user)
+) -> Any:
+    """
+    Progress of purging the entries removed by the last 'Clean History'
+    """
+    status = await storage.get_mood_history_gc_status(current_user['id'])
+    return status or {"status": "none"}
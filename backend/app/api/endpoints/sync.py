@@ -0,0 +1,30 @@
+from typing import Any, Optional
+from fastapi import APIRouter, Depends, HTTPException
+from app import schemas
+from app.api import deps
+from app.core.pagination import encode_sync_token, decode_sync_token
+from app.core.timing import TimedRoute
+from app.services.storage import storage
+
+router = APIRouter(route_class=TimedRoute)
+
+@router.get("/changes", response_model=schemas.SyncChanges)
+async def read_changes(
+    current_user: dict = Depends(deps.get_current_user),
+    since: Optional[str] = None
+) -> Any:
+    """
+    Documents created, updated or deleted since the last sync.
+
+    Pass the `next_token` of the previous response as `since`; without it
+    (or when it is too old) the response is a full snapshot with `full` set.
+    Deleted documents are listed in `deleted`, and collections in `reset`
+    must be replaced instead of merged.
+    """
+    try:
+        since_at = decode_sync_token(since) if since else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid sync token")
+    changes = await storage.get_changes(current_user['id'], since_at)
+    changes['next_token'] = encode_sync_token(changes.pop('synced_at'))
+    return changes
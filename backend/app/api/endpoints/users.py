@@ -1,23 +1,82 @@
-from typing import Any, List, Dict
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+from typing import Any, List, Dict, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from app import schemas
 from app.api import deps
-from app.services.firestore_service import firestore_service
+from app.core import etag
+from app.core.config import settings
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.core.timing import TimedRoute
+from app.services.storage import storage
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
+
+def _empty_therapist_info(user_id: str) -> Dict[str, Any]:
+    return {
+        'user_id': user_id,
+        'name': None,
+        'email': None,
+        'phone': None,
+        'updated_at': None
+    }
+
+# --- Bootstrap ---
+
+@router.get("/me/bootstrap", response_model=schemas.Bootstrap)
+async def read_bootstrap(
+    current_user: dict = Depends(deps.get_current_user),
+    mood_limit: int = Query(50, ge=1, le=500)
+) -> Any:
+    """
+    Everything the app needs on launch in one call: settings, therapist
+    info, contacts, tasks, appointments and the latest mood entries.
+
+    The reads run concurrently. A section that fails is returned as null
+    and reported in `errors` instead of failing the whole response.
+    """
+    user_id = current_user['id']
+    sections = {
+        'documents': storage.get_user_documents(user_id),
+        'emergency_contacts': storage.get_emergency_contacts(user_id),
+        'therapist_tasks': storage.get_therapist_tasks(user_id),
+        'appointments': storage.get_appointments(user_id),
+        'mood_entries': storage.get_mood_entries_page(user_id, limit=mood_limit),
+    }
+    results = dict(zip(sections, await asyncio.gather(*sections.values(), return_exceptions=True)))
+
+    payload: Dict[str, Any] = {'errors': []}
+    for section, result in results.items():
+        if isinstance(result, Exception):
+            print(f"Error loading bootstrap section {section}: {result!r}")
+            failed = ['settings', 'therapist_info'] if section == 'documents' else [section]
+            payload['errors'].extend({'section': name, 'error': type(result).__name__} for name in failed)
+        elif section == 'documents':
+            payload['settings'] = {**result['user_settings'], 'email': current_user['email']}
+            payload['therapist_info'] = result['therapist_info'] or _empty_therapist_info(user_id)
+        elif section == 'mood_entries':
+            payload['mood_entries'], payload['next_mood_cursor'] = result
+        else:
+            payload[section] = result
+    if all(isinstance(result, Exception) for result in results.values()):
+        raise HTTPException(status_code=503, detail="Could not load any user data")
+    return payload
 
 # --- Settings ---
 
 @router.get("/me/settings", response_model=Dict[str, Any])
 async def read_user_settings(
+    request: Request,
+    response: Response,
     current_user: dict = Depends(deps.get_current_user)
 ) -> Any:
     """
-    Get user settings
+    Get user settings (conditional: honours If-None-Match)
     """
-    settings = await firestore_service.get_user_settings(current_user['id'])
-    settings['email'] = current_user['email']
-    return settings
+    async def load():
+        settings = await storage.get_user_settings(current_user['id'])
+        settings['email'] = current_user['email']
+        return settings
+    return await etag.conditional_get(request, response, current_user['id'], 'settings', load)
 
 @router.put("/me/settings", response_model=Dict[str, Any])
 async def update_user_settings(
@@ -29,23 +88,31 @@ async def update_user_settings(
     Update user settings
     """
     settings_data = settings_in.model_dump(exclude_unset=True)
-    updated_settings = await firestore_service.update_user_settings(
+    updated_settings = await storage.update_user_settings(
         current_user['id'],
         settings_data
     )
+    etag.invalidate(current_user['id'], 'settings')
     return updated_settings
 
 # --- Emergency Contacts ---
 
 @router.get("/me/contacts", response_model=List[schemas.EmergencyContact])
 async def read_contacts(
-    current_user: dict = Depends(deps.get_current_user)
+    request: Request,
+    response: Response,
+    current_user: dict = Depends(deps.get_current_user),
+    limit: Optional[int] = Query(None, ge=1, le=settings.MAX_PAGE_SIZE)
 ) -> Any:
     """
-    Get all emergency contacts for current user
+    Get emergency contacts for current user, newest first, the latest `limit` of them
+    if given (conditional: honours If-None-Match)
     """
-    contacts = await firestore_service.get_emergency_contacts(current_user['id'])
-    return contacts
+    return await etag.conditional_get(
+        request, response, current_user['id'], 'contacts',
+        lambda: storage.get_emergency_contacts(current_user['id'], limit=limit),
+        memoize=limit is None
+    )
 
 @router.post("/me/contacts", response_model=schemas.EmergencyContact)
 async def create_contact(
@@ -57,16 +124,12 @@ async def create_contact(
     Create a new emergency contact
     """
     contact_data = contact_in.model_dump()
-    contact_id = await firestore_service.create_emergency_contact(
+    contact = await storage.create_emergency_contact(
         current_user['id'],
         contact_data
     )
-    # Return the created contact
-    contacts = await firestore_service.get_emergency_contacts(current_user['id'])
-    created_contact = next((c for c in contacts if c['id'] == contact_id), None)
-    if created_contact:
-        return created_contact
-    raise HTTPException(status_code=500, detail="Failed to create contact")
+    etag.invalidate(current_user['id'], 'contacts')
+    return contact
 
 @router.delete("/me/contacts/{contact_id}", response_model=dict)
 async def delete_contact(
@@ -76,35 +139,28 @@ async def delete_contact(
     """
     Delete an emergency contact
     """
-    # Verify the contact belongs to the user
-    contacts = await firestore_service.get_emergency_contacts(current_user['id'])
-    contact = next((c for c in contacts if c['id'] == contact_id), None)
-    if not contact:
+    deleted = await storage.delete_emergency_contact(current_user['id'], contact_id)
+    if not deleted:
         raise HTTPException(status_code=404, detail="Contact not found")
-    
-    await firestore_service.delete_emergency_contact(contact_id)
+    etag.invalidate(current_user['id'], 'contacts')
     return {"msg": "Contact deleted"}
 
 # --- Therapist Info ---
 
 @router.get("/me/therapist/info", response_model=schemas.TherapistInfo)
 async def read_therapist_info(
+    request: Request,
+    response: Response,
     current_user: dict = Depends(deps.get_current_user)
 ) -> Any:
     """
-    Get therapist info for current user
+    Get therapist info for current user (conditional: honours If-None-Match)
     """
-    info = await firestore_service.get_therapist_info(current_user['id'])
-    if not info:
+    async def load():
+        info = await storage.get_therapist_info(current_user['id'])
         # Return empty/default if not set
-        return {
-            'user_id': current_user['id'],
-            'name': None,
-            'email': None,
-            'phone': None,
-            'updated_at': None
-        }
-    return info
+        return info or _empty_therapist_info(current_user['id'])
+    return await etag.conditional_get(request, response, current_user['id'], 'therapist_info', load)
 
 @router.put("/me/therapist/info", response_model=schemas.TherapistInfo)
 async def update_therapist_info(
@@ -116,23 +172,69 @@ async def update_therapist_info(
     Update therapist info
     """
     info_data = info_in.model_dump(exclude_unset=True)
-    updated_info = await firestore_service.update_therapist_info(
+    updated_info = await storage.update_therapist_info(
         current_user['id'],
         info_data
     )
+    etag.invalidate(current_user['id'], 'therapist_info')
     return updated_info
 
 # --- Therapist Tasks ---
 
 @router.get("/me/therapist/tasks", response_model=List[schemas.TherapistTask])
 async def read_therapist_tasks(
+    request: Request,
+    response: Response,
+    current_user: dict = Depends(deps.get_current_user),
+    is_completed: Optional[bool] = None,
+    limit: Optional[int] = Query(None, ge=1, le=settings.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None
+) -> Any:
+    """
+    Get therapist tasks for current user, newest first (conditional: honours
+    If-None-Match).
+
+    With `is_completed`, `limit` (default 100) or `cursor` one page is
+    returned: only open or only completed tasks if `is_completed` is given,
+    and the X-Next-Cursor header of a response is the `cursor` of the next
+    page. Without any of them, every task (older clients).
+    """
+    if is_completed is None and limit is None and cursor is None:
+        return await etag.conditional_get(
+            request, response, current_user['id'], 'tasks',
+            lambda: storage.get_therapist_tasks(current_user['id'])
+        )
+
+    async def load_page() -> List[Dict[str, Any]]:
+        try:
+            tasks, next_cursor = await storage.get_therapist_tasks_page(
+                current_user['id'],
+                limit=limit or 100,
+                cursor=cursor,
+                is_completed=is_completed
+            )
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
+        return tasks
+
+    return await etag.conditional_get(request, response, current_user['id'], 'tasks', load_page, memoize=False)
+
+@router.get("/me/therapist/tasks/counts", response_model=schemas.TherapistTaskCounts)
+async def read_therapist_task_counts(
+    request: Request,
+    response: Response,
     current_user: dict = Depends(deps.get_current_user)
 ) -> Any:
     """
-    Get all therapist tasks for current user
+    Number of open and completed therapist tasks for current user, counted
+    without reading the tasks (conditional: honours If-None-Match)
     """
-    tasks = await firestore_service.get_therapist_tasks(current_user['id'])
-    return tasks
+    async def load() -> Dict[str, int]:
+        counts = await storage.count_therapist_tasks(current_user['id'])
+        return {**counts, 'total': counts['open'] + counts['completed']}
+    return await etag.conditional_get(request, response, current_user['id'], 'task_counts', load)
 
 @router.post("/me/therapist/tasks", response_model=schemas.TherapistTask)
 async def create_therapist_task(
@@ -144,16 +246,12 @@ async def create_therapist_task(
     Create a new therapist task
     """
     task_data = task_in.model_dump()
-    task_id = await firestore_service.create_therapist_task(
+    task = await storage.create_therapist_task(
         current_user['id'],
         task_data
     )
-    # Return the created task
-    tasks = await firestore_service.get_therapist_tasks(current_user['id'])
-    created_task = next((t for t in tasks if t['id'] == task_id), None)
-    if created_task:
-        return created_task
-    raise HTTPException(status_code=500, detail="Failed to create task")
+    etag.invalidate(current_user['id'], 'tasks', 'task_counts')
+    return task
 
 @router.put("/me/therapist/tasks/{task_id}", response_model=schemas.TherapistTask)
 async def update_therapist_task(
@@ -165,18 +263,13 @@ async def update_therapist_task(
     """
     Update a therapist task
     """
-    # Verify the task belongs to the user
-    tasks = await firestore_service.get_therapist_tasks(current_user['id'])
-    task = next((t for t in tasks if t['id'] == task_id), None)
-    if not task:
-        raise HTTPException(status_code=404, detail="Task not found")
-    
     task_data = task_in.model_dump(exclude_unset=True)
-    await firestore_service.update_therapist_task(task_id, task_data)
-    
-    # Return the updated task
-    updated_tasks = await firestore_service.get_therapist_tasks(current_user['id'])
-    updated_task = next((t for t in updated_tasks if t['id'] == task_id), None)
-    if updated_task:
-        return updated_task
-    raise HTTPException(status_code=500, detail="Failed to update task")
+    updated_task = await storage.update_therapist_task(
+        current_user['id'],
+        task_id,
+        task_data
+    )
+    if not updated_task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    etag.invalidate(current_user['id'], 'tasks', 'task_counts')
+    return updated_task
@@ -0,0 +1,76 @@
+from typing import Optional
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.middleware.gzip import DEFAULT_EXCLUDED_CONTENT_TYPES, GZipResponder, IdentityResponder
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+def accepts_encoding(accept_encoding: str, coding: str) -> bool:
+    """Whether an Accept-Encoding header allows `coding` (q=0 means refused)"""
+    for part in accept_encoding.split(','):
+        name, _, params = part.strip().partition(';')
+        if name.strip().lower() != coding:
+            continue
+        q = params.strip()
+        if q.startswith('q='):
+            try:
+                return float(q[2:]) > 0
+            except ValueError:
+                return False
+        return True
+    return False
+
+class BrotliResponder(IdentityResponder):
+    content_encoding = 'br'
+
+    def __init__(self, app: ASGIApp, minimum_size: int, quality: int = 4, **kwargs) -> None:
+        super().__init__(app, minimum_size, **kwargs)
+        self.quality = quality
+        self._compressor: Optional['brotli.Compressor'] = None
+
+    async def apply_compression(self, body: bytes, *, more_body: bool) -> bytes:
+        if self._compressor is None:
+            self._compressor = brotli.Compressor(quality=self.quality)
+        compressed = self._compressor.process(body)
+        return compressed + (self._compressor.flush() if more_body else self._compressor.finish())
+
+class CompressionMiddleware:
+    """
+    Compress responses of at least minimum_size bytes with brotli or gzip,
+    whichever the client accepts (brotli first, when the package is
+    installed). A strong ETag on a compressed body is sent as weak, since
+    it was computed from the uncompressed representation.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, gzip_level: int = 6,
+                 brotli_quality: int = 4) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = Headers(scope=scope).get('accept-encoding', '')
+        options = {'exclude_content_types': DEFAULT_EXCLUDED_CONTENT_TYPES}
+        if brotli is not None and accepts_encoding(accept_encoding, 'br'):
+            responder = BrotliResponder(self.app, self.minimum_size, self.brotli_quality, **options)
+        elif accepts_encoding(accept_encoding, 'gzip'):
+            responder = GZipResponder(self.app, self.minimum_size, self.gzip_level, **options)
+        else:
+            responder = IdentityResponder(self.app, self.minimum_size, **options)
+
+        async def send_weak_etag(message: Message) -> None:
+            if message['type'] == 'http.response.start':
+                headers = MutableHeaders(raw=message['headers'])
+                etag = headers.get('etag')
+                if 'content-encoding' in headers and etag and etag.startswith('"'):
+                    headers['etag'] = f'W/{etag}'
+            await send(message)
+
+        await responder(scope, receive, send_weak_etag)
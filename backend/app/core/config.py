@@ -9,17 +9,82 @@ class Settings(BaseSettings):
     
     # Database (temporary - will use Firebase Firestore later)
     DATABASE_URL: Optional[str] = "sqlite:///./temp.db"
+
+    # Storage backend for app data: "firestore" or "sql" (DATABASE_URL)
+    STORAGE_BACKEND: str = "firestore"
+    # Create missing tables on first use of the SQL backend
+    SQL_CREATE_TABLES: bool = True
+    # Connection pool of the SQL backend (Postgres)
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_RECYCLE: int = 1800
+    # Check at startup which composite indexes of firestore.indexes.json
+    # exist; queries whose index is missing sort in Python instead
+    FIRESTORE_INDEX_PROBE: bool = True
+    # Where per-user Firestore collections live: "global" (top-level, filtered
+    # by user_id) or "user" (users/{uid}/{collection}). Dual writes also
+    # write the other layout, while scripts.migrate_to_user_layout runs and
+    # until the switch is final.
+    FIRESTORE_LAYOUT: str = "global"
+    FIRESTORE_DUAL_WRITE: bool = False
     
     # Firebase Configuration (will be configured later)
     FIREBASE_SERVICE_ACCOUNT_PATH: Optional[str] = None
     FIREBASE_SERVICE_ACCOUNT_JSON: Optional[str] = None
     FIREBASE_PROJECT_ID: Optional[str] = None
+    # On Cloud Run the service account is read from this Secret Manager
+    # secret at startup (app.core.secrets), cached in instance-local tmpfs
+    # and re-checked for a new version once the copy is older than the TTL
+    FIREBASE_SECRET_ID: str = "firebase-service-account"
+    SECRET_CACHE_DIR: str = "/tmp/secrets"
+    SECRET_CACHE_TTL: int = 300
+    SECRET_FETCH_TIMEOUT: float = 1.0
     
     # Security (temporary - will use Firebase Auth later)
     SECRET_KEY: str = "YOUR_SUPER_SECRET_KEY_CHANGE_ME"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8  # 8 days
 
+    # Upper bound for the page size of list endpoints
+    MAX_PAGE_SIZE: int = 500
+
+    # Max verified tokens kept in the in-process auth cache
+    AUTH_TOKEN_CACHE_SIZE: int = 10000
+
+    # Firebase Auth user-record cache (seconds) and lookup thread pool
+    USER_RECORD_CACHE_SIZE: int = 10000
+    USER_RECORD_CACHE_TTL: int = 60
+    USER_RECORD_NEGATIVE_TTL: int = 10
+    AUTH_LOOKUP_WORKERS: int = 8
+
+    # In-process memo of the last ETag sent per user resource (seconds).
+    # Writes through this instance drop it at once; writes through another
+    # instance are picked up after at most the TTL.
+    ETAG_CACHE_SIZE: int = 50000
+    ETAG_CACHE_TTL: int = 30
+
+    # Write-through cache of per-user settings / therapist info (seconds).
+    # Bounds how long a write through another instance can go unseen.
+    DOCUMENT_CACHE_SIZE: int = 20000
+    DOCUMENT_CACHE_TTL: int = 60
+
+    # Responses: orjson as the default response class (opt-in, see
+    # app.core.responses) and brotli/gzip for bodies of at least this size
+    ORJSON_RESPONSES: bool = False
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    GZIP_LEVEL: int = 6
+    BROTLI_QUALITY: int = 4
+
+    # Per-request phase timings (app.core.timing): Server-Timing header and
+    # one log line per request; slower requests log every span
+    LOG_LEVEL: str = "INFO"
+    SERVER_TIMING_HEADER: bool = True
+    SLOW_REQUEST_MS: float = 500.0
+
+    # Prometheus text metrics at GET /metrics (app.core.metrics)
+    METRICS_ENABLED: bool = True
+
     class Config:
         # Find .env file in backend directory
         # This file is in backend/app/core/, so go up 2 levels to find backend/.env
@@ -29,20 +94,3 @@ class Settings(BaseSettings):
         case_sensitive = True
 
 settings = Settings()
-
-# If running on Google Cloud Run, try to load from Secret Manager
-if os.getenv("K_SERVICE"):  # Cloud Run sets this environment variable
-    try:
-        from google.cloud import secretmanager
-        client = secretmanager.SecretManagerServiceClient()
-        project_id = os.getenv("GOOGLE_CLOUD_PROJECT")
-        if project_id:
-            secret_name = f"projects/{project_id}/secrets/firebase-service-account/versions/latest"
-            response = client.access_secret_version(request={"name": secret_name})
-            settings.FIREBASE_SERVICE_ACCOUNT_JSON = response.payload.data.decode("UTF-8")
-            print("Loaded Firebase credentials from Secret Manager")
-    except ImportError:
-        print("google-cloud-secret-manager not installed, skipping Secret Manager")
-    except Exception as e:
-        print(f"Could not load secret from Secret Manager: {e}")
-        print("Falling back to environment variables")
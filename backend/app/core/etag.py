@@ -0,0 +1,67 @@
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, Optional
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+# ETag last sent for each (user_id, resource), so a conditional GET that
+# still matches is answered with 304 without reading Firestore
+etag_cache = TTLCache(maxsize=settings.ETAG_CACHE_SIZE, ttl=settings.ETAG_CACHE_TTL)
+
+def compute_etag(body: Any) -> str:
+    """Strong ETag: hash of the canonical JSON of a response body"""
+    raw = json.dumps(jsonable_encoder(body), sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return '"' + hashlib.sha256(raw.encode()).hexdigest()[:32] + '"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match uses weak comparison: W/ prefixes are ignored"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    return any(
+        candidate.strip().removeprefix('W/') == etag
+        for candidate in if_none_match.split(',')
+    )
+
+def invalidate(user_id: str, *resources: str) -> None:
+    """Forget the ETags of resources a write just changed"""
+    for resource in resources:
+        etag_cache.pop((user_id, resource))
+
+def _not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={'ETag': etag, 'Cache-Control': 'private, no-cache'})
+
+async def conditional_get(
+    request: Request,
+    response: Response,
+    user_id: str,
+    resource: str,
+    load: Callable[[], Awaitable[Any]],
+    memoize: bool = True
+) -> Any:
+    """
+    Serve a user resource with an ETag, answering If-None-Match with 304.
+
+    A match against the memoized ETag skips load() entirely; otherwise the
+    body is loaded, hashed and the ETag remembered for the next request.
+    With memoize=False (filtered views of a resource, which invalidate()
+    cannot track) the body is always loaded and only the response saved.
+    """
+    if_none_match = request.headers.get('if-none-match')
+    key = (user_id, resource)
+    if memoize:
+        cached = etag_cache.get(key)
+        if cached and etag_matches(if_none_match, cached):
+            return _not_modified(cached)
+    body = await load()
+    etag = compute_etag(body)
+    if memoize:
+        etag_cache.set(key, etag)
+    if etag_matches(if_none_match, etag):
+        return _not_modified(etag)
+    response.headers['ETag'] = etag
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return body
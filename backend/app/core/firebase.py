@@ -1,51 +1,69 @@
+import json
+import os
+import sys
+import threading
+from typing import TYPE_CHECKING, Optional
+
 import firebase_admin
-from firebase_admin import credentials, auth, firestore
+from firebase_admin import credentials, auth
 from app.core.config import settings
-import os
 
-# Initialize Firebase Admin SDK
-if not firebase_admin._apps:
-    # Option 1: Use service account JSON file
-    if settings.FIREBASE_SERVICE_ACCOUNT_PATH:
-        # Get absolute path relative to backend directory
-        service_account_path = settings.FIREBASE_SERVICE_ACCOUNT_PATH
-        if not os.path.isabs(service_account_path):
-            # Relative path - resolve from backend directory (where .env file is)
-            # Get the backend directory by going up from this file's location
-            # This file is in backend/app/core/, so we need to go up 2 levels to get to backend/
-            current_file_dir = os.path.dirname(os.path.abspath(__file__))
-            # backend/app/core -> backend/app -> backend
-            backend_dir = os.path.dirname(os.path.dirname(current_file_dir))
-            # The service account file is in the backend directory
-            # Remove ./ prefix if present and join with backend_dir
-            file_name = service_account_path.lstrip('./')
-            service_account_path = os.path.join(backend_dir, file_name)
-        
-        # Debug: verify path before checking
-        import sys
-        if not os.path.exists(service_account_path):
-            print(f"ERROR: Firebase service account file not found!", file=sys.stderr)
-            print(f"Looking for: {service_account_path}", file=sys.stderr)
-            print(f"Current working directory: {os.getcwd()}", file=sys.stderr)
-            print(f"Backend directory: {backend_dir}", file=sys.stderr)
-            print(f"Current file dir: {os.path.dirname(os.path.abspath(__file__))}", file=sys.stderr)
-            raise FileNotFoundError(f"Firebase service account file not found: {service_account_path}")
-        
-        # File exists, initialize Firebase
-        cred = credentials.Certificate(service_account_path)
-        firebase_admin.initialize_app(cred)
-    # Option 2: Use environment variable with JSON content
-    elif settings.FIREBASE_SERVICE_ACCOUNT_JSON:
-        import json
-        cred = credentials.Certificate(json.loads(settings.FIREBASE_SERVICE_ACCOUNT_JSON))
-        firebase_admin.initialize_app(cred)
-    # Option 3: Use default credentials (for production/GCP)
-    else:
-        firebase_admin.initialize_app()
-
-# Get Firestore client
-db = firestore.client()
+if TYPE_CHECKING:
+    from google.cloud.firestore import AsyncClient
 
-# Export Firebase services
-__all__ = ['auth', 'db']
+# Nothing here runs at import: the Admin SDK is initialized and the Firestore
+# client built on first use, or up front by the app's lifespan
+# (app.core.startup), which keeps both off the import path of a cold start.
+_lock = threading.Lock()
+_db: Optional["AsyncClient"] = None
+
+def _service_account_path() -> str:
+    """FIREBASE_SERVICE_ACCOUNT_PATH, resolved from the backend directory when relative"""
+    service_account_path = settings.FIREBASE_SERVICE_ACCOUNT_PATH
+    # This file is in backend/app/core/, so go up 2 levels to get to backend/
+    current_file_dir = os.path.dirname(os.path.abspath(__file__))
+    backend_dir = os.path.dirname(os.path.dirname(current_file_dir))
+    if not os.path.isabs(service_account_path):
+        # Remove ./ prefix if present and join with backend_dir
+        file_name = service_account_path.lstrip('./')
+        service_account_path = os.path.join(backend_dir, file_name)
+    if not os.path.exists(service_account_path):
+        print(f"ERROR: Firebase service account file not found!", file=sys.stderr)
+        print(f"Looking for: {service_account_path}", file=sys.stderr)
+        print(f"Current working directory: {os.getcwd()}", file=sys.stderr)
+        print(f"Backend directory: {backend_dir}", file=sys.stderr)
+        raise FileNotFoundError(f"Firebase service account file not found: {service_account_path}")
+    return service_account_path
 
+def get_app() -> firebase_admin.App:
+    """The default Firebase app, initialized on first call (thread-safe)"""
+    if firebase_admin._apps:
+        return firebase_admin.get_app()
+    with _lock:
+        if not firebase_admin._apps:
+            # Option 1: Use service account JSON file
+            if settings.FIREBASE_SERVICE_ACCOUNT_PATH:
+                firebase_admin.initialize_app(credentials.Certificate(_service_account_path()))
+            # Option 2: Use environment variable with JSON content
+            elif settings.FIREBASE_SERVICE_ACCOUNT_JSON:
+                cred = credentials.Certificate(json.loads(settings.FIREBASE_SERVICE_ACCOUNT_JSON))
+                firebase_admin.initialize_app(cred)
+            # Option 3: Use default credentials (for production/GCP)
+            else:
+                firebase_admin.initialize_app()
+    return firebase_admin.get_app()
+
+def get_firestore_client() -> "AsyncClient":
+    """Shared async Firestore client (non-blocking on the event loop), built on first call"""
+    global _db
+    if _db is None:
+        from firebase_admin import firestore_async
+
+        app = get_app()
+        with _lock:
+            if _db is None:
+                _db = firestore_async.client(app)
+    return _db
+
+# Export Firebase services
+__all__ = ['auth', 'get_app', 'get_firestore_client']
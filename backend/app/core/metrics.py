@@ -0,0 +1,200 @@
+import time
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core import timing
+
+# Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; fine enough at the low end for cached reads and point lookups
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Label of requests that matched no route, so unknown paths cannot blow up
+# the number of series
+UNMATCHED_ROUTE = "<unmatched>"
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+class Counter:
+    """
+    Monotonic counter per label set.
+
+    Metrics are only updated from the event loop thread, so there are no
+    locks: an update is a dict lookup and an addition.
+    """
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def samples(self) -> Iterable[str]:
+        for labels, value in list(self._values.items()):
+            yield f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+
+class Histogram:
+    """Cumulative-bucket histogram per label set (see Counter about locking)"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (last one is +Inf), sum]
+        self._series: Dict[Tuple[str, ...], List[Any]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series.setdefault(labels, [[0] * (len(self.buckets) + 1), 0.0])
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return sum(series[0]) if series else 0
+
+    def samples(self) -> Iterable[str]:
+        for labels, (counts, total) in list(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _number(bound)
+                bucket = _labels(self.labelnames, labels, 'le="%s"' % le)
+                yield f"{self.name}_bucket{bucket} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}"
+            yield f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}"
+
+http_request_duration = Histogram(
+    "http_request_duration_seconds",
+    "Time from receiving a request to the end of its response body",
+    ("method", "route", "status"),
+)
+storage_call_duration = Histogram(
+    "storage_call_duration_seconds",
+    "Duration of storage backend operations made while serving requests",
+    ("method",),
+)
+auth_verifications = Counter(
+    "auth_verifications_total",
+    "Bearer token checks by outcome: cached, id_token, custom_token (fallback) or rejected",
+    ("outcome",),
+)
+
+REGISTRY = (http_request_duration, storage_call_duration, auth_verifications)
+
+def _cache_samples(caches: Dict[str, Dict[str, Any]]) -> List[str]:
+    """Gauges and counters for TTLCache.stats() dicts keyed by cache name"""
+    families = (
+        ("cache_hits_total", "counter", "Cache lookups that found an entry", "hits"),
+        ("cache_misses_total", "counter", "Cache lookups that found nothing", "misses"),
+        ("cache_hit_ratio", "gauge", "Hits over lookups since the process started", "hit_ratio"),
+        ("cache_entries", "gauge", "Entries currently cached", "size"),
+    )
+    lines = []
+    for name, kind, documentation, key in families:
+        lines += [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"]
+        for cache, stats in sorted(caches.items()):
+            lines.append(f'{name}{{cache="{_escape(cache)}"}} {_number(stats.get(key, 0))}')
+    return lines
+
+def render(caches: Optional[Dict[str, Dict[str, Any]]] = None) -> str:
+    """Every metric in the Prometheus text format, plus the given cache stats"""
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines += [f"# HELP {metric.name} {metric.documentation}", f"# TYPE {metric.name} {metric.kind}"]
+        lines.extend(metric.samples())
+    if caches:
+        lines += _cache_samples(caches)
+    return "\n".join(lines) + "\n"
+
+def route_template(scope: Scope) -> str:
+    """
+    Path template of the route that handled the request, with its mount
+    prefix (/api/v1/moods/{entry_id}), or UNMATCHED_ROUTE
+    """
+    route = scope.get("route")
+    template = getattr(route, "path", None)
+    if template is None:
+        return UNMATCHED_ROUTE
+    path = scope.get("path", "")
+    params = scope.get("path_params") or {}
+    try:
+        concrete = route.path_format.format(**{key: str(value) for key, value in params.items()})
+    except (AttributeError, KeyError, IndexError, ValueError):
+        return template
+    # Routers included under a prefix may report only their own part of the path
+    if concrete != path and path.endswith(concrete):
+        return path[: len(path) - len(concrete)] + template
+    return template
+
+class MetricsMiddleware:
+    """
+    Observe the latency of each HTTP request by method, route template and
+    status, and of the storage calls it made (from the request's timing
+    spans, so it must run inside ServerTimingMiddleware). Both are observed
+    when the last body chunk is sent, before any background tasks run.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        timings = timing.current_timings()
+        status = 500
+        observed = False
+
+        def observe() -> None:
+            nonlocal observed
+            if observed:
+                return
+            observed = True
+            http_request_duration.observe(
+                time.perf_counter() - started, scope["method"], route_template(scope), str(status)
+            )
+            if timings is not None:
+                for phase, name, duration_ms in timings.spans:
+                    if phase == timing.DB:
+                        storage_call_duration.observe(duration_ms / 1000, name)
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                observe()
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            observe()
@@ -0,0 +1,49 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Tuple
+
+# Response header carrying the opaque cursor of the next page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(sort_value: Any, doc_id: str) -> str:
+    """
+    Encode the position after (sort_value, doc_id) as an opaque URL-safe token
+    """
+    if isinstance(sort_value, datetime):
+        sort_value = sort_value.isoformat()
+    raw = json.dumps([sort_value, doc_id], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor: str, timestamp: bool = True) -> Tuple[Any, str]:
+    """
+    Decode a cursor from encode_cursor. Raises ValueError if it is malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        sort_value, doc_id = json.loads(raw)
+        if timestamp:
+            sort_value = datetime.fromisoformat(sort_value)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    if not isinstance(doc_id, str) or not doc_id:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return sort_value, doc_id
+
+def encode_sync_token(synced_at: datetime) -> str:
+    """Encode a delta-sync position as an opaque URL-safe token"""
+    raw = json.dumps({'t': synced_at.isoformat()}, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_sync_token(token: str) -> datetime:
+    """
+    Decode a token from encode_sync_token. Raises ValueError if it is malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        synced_at = datetime.fromisoformat(json.loads(raw)['t'])
+    except (ValueError, TypeError, KeyError) as e:
+        raise ValueError(f"Invalid sync token: {token}") from e
+    if synced_at.tzinfo is None:
+        raise ValueError(f"Invalid sync token: {token}")
+    return synced_at
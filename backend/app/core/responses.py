@@ -0,0 +1,30 @@
+from typing import Any, Dict, Type
+from fastapi.responses import JSONResponse
+from app.core.config import settings
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+class ORJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson (handles datetimes and numpy natively)"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+def response_class_options() -> Dict[str, Type[JSONResponse]]:
+    """
+    FastAPI(...) kwargs selecting the default response class.
+
+    Endpoints with a response model are serialized straight to JSON bytes by
+    pydantic's Rust core as long as no response class is set, which beats
+    any custom class; so the orjson class is opt-in (ORJSON_RESPONSES) and
+    only pays off for routes without a response model.
+    """
+    if not settings.ORJSON_RESPONSES:
+        return {}
+    if orjson is None:
+        print("[WARN] ORJSON_RESPONSES is set but orjson is not installed, using the default encoder")
+        return {}
+    return {'default_response_class': ORJSONResponse}
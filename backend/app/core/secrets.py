@@ -0,0 +1,156 @@
+import asyncio
+import json
+import os
+import tempfile
+import time
+from typing import Any, Callable, Dict, Optional
+
+from app.core.config import settings
+
+class SecretProvider:
+    """
+    Reads the latest version of one Secret Manager secret, once per instance.
+
+    The value is cached in cache_dir (Cloud Run's /tmp is an in-memory,
+    instance-local filesystem) together with the version it came from, so
+    workers and restarts on the same instance reuse it. A cached copy is
+    returned at once; when it is older than ttl its version is re-checked in
+    the background and the payload re-fetched only if a newer version exists.
+    Every call goes through one async client (one gRPC channel) with a
+    timeout. With nothing cached and Secret Manager unreachable, get()
+    returns None after at most the timeout.
+    """
+
+    def __init__(self, secret_name: str, cache_dir: str, ttl: float = 300.0, timeout: float = 1.0,
+                 client_factory: Optional[Callable[[], Any]] = None) -> None:
+        self.secret_name = secret_name  # projects/{project}/secrets/{secret}
+        self.cache_path = os.path.join(cache_dir, secret_name.replace('/', '_') + '.json')
+        self.ttl = ttl
+        self.timeout = timeout
+        self._client_factory = client_factory
+        self._client: Any = None
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    def _get_client(self) -> Any:
+        if self._client is None:
+            if self._client_factory is not None:
+                self._client = self._client_factory()
+            else:
+                from google.cloud import secretmanager
+                self._client = secretmanager.SecretManagerServiceAsyncClient()
+        return self._client
+
+    def _read_cache(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.cache_path) as f:
+                cached = json.load(f)
+            cached['age'] = time.time() - os.path.getmtime(self.cache_path)
+            return cached
+        except (OSError, ValueError):
+            return None
+
+    def _write_cache(self, version: str, payload: str) -> None:
+        """Atomically replace the cached copy, readable by this user only"""
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), mode=0o700, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.cache_path))
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'version': version, 'payload': payload}, f)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            print(f"Could not cache secret {self.secret_name}: {e}")
+
+    def _touch_cache(self) -> None:
+        try:
+            os.utime(self.cache_path)
+        except OSError:
+            pass
+
+    async def _fetch(self) -> Dict[str, str]:
+        response = await asyncio.wait_for(
+            self._get_client().access_secret_version(request={'name': f"{self.secret_name}/versions/latest"}),
+            self.timeout,
+        )
+        fetched = {'version': response.name, 'payload': response.payload.data.decode('UTF-8')}
+        self._write_cache(fetched['version'], fetched['payload'])
+        return fetched
+
+    async def refresh(self) -> Optional[str]:
+        """
+        Check the latest version against the cached one and fetch the payload
+        only if it changed; returns the current value (raises on failure)
+        """
+        cached = self._read_cache()
+        if cached is not None:
+            latest = await asyncio.wait_for(
+                self._get_client().get_secret_version(request={'name': f"{self.secret_name}/versions/latest"}),
+                self.timeout,
+            )
+            if latest.name == cached['version']:
+                self._touch_cache()
+                return cached['payload']
+        return (await self._fetch())['payload']
+
+    async def _refresh_in_background(self) -> None:
+        try:
+            await self.refresh()
+        except Exception as e:
+            print(f"Could not refresh secret {self.secret_name}: {e}")
+
+    async def get(self) -> Optional[str]:
+        """The secret's value: cached copy first, else fetched; None if unavailable"""
+        cached = self._read_cache()
+        if cached is not None:
+            if cached['age'] > self.ttl and self._refresh_task is None:
+                self._refresh_task = asyncio.create_task(self._refresh_in_background())
+            return cached['payload']
+        try:
+            return (await self._fetch())['payload']
+        except Exception as e:
+            print(f"Could not load secret {self.secret_name} from Secret Manager: {e}")
+            return None
+
+    async def close(self) -> None:
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            await asyncio.gather(self._refresh_task, return_exceptions=True)
+            self._refresh_task = None
+        if self._client is not None:
+            await self._client.transport.close()
+            self._client = None
+
+_firebase_secret: Optional[SecretProvider] = None
+
+def firebase_secret_provider() -> Optional[SecretProvider]:
+    """Provider of the Firebase service account on Cloud Run; None elsewhere"""
+    global _firebase_secret
+    project_id = os.getenv("GOOGLE_CLOUD_PROJECT")
+    # Cloud Run sets K_SERVICE
+    if _firebase_secret is None and os.getenv("K_SERVICE") and project_id:
+        _firebase_secret = SecretProvider(
+            f"projects/{project_id}/secrets/{settings.FIREBASE_SECRET_ID}",
+            cache_dir=settings.SECRET_CACHE_DIR,
+            ttl=settings.SECRET_CACHE_TTL,
+            timeout=settings.SECRET_FETCH_TIMEOUT,
+        )
+    return _firebase_secret
+
+async def load_cloud_secrets() -> bool:
+    """
+    Put the Firebase credentials from Secret Manager into settings (app
+    lifespan). Off Cloud Run, or when the secret cannot be read, settings
+    keep what the environment gave them. Returns whether the secret was used.
+    """
+    provider = firebase_secret_provider()
+    if provider is None:
+        return False
+    value = await provider.get()
+    if not value:
+        print("Falling back to environment variables")
+        return False
+    settings.FIREBASE_SERVICE_ACCOUNT_JSON = value
+    return True
+
+async def close() -> None:
+    if _firebase_secret is not None:
+        await _firebase_secret.close()
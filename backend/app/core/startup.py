@@ -0,0 +1,59 @@
+import asyncio
+import json
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict
+
+from app.core import firebase, secrets
+from app.services.base import StorageBackend
+
+logger = logging.getLogger("app.startup")
+
+class StartupReport:
+    """Duration of each startup phase, logged as one JSON line once the app is ready"""
+
+    def __init__(self, import_ms: float = 0.0) -> None:
+        self.import_ms = import_ms
+        self.phases: Dict[str, float] = {}
+        self.started = time.perf_counter()
+        self.startup_ms = 0.0
+
+    @asynccontextmanager
+    async def phase(self, name: str) -> AsyncIterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = (time.perf_counter() - started) * 1000
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "event": "startup",
+            "import_ms": round(self.import_ms, 2),
+            "phases": {name: round(ms, 2) for name, ms in self.phases.items()},
+            "startup_ms": round(self.startup_ms, 2),
+        }
+
+async def initialize(storage: StorageBackend, report: StartupReport) -> StartupReport:
+    """
+    Everything the first request would otherwise pay for: secrets, the
+    Firebase app (token verification) and the storage backend's clients.
+    The blocking SDK calls run on threads; Firebase and storage are set up
+    concurrently once the secrets are in.
+    """
+    async with report.phase("secrets"):
+        await secrets.load_cloud_secrets()
+
+    async def init_firebase() -> None:
+        async with report.phase("firebase"):
+            await asyncio.to_thread(firebase.get_app)
+
+    async def init_storage() -> None:
+        async with report.phase("storage"):
+            await storage.warm_up()
+
+    await asyncio.gather(init_firebase(), init_storage())
+    report.startup_ms = (time.perf_counter() - report.started) * 1000
+    logger.info(json.dumps(report.as_dict()))
+    return report
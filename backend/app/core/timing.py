@@ -0,0 +1,224 @@
+import functools
+import inspect
+import json
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from fastapi.routing import APIRoute
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger("app.timing")
+
+# Phases a request's time is broken into
+AUTH = "auth"          # deps.get_current_user (token verification)
+DB = "db"              # storage backend calls
+ENDPOINT = "endpoint"  # the path operation function itself, db calls included
+ROUTE = "route"        # dependencies + validation + endpoint + serialization
+
+class RequestTimings:
+    """Spans recorded while serving one request"""
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+        self.spans: List[Tuple[str, str, float]] = []  # (phase, name, ms)
+
+    def record(self, phase: str, name: str, duration_ms: float) -> None:
+        if self.finished is None:
+            self.spans.append((phase, name, duration_ms))
+
+    def finish(self) -> None:
+        """Stop the clock; spans recorded afterwards (background tasks) are dropped"""
+        if self.finished is None:
+            self.finished = time.perf_counter()
+
+    def phase_total(self, phase: str) -> float:
+        return sum((ms for span_phase, _, ms in self.spans if span_phase == phase), 0.0)
+
+    def phase_count(self, phase: str) -> int:
+        return sum(1 for span_phase, _, _ in self.spans if span_phase == phase)
+
+    def elapsed_ms(self) -> float:
+        return ((self.finished or time.perf_counter()) - self.started) * 1000
+
+    def phases(self) -> Dict[str, float]:
+        """
+        Wall time per phase in ms. db is the summed duration of the storage
+        calls, which can exceed its share of the request when calls run
+        concurrently; render is the framework's own work around the
+        endpoint (request parsing, pydantic validation, serialization).
+        """
+        auth = self.phase_total(AUTH)
+        db = self.phase_total(DB)
+        endpoint = self.phase_total(ENDPOINT)
+        route = self.phase_total(ROUTE)
+        return {
+            AUTH: auth,
+            DB: db,
+            "app": max(endpoint - db, 0.0),
+            "render": max(route - endpoint - auth, 0.0) if route else 0.0,
+        }
+
+    def server_timing(self, total_ms: float) -> str:
+        """Server-Timing header value"""
+        phases = self.phases()
+        descriptions = {
+            AUTH: "Token verification",
+            DB: f"Storage ({self.phase_count(DB)} calls)",
+            "app": "Handler",
+            "render": "Validation + serialization",
+        }
+        parts = [f'{name};dur={duration:.1f};desc="{descriptions[name]}"' for name, duration in phases.items()]
+        parts.append(f"total;dur={total_ms:.1f}")
+        return ", ".join(parts)
+
+_current: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+# Phase of the innermost open span, so nested calls are not counted twice
+_open_phase: ContextVar[Optional[str]] = ContextVar("request_timing_phase", default=None)
+
+def current_timings() -> Optional[RequestTimings]:
+    return _current.get()
+
+@contextmanager
+def span(phase: str, name: Optional[str] = None) -> Iterator[None]:
+    """Time the block as part of the current request (no-op outside one)"""
+    timings = _current.get()
+    if timings is None or _open_phase.get() == phase:
+        yield
+        return
+    token = _open_phase.set(phase)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.record(phase, name or phase, (time.perf_counter() - started) * 1000)
+        _open_phase.reset(token)
+
+def timed(phase: str, name: Optional[str] = None) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """
+    Decorate a coroutine function, or an async generator function, so each
+    call is recorded as a span. For a generator the span is the time spent
+    producing items, recorded once when it is exhausted or closed.
+    """
+    def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+        span_name = name or func.__name__
+
+        if inspect.isasyncgenfunction(func):
+            @functools.wraps(func)
+            async def generator_wrapper(*args: Any, **kwargs: Any) -> Any:
+                timings = _current.get()
+                if timings is None or _open_phase.get() == phase:
+                    async for item in func(*args, **kwargs):
+                        yield item
+                    return
+                busy = 0.0
+                iterator = func(*args, **kwargs).__aiter__()
+                try:
+                    while True:
+                        token = _open_phase.set(phase)
+                        started = time.perf_counter()
+                        try:
+                            item = await iterator.__anext__()
+                        except StopAsyncIteration:
+                            return
+                        finally:
+                            busy += time.perf_counter() - started
+                            _open_phase.reset(token)
+                        yield item
+                finally:
+                    timings.record(phase, span_name, busy * 1000)
+            return generator_wrapper
+
+        @functools.wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with span(phase, span_name):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+class TimedRoute(APIRoute):
+    """APIRoute recording the endpoint function and the whole route handler as spans"""
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any) -> None:
+        if inspect.iscoroutinefunction(endpoint):
+            endpoint = timed(ENDPOINT, endpoint.__name__)(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+    def get_route_handler(self) -> Callable[..., Any]:
+        handler = super().get_route_handler()
+
+        async def timed_handler(request: Any) -> Any:
+            with span(ROUTE, self.name):
+                return await handler(request)
+        return timed_handler
+
+class ServerTimingMiddleware:
+    """
+    Collect the spans of each HTTP request, add them as a Server-Timing
+    header and log one JSON line per request. Requests slower than
+    slow_request_ms are logged as warnings with every span.
+
+    The request ends when its last body chunk is sent: background tasks,
+    which Starlette runs before the app returns, are not part of it.
+    """
+
+    def __init__(self, app: ASGIApp, slow_request_ms: float = 500.0, header: bool = True) -> None:
+        self.app = app
+        self.slow_request_ms = slow_request_ms
+        self.header = header
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        timings = RequestTimings()
+        token = _current.set(timings)
+        status = 500
+
+        def finish() -> None:
+            if timings.finished is None:
+                timings.finish()
+                self.log(scope, status, timings)
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.header:
+                    headers = MutableHeaders(raw=message["headers"])
+                    headers.append("Server-Timing", timings.server_timing(timings.elapsed_ms()))
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                finish()
+                _current.set(None)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            finish()
+
+    def log(self, scope: Scope, status: int, timings: RequestTimings) -> None:
+        total_ms = timings.elapsed_ms()
+        slow = total_ms >= self.slow_request_ms
+        level = logging.WARNING if slow else logging.INFO
+        if not logger.isEnabledFor(level):
+            return
+        record: Dict[str, Any] = {
+            "event": "slow_request" if slow else "request",
+            "method": scope["method"],
+            "path": scope["path"],
+            "status": status,
+            "total_ms": round(total_ms, 2),
+            "phases": {name: round(ms, 2) for name, ms in timings.phases().items()},
+            "db_calls": timings.phase_count(DB),
+        }
+        if slow:
+            record["spans"] = [
+                {"phase": phase, "name": name, "ms": round(ms, 2)} for phase, name, ms in timings.spans
+            ]
+        logger.log(level, json.dumps(record))
@@ -1,43 +1,76 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import StaticPool
 
 from app.core.config import settings
 
-# Create Async Engine
-# Handle different database URLs
-DATABASE_URL = settings.DATABASE_URL or "sqlite:///./temp.db"
-
-# Convert postgres:// to postgresql+asyncpg:// if needed
-if DATABASE_URL.startswith("postgres://"):
-    DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql+asyncpg://", 1)
-elif DATABASE_URL.startswith("postgresql://") and not DATABASE_URL.startswith("postgresql+asyncpg://"):
-    DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://", 1)
-elif DATABASE_URL.startswith("sqlite:///"):
-    # SQLite uses aiosqlite for async
-    DATABASE_URL = DATABASE_URL.replace("sqlite:///", "sqlite+aiosqlite:///", 1)
-
-engine = create_async_engine(
-    DATABASE_URL,
-    echo=False,
-    future=True,
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
-)
-
-# Async Session Factory
-AsyncSessionLocal = async_sessionmaker(
-    bind=engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-    autocommit=False,
-    autoflush=False,
-)
+def async_database_url(url: str) -> str:
+    """Map a plain database URL to its async driver (asyncpg / aiosqlite)"""
+    # Convert postgres:// to postgresql+asyncpg:// if needed
+    if url.startswith("postgres://"):
+        return url.replace("postgres://", "postgresql+asyncpg://", 1)
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    if url.startswith("sqlite:///"):
+        # SQLite uses aiosqlite for async
+        return url.replace("sqlite:///", "sqlite+aiosqlite:///", 1)
+    return url
+
+def create_engine(url: Optional[str] = None) -> AsyncEngine:
+    """
+    Async engine for url (default settings.DATABASE_URL).
+
+    Postgres gets a bounded connection pool (DB_POOL_* settings) with
+    pre-ping and recycling, and sessions pinned to UTC. An in-memory SQLite
+    database is shared by every session through a single connection.
+    """
+    url = async_database_url(url or settings.DATABASE_URL or "sqlite:///./temp.db")
+    if url.startswith("sqlite"):
+        options = {"connect_args": {"check_same_thread": False}}
+        if ":memory:" in url or url.endswith("sqlite+aiosqlite://"):
+            options["poolclass"] = StaticPool
+    else:
+        options = {
+            "pool_size": settings.DB_POOL_SIZE,
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "pool_timeout": settings.DB_POOL_TIMEOUT,
+            "pool_recycle": settings.DB_POOL_RECYCLE,
+            "pool_pre_ping": True,
+        }
+        if url.startswith("postgresql+asyncpg"):
+            options["connect_args"] = {"server_settings": {"timezone": "UTC"}}
+    return create_async_engine(url, echo=False, **options)
+
+_engine: Optional[AsyncEngine] = None
+_sessionmaker: Optional[async_sessionmaker] = None
+
+def get_engine() -> AsyncEngine:
+    """Shared engine for settings.DATABASE_URL, built on first use rather than at import"""
+    global _engine
+    if _engine is None:
+        _engine = create_engine()
+    return _engine
+
+def get_sessionmaker() -> async_sessionmaker:
+    """Async session factory bound to get_engine()"""
+    global _sessionmaker
+    if _sessionmaker is None:
+        _sessionmaker = async_sessionmaker(
+            bind=get_engine(),
+            class_=AsyncSession,
+            expire_on_commit=False,
+            autocommit=False,
+            autoflush=False,
+        )
+    return _sessionmaker
 
 class Base(DeclarativeBase):
     pass
 
 # Dependency for FastAPI
 async def get_db():
-    async with AsyncSessionLocal() as session:
+    async with get_sessionmaker()() as session:
         try:
             yield session
         finally:
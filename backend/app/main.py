@@ -1,10 +1,40 @@
-from fastapi import FastAPI
+import time
+
+# Import cost of the app, reported at startup (app.core.startup)
+IMPORT_STARTED = time.perf_counter()
+
+import logging
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from app.core import metrics, secrets, startup
+from app.core.compression import CompressionMiddleware
+from app.core.metrics import MetricsMiddleware
 from app.core.config import settings
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.core.responses import response_class_options
+from app.core.timing import ServerTimingMiddleware
+
+# Our loggers (e.g. app.timing's per-request line) at LOG_LEVEL; libraries keep the default
+logging.basicConfig()
+logging.getLogger("app").setLevel(settings.LOG_LEVEL)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Nothing is initialized at import; do it here, before the first request
+    from app.services.storage import storage
+
+    report = startup.StartupReport(import_ms=(IMPORTED - IMPORT_STARTED) * 1000)
+    app.state.startup = (await startup.initialize(storage, report)).as_dict()
+    yield
+    await storage.close()
+    await secrets.close()
 
 app = FastAPI(
+    lifespan=lifespan,
     title=settings.PROJECT_NAME,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    **response_class_options()
 )
 
 # CORS
@@ -22,13 +52,51 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag", "Server-Timing"],
+)
+
+# Added after CORS so it wraps it: preflight and CORS headers are untouched
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+    gzip_level=settings.GZIP_LEVEL,
+    brotli_quality=settings.BROTLI_QUALITY,
+)
+
+if settings.METRICS_ENABLED:
+    # Inside ServerTimingMiddleware, whose spans it turns into storage histograms
+    app.add_middleware(MetricsMiddleware)
+
+# Outermost, so the logged total covers compression too
+app.add_middleware(
+    ServerTimingMiddleware,
+    slow_request_ms=settings.SLOW_REQUEST_MS,
+    header=settings.SERVER_TIMING_HEADER,
 )
 
 @app.get("/health")
 def health_check():
     return {"status": "ok", "app": settings.PROJECT_NAME}
 
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    async def read_metrics():
+        from app.api.deps import token_cache
+        from app.core.etag import etag_cache
+        from app.services.storage import storage
+        from app.services.user_records import user_record_service
+
+        caches = {
+            "auth_tokens": token_cache.stats(),
+            "etags": etag_cache.stats(),
+            "user_records_by_uid": user_record_service.by_uid.stats(),
+            "user_records_by_email": user_record_service.by_email.stats(),
+            **storage.cache_stats(),
+        }
+        return Response(metrics.render(caches), media_type=metrics.CONTENT_TYPE)
+
 from app.api.api import api_router
 
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
+IMPORTED = time.perf_counter()
@@ -2,3 +2,4 @@ from .user import User, UserSettings
 from .mood import MoodEntry
 from .therapist import TherapistInfo, TherapistTask, Appointment
 from .contact import EmergencyContact
+from .sync import SyncTombstone
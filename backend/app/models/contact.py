@@ -1,6 +1,5 @@
-from sqlalchemy import String, ForeignKey, DateTime
-from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import String, DateTime
+from sqlalchemy.orm import Mapped, mapped_column
 import uuid
 from datetime import datetime
 
@@ -9,12 +8,12 @@ from app.database import Base
 class EmergencyContact(Base):
     __tablename__ = "emergency_contacts"
 
-    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("users.id"), index=True)
+    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    # Firebase UID; users live in Firebase Auth, not in the users table
+    user_id: Mapped[str] = mapped_column(String(128), index=True)
     
     name: Mapped[str] = mapped_column(String)
     phone: Mapped[str] = mapped_column(String)
     relation: Mapped[str | None] = mapped_column(String)
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
-    
-    user: Mapped["User"] = relationship(back_populates="emergency_contacts")
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), index=True)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), index=True)
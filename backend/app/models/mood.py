@@ -1,6 +1,5 @@
-from sqlalchemy import Integer, String, ForeignKey, DateTime, JSON
-from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Index, Integer, String, DateTime, JSON
+from sqlalchemy.orm import Mapped, mapped_column
 import uuid
 from datetime import datetime
 
@@ -8,9 +7,16 @@ from app.database import Base
 
 class MoodEntry(Base):
     __tablename__ = "mood_entries"
+    __table_args__ = (
+        # Newest-first pages and date ranges of one history generation
+        Index("ix_mood_entries_user_generation_created", "user_id", "generation", "created_at", "id"),
+    )
 
-    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("users.id"), index=True)
+    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    # Firebase UID; users live in Firebase Auth, not in the users table
+    user_id: Mapped[str] = mapped_column(String(128), index=True)
+    # History generation the entry belongs to (see UserSettings.mood_history_generation)
+    generation: Mapped[int] = mapped_column(Integer, default=0)
     
     mood_level: Mapped[int] = mapped_column(Integer) # 1-10
     energy_level: Mapped[int] = mapped_column(Integer) # 1-10
@@ -18,6 +24,5 @@ class MoodEntry(Base):
     note: Mapped[str | None] = mapped_column(String)
     custom_metrics: Mapped[dict | list | None] = mapped_column(JSON)
     
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
-    
-    user: Mapped["User"] = relationship(back_populates="mood_entries")
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), index=True)
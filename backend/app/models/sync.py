@@ -0,0 +1,16 @@
+from sqlalchemy import String, DateTime
+from sqlalchemy.orm import Mapped, mapped_column
+from datetime import datetime
+
+from app.database import Base
+
+class SyncTombstone(Base):
+    """A deleted document, kept for the delta-sync feed"""
+    __tablename__ = "sync_tombstones"
+
+    # "{collection}_{doc_id}", so deleting twice keeps one tombstone
+    id: Mapped[str] = mapped_column(String, primary_key=True)
+    user_id: Mapped[str] = mapped_column(String(128), index=True)
+    collection: Mapped[str] = mapped_column(String)
+    doc_id: Mapped[str] = mapped_column(String)
+    deleted_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), index=True)
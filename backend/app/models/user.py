@@ -1,7 +1,8 @@
-from sqlalchemy import String, ForeignKey
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy import String, Integer, DateTime, JSON
+from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.dialects.postgresql import UUID
 import uuid
+from datetime import datetime
 
 from app.database import Base
 
@@ -12,20 +13,20 @@ class User(Base):
     email: Mapped[str] = mapped_column(String, unique=True, index=True)
     hashed_password: Mapped[str] = mapped_column(String)
     is_active: Mapped[bool] = mapped_column(default=True)
-    
-    settings: Mapped["UserSettings"] = relationship(back_populates="user", uselist=False, cascade="all, delete-orphan")
-    mood_entries: Mapped[list["MoodEntry"]] = relationship(back_populates="user", cascade="all, delete-orphan")
-    therapist_info: Mapped["TherapistInfo"] = relationship(back_populates="user", uselist=False, cascade="all, delete-orphan")
-    emergency_contacts: Mapped[list["EmergencyContact"]] = relationship(back_populates="user", cascade="all, delete-orphan")
-    therapist_tasks: Mapped[list["TherapistTask"]] = relationship(back_populates="user", cascade="all, delete-orphan")
-    appointments: Mapped[list["Appointment"]] = relationship(back_populates="user", cascade="all, delete-orphan")
 
 class UserSettings(Base):
     __tablename__ = "user_settings"
 
-    user_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("users.id"), primary_key=True)
-    theme: Mapped[str | None] = mapped_column(String, default="system")
-    language: Mapped[str | None] = mapped_column(String, default="en")
-    # Add other settings as needed
-    
-    user: Mapped["User"] = relationship(back_populates="settings")
+    # Firebase UID; users live in Firebase Auth, not in the users table
+    user_id: Mapped[str] = mapped_column(String(128), primary_key=True)
+    # Unset values fall back to DEFAULT_USER_SETTINGS when read
+    theme: Mapped[str | None] = mapped_column(String)
+    language: Mapped[str | None] = mapped_column(String)
+    # Any other settings the client saves
+    extra: Mapped[dict | None] = mapped_column(JSON)
+    updated_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+
+    # Mood history bookkeeping, never exposed to clients
+    mood_history_generation: Mapped[int] = mapped_column(Integer, default=0)
+    mood_history_cleared_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+    mood_history_gc: Mapped[dict | None] = mapped_column(JSON)
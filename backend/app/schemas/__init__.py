@@ -1,9 +1,16 @@
 from .token import Token, TokenData
 from .user import User, UserCreate, UserUpdate, UserLogin, UserSettingsUpdate
-from .mood import Mood, MoodCreate, MoodUpdate
+from .mood import (
+    Mood, MoodCreate, MoodUpdate,
+    MoodImportError, MoodImportReport,
+    MetricSummary, MoodStatsBucket, MoodRollingAverage, MoodStats,
+    MetricRollup, MoodDailyRollup
+)
 from .therapist import (
     EmergencyContact, EmergencyContactCreate,
     TherapistInfo, TherapistInfoCreate,
-    TherapistTask, TherapistTaskCreate,
+    TherapistTask, TherapistTaskCreate, TherapistTaskCounts,
     Appointment, AppointmentCreate
 )
+from .sync import SyncTombstone, SyncChanges
+from .bootstrap import BootstrapError, Bootstrap
@@ -0,0 +1,20 @@
+from pydantic import BaseModel
+from typing import Any, Dict, List, Optional
+from .mood import Mood
+from .therapist import EmergencyContact, TherapistTask, Appointment
+
+class BootstrapError(BaseModel):
+    section: str
+    error: str
+
+class Bootstrap(BaseModel):
+    # A section that failed to load is None and listed in `errors`
+    settings: Optional[Dict[str, Any]] = None
+    therapist_info: Optional[Dict[str, Any]] = None
+    emergency_contacts: Optional[List[EmergencyContact]] = None
+    therapist_tasks: Optional[List[TherapistTask]] = None
+    appointments: Optional[List[Appointment]] = None
+    mood_entries: Optional[List[Mood]] = None
+    # Cursor for GET /moods to continue after mood_entries
+    next_mood_cursor: Optional[str] = None
+    errors: List[BootstrapError] = []
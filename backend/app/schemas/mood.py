@@ -25,3 +25,51 @@ class MoodInDBBase(MoodBase):
 
 class Mood(MoodInDBBase):
     pass
+
+class MoodImportError(BaseModel):
+    row: int  # Line number in the uploaded file
+    error: str
+
+class MoodImportReport(BaseModel):
+    imported: int
+    failed: int
+    errors: List[MoodImportError]  # Capped; `failed` has the full count
+
+class MetricSummary(BaseModel):
+    mean: float
+    min: float
+    max: float
+
+class MetricRollup(MetricSummary):
+    std: float
+
+class MoodDailyRollup(BaseModel):
+    date: str  # UTC day, YYYY-MM-DD
+    count: int
+    mood_level: Optional[MetricRollup] = None
+    energy_level: Optional[MetricRollup] = None
+    stress_level: Optional[MetricRollup] = None
+
+class MoodStatsBucket(BaseModel):
+    period: str  # YYYY-MM-DD (day, or Monday of the week) or YYYY-MM
+    count: int
+    mood_level: MetricSummary
+    energy_level: MetricSummary
+    stress_level: MetricSummary
+
+class MoodRollingAverage(BaseModel):
+    date: str
+    mood_level: float
+    energy_level: float
+    stress_level: float
+
+class MoodStats(BaseModel):
+    timezone: str
+    start: datetime
+    end: datetime
+    count: int
+    rolling_window_days: int
+    daily: List[MoodStatsBucket]
+    weekly: List[MoodStatsBucket]
+    monthly: List[MoodStatsBucket]
+    rolling: List[MoodRollingAverage]
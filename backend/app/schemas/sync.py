@@ -0,0 +1,25 @@
+from pydantic import BaseModel
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+from .mood import Mood
+from .therapist import EmergencyContact, TherapistTask, Appointment
+
+class SyncTombstone(BaseModel):
+    collection: str
+    id: str
+    deleted_at: datetime | str
+
+class SyncChanges(BaseModel):
+    # Opaque token to pass as `since` on the next sync
+    next_token: str
+    # True when this is a full snapshot: replace all local data
+    full: bool
+    # Collections to replace wholesale even in a delta (e.g. after 'Clean History')
+    reset: List[str] = []
+    mood_entries: List[Mood] = []
+    emergency_contacts: List[EmergencyContact] = []
+    therapist_tasks: List[TherapistTask] = []
+    appointments: List[Appointment] = []
+    user_settings: Optional[Dict[str, Any]] = None
+    therapist_info: Optional[Dict[str, Any]] = None
+    deleted: List[SyncTombstone] = []
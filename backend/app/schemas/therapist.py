@@ -51,6 +51,11 @@ class TherapistTask(TherapistTaskBase):
     class Config:
         from_attributes = True
 
+class TherapistTaskCounts(BaseModel):
+    open: int
+    completed: int
+    total: int
+
 # --- Appointment ---
 class AppointmentBase(BaseModel):
     title: str
@@ -58,7 +63,7 @@ class AppointmentBase(BaseModel):
     notes: Optional[str] = None
 
 class AppointmentCreate(AppointmentBase):
-    pass
+    date: datetime  # Stored as a timestamp; naive values are taken as UTC
 
 class Appointment(AppointmentBase):
     id: str  # Changed from UUID4 to str for Firestore document ID
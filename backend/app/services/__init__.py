@@ -1,5 +1,4 @@
 from .firestore_service import firestore_service
+from .storage import storage
 
-__all__ = ['firestore_service']
-
-
+__all__ = ['firestore_service', 'storage']
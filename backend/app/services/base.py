@@ -0,0 +1,230 @@
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from app.core import timing
+
+# Settings of a user who never saved any
+DEFAULT_USER_SETTINGS = {'theme': 'system', 'language': 'he'}
+
+# Per-user collections served by the delta-sync feed. Every write stamps
+# updated_at; deletes leave a tombstone.
+SYNC_COLLECTIONS = ('mood_entries', 'emergency_contacts', 'therapist_tasks', 'appointments')
+# How long tombstones are kept; a client whose last sync is older than this
+# gets a full snapshot instead of a delta
+TOMBSTONE_RETENTION = timedelta(days=30)
+# updated_at comes from the API server's clock and lands a little after it is
+# taken, so a delta reaches back this far to catch writes still in flight
+SYNC_CLOCK_MARGIN = timedelta(seconds=5)
+
+def materialize(doc_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the API representation of a document from stored or just-written data"""
+    result = {'id': doc_id}
+    for key, value in data.items():
+        if isinstance(value, datetime):
+            # Naive datetimes are stored as UTC; mirror what a read returns
+            if value.tzinfo is None:
+                value = value.replace(tzinfo=timezone.utc)
+            value = value.isoformat()
+        result[key] = value
+    return result
+
+def parse_appointment_date(value: Any) -> datetime:
+    """
+    An appointment date as an aware UTC datetime (naive values are UTC), so it
+    is stored as a timestamp and range queries see it; ValueError otherwise
+    """
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            raise ValueError(f"Invalid appointment date: {value}")
+    if not isinstance(value, datetime):
+        raise ValueError(f"Invalid appointment date: {value!r}")
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+def merge_fields(current: Dict[str, Any], data: Dict[str, Any]) -> Dict[str, Any]:
+    """Apply data to current the way Firestore's set(..., merge=True) does: maps merge key by key"""
+    merged = dict(current)
+    for key, value in data.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            value = merge_fields(merged[key], value)
+        merged[key] = value
+    return merged
+
+class StorageBackend(ABC):
+    """
+    Persistence operations the API relies on. Documents go in and out as
+    plain dicts shaped like the API schemas: an 'id', a 'user_id' and
+    timestamps as ISO strings. Every operation is scoped to one user.
+
+    Implementations: FirestoreService (app.services.firestore_service) and
+    SQLService (app.services.sql_service); app.services.storage picks one.
+    Every operation an implementation defines is timed as a 'db' span of
+    the current request (app.core.timing).
+    """
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        for name in StorageBackend.__abstractmethods__:
+            if name in cls.__dict__:
+                setattr(cls, name, timing.timed(timing.DB, name)(cls.__dict__[name]))
+
+    # Mood Entries
+    @abstractmethod
+    async def get_mood_entries(self, user_id: str, skip: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+        """Current mood entries, newest first, offset paginated"""
+
+    @abstractmethod
+    async def get_mood_entries_page(
+        self, user_id: str, limit: int = 100, cursor: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """One keyset page of current mood entries and the next cursor; ValueError on a bad cursor"""
+
+    @abstractmethod
+    async def create_mood_entry(self, user_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Create a mood entry and return it as stored"""
+
+    @abstractmethod
+    async def create_mood_entries(self, user_id: str, entries: List[Dict[str, Any]]) -> int:
+        """Create mood entries in bulk, keeping their created_at; returns the count"""
+
+    @abstractmethod
+    async def delete_mood_entry(self, user_id: str, entry_id: str) -> bool:
+        """Delete one mood entry; False if missing or not the user's"""
+
+    @abstractmethod
+    async def get_mood_daily_rollups(self, user_id: str, start_day: str, end_day: str) -> List[Dict[str, Any]]:
+        """Per UTC day count and mean/min/max/std of each metric, start_day..end_day inclusive"""
+
+    @abstractmethod
+    async def rebuild_mood_rollups(self, user_id: str) -> int:
+        """Recompute stored daily aggregates from raw entries; returns the number of days"""
+
+    @abstractmethod
+    def stream_mood_metrics(
+        self, user_id: str, start: Optional[datetime] = None, end: Optional[datetime] = None
+    ) -> AsyncIterator[Tuple[datetime, int, int, int]]:
+        """Stream (created_at, mood, energy, stress) of current entries in [start, end)"""
+
+    @abstractmethod
+    async def get_mood_generation(self, user_id: str) -> int:
+        """Current mood history generation (0 if never cleared)"""
+
+    @abstractmethod
+    async def clear_mood_history(self, user_id: str) -> int:
+        """Logically delete all mood entries; returns the new generation"""
+
+    @abstractmethod
+    async def get_mood_history_gc_status(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Progress of the purge started by the last clear (None if never cleared)"""
+
+    @abstractmethod
+    async def purge_superseded_mood_entries(
+        self, user_id: str, batch_size: int = 500, max_batches: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Physically delete entries of cleared generations; returns the progress"""
+
+    # User Settings
+    @abstractmethod
+    async def get_user_settings(self, user_id: str) -> Dict[str, Any]:
+        """User settings, defaults filling the gaps"""
+
+    @abstractmethod
+    async def update_user_settings(self, user_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Merge data into the user's settings and return them"""
+
+    @abstractmethod
+    async def get_user_documents(self, user_id: str) -> Dict[str, Optional[Dict[str, Any]]]:
+        """{'user_settings': ..., 'therapist_info': ... or None} in one round trip"""
+
+    # Emergency Contacts
+    @abstractmethod
+    async def get_emergency_contacts(self, user_id: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Contacts, newest first, at most limit"""
+
+    @abstractmethod
+    async def create_emergency_contact(self, user_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Create a contact and return it as stored"""
+
+    @abstractmethod
+    async def delete_emergency_contact(self, user_id: str, contact_id: str) -> bool:
+        """Delete a contact; False if missing or not the user's"""
+
+    # Therapist Info
+    @abstractmethod
+    async def get_therapist_info(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Therapist info, None if never saved"""
+
+    @abstractmethod
+    async def update_therapist_info(self, user_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Merge data into the therapist info and return it"""
+
+    # Therapist Tasks
+    @abstractmethod
+    async def get_therapist_tasks(self, user_id: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Tasks, newest first, at most limit"""
+
+    @abstractmethod
+    async def get_therapist_tasks_page(
+        self,
+        user_id: str,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        is_completed: Optional[bool] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        One keyset page of tasks, newest first, optionally only open or only
+        completed ones, and the next page's cursor (ValueError if malformed)
+        """
+
+    @abstractmethod
+    async def count_therapist_tasks(self, user_id: str) -> Dict[str, int]:
+        """Number of open and completed tasks: {'open': n, 'completed': m}"""
+
+    @abstractmethod
+    async def create_therapist_task(self, user_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Create a task and return it as stored"""
+
+    @abstractmethod
+    async def update_therapist_task(
+        self, user_id: str, task_id: str, data: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        """Update a task and return it; None if missing or not the user's"""
+
+    # Appointments
+    @abstractmethod
+    async def get_appointments(
+        self,
+        user_id: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        limit: Optional[int] = None,
+        ascending: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Appointments with start <= date < end (either bound optional), latest
+        date first or earliest first when ascending, at most limit of them
+        """
+
+    @abstractmethod
+    async def create_appointment(self, user_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Create an appointment and return it as stored"""
+
+    # Delta Sync
+    @abstractmethod
+    async def get_changes(self, user_id: str, since: Optional[datetime] = None) -> Dict[str, Any]:
+        """Documents created, updated or deleted after since (see FirestoreService.get_changes)"""
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """Size and hit ratio of the backend's caches"""
+        return {}
+
+    # Lifecycle (app lifespan)
+    async def warm_up(self) -> None:
+        """Build clients and connections ahead of the first request"""
+
+    async def close(self) -> None:
+        """Release clients and connections at shutdown"""
@@ -0,0 +1,84 @@
+import asyncio
+import json
+import os
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from google.api_core.exceptions import FailedPrecondition
+
+# Composite indexes of every query FirestoreService issues; deploy with
+#   firebase deploy --only firestore:indexes
+MANIFEST_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'firestore.indexes.json'
+)
+
+# Equality value of probe queries; no document has it, so a probe reads nothing
+_PROBE_VALUE = '__index_probe__'
+
+# (collection, ((field, direction), ...))
+IndexKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+def index_key(collection: str, *fields: Tuple[str, str]) -> IndexKey:
+    return collection, tuple(fields)
+
+def describe(index: IndexKey) -> str:
+    collection, fields = index
+    return f"{collection}({', '.join(f'{field} {direction}' for field, direction in fields)})"
+
+def load_manifest(path: str = MANIFEST_PATH) -> List[IndexKey]:
+    """The composite indexes listed in a firestore.indexes.json file"""
+    with open(path) as f:
+        manifest = json.load(f)
+    return [
+        index_key(index['collectionGroup'], *((field['fieldPath'], field['order']) for field in index['fields']))
+        for index in manifest.get('indexes', [])
+    ]
+
+class IndexStatus:
+    """
+    Which composite indexes the database has, so queries that need one can
+    fall back to filtering and sorting in Python until it is built.
+
+    Indexes are assumed present until a probe or a real query finds them
+    missing (Firestore answers FAILED_PRECONDITION).
+    """
+
+    def __init__(self) -> None:
+        self.missing: Set[IndexKey] = set()
+
+    def usable(self, index: IndexKey) -> bool:
+        return index not in self.missing
+
+    def mark_missing(self, index: IndexKey, error: Optional[Exception] = None) -> None:
+        if index not in self.missing:
+            self.missing.add(index)
+            print(f"Missing Firestore index {describe(index)}; sorting in Python until it is deployed"
+                  + (f" ({error})" if error else ""))
+
+    def mark_present(self, index: IndexKey) -> None:
+        self.missing.discard(index)
+
+    async def probe(self, db: Any, indexes: Iterable[IndexKey]) -> Dict[str, bool]:
+        """
+        Run a one-document query per index (equality on every field but the
+        last, ordered by the last) and record which fail for want of it.
+        Returns index description -> present.
+        """
+        async def check(index: IndexKey) -> Tuple[IndexKey, bool]:
+            collection, fields = index
+            query = db.collection(collection)
+            for field, _ in fields[:-1]:
+                query = query.where(field, '==', _PROBE_VALUE)
+            field, direction = fields[-1]
+            query = query.order_by(field, direction=direction).limit(1)
+            try:
+                async for _ in query.stream():
+                    pass
+            except FailedPrecondition as e:
+                self.mark_missing(index, e)
+                return index, False
+            self.mark_present(index)
+            return index, True
+
+        results = await asyncio.gather(*(check(index) for index in indexes))
+        return {describe(index): present for index, present in results}
@@ -1,121 +1,739 @@
-from typing import List, Dict, Any, Optional
-from datetime import datetime
-from google.cloud.firestore import Client as FirestoreClient
-from app.core.firebase import db
-
-class FirestoreService:
-    def __init__(self):
-        self.db: FirestoreClient = db
+import asyncio
+from copy import deepcopy
+from typing import List, Dict, Any, AsyncIterator, Optional, Tuple
+from datetime import datetime, timezone
+from google.cloud import firestore
+from google.cloud.firestore import AsyncClient
+from google.api_core.exceptions import FailedPrecondition
+from google.cloud.firestore_v1.field_path import FieldPath
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.firebase import get_app, get_firestore_client
+from app.core.pagination import encode_cursor, decode_cursor
+from app.services import firestore_indexes, mood_rollups
+from app.services.base import (
+    StorageBackend, materialize, merge_fields, parse_appointment_date,
+    DEFAULT_USER_SETTINGS, SYNC_COLLECTIONS, SYNC_CLOCK_MARGIN, TOMBSTONE_RETENTION
+)
+from app.services.mood_rollups import ROLLUP_COLLECTION
+
+# Firestore limit on writes in one batch or transaction
+MAX_BATCH_WRITES = 500
+
+# Bookkeeping fields kept on the settings document, never exposed to clients
+MOOD_GENERATION_FIELD = 'mood_history_generation'
+MOOD_GC_FIELD = 'mood_history_gc'
+MOOD_CLEARED_AT_FIELD = 'mood_history_cleared_at'
+_INTERNAL_SETTINGS_FIELDS = (MOOD_GENERATION_FIELD, MOOD_GC_FIELD, MOOD_CLEARED_AT_FIELD)
+
+# Deletes leave a tombstone here for the delta-sync feed. Tombstones carry
+# expire_at for a Firestore TTL policy (TOMBSTONE_RETENTION).
+TOMBSTONE_COLLECTION = 'sync_tombstones'
+
+# Layouts of the per-user collections (FIRESTORE_LAYOUT): top-level
+# collections filtered by user_id, or users/{uid}/{collection}
+# subcollections. The singleton documents (user_settings, therapist_info),
+# rollups and tombstones are keyed by user already and stay top-level.
+GLOBAL_LAYOUT = 'global'
+USER_LAYOUT = 'user'
+USER_COLLECTIONS = ('mood_entries', 'emergency_contacts', 'therapist_tasks', 'appointments')
+USERS_COLLECTION = 'users'
+
+# Checkpoints of migrate_to_user_layout, one field per collection
+MIGRATION_COLLECTION = 'migrations'
+USER_LAYOUT_MIGRATION = 'user_layout'
+
+def _public_settings(data: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v for k, v in data.items() if k not in _INTERNAL_SETTINGS_FIELDS}
+
+def _settings_view(user_id: str, data: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """API representation of a settings document, defaults filling the gaps"""
+    return materialize(user_id, {**DEFAULT_USER_SETTINGS, **_public_settings(data or {})})
+
+# Marks a cache miss, since None is cached for documents that do not exist
+_NOT_CACHED = object()
+
+def _set_tombstone(writer, tombstones, collection: str, doc_id: str, user_id: str) -> None:
+    """Record a deletion for delta sync in the same transaction or batch as the delete"""
+    now = datetime.now(timezone.utc)
+    writer.set(tombstones.document(f"{collection}_{doc_id}"), {
+        'user_id': user_id,
+        'collection': collection,
+        'doc_id': doc_id,
+        'deleted_at': now,
+        'expire_at': now + TOMBSTONE_RETENTION,
+    })
+
+@firestore.async_transactional
+async def _bump_mood_generation(transaction, settings_ref) -> int:
+    snapshot = await settings_ref.get(transaction=transaction)
+    current = (snapshot.to_dict() or {}).get(MOOD_GENERATION_FIELD, 0) if snapshot.exists else 0
+    generation = current + 1
+    transaction.set(settings_ref, {
+        MOOD_GENERATION_FIELD: generation,
+        MOOD_CLEARED_AT_FIELD: datetime.now(timezone.utc),
+        MOOD_GC_FIELD: {
+            'generation': generation,
+            'status': 'pending',
+            'deleted': 0,
+            'last_doc_id': None,
+            'updated_at': datetime.now(timezone.utc),
+        },
+    }, merge=True)
+    return generation
+
+# The doc_refs of these helpers are one document: the first in the
+# service's layout, the rest its dual-write copies (FirestoreService._refs)
+
+@firestore.async_transactional
+async def _delete_owned(transaction, doc_refs, user_id: str, tombstones) -> bool:
+    doc_ref = doc_refs[0]
+    snapshot = await doc_ref.get(transaction=transaction)
+    if not snapshot.exists or (snapshot.to_dict() or {}).get('user_id') != user_id:
+        return False
+    for ref in doc_refs:
+        transaction.delete(ref)
+    _set_tombstone(transaction, tombstones, doc_ref.parent.id, doc_ref.id, user_id)
+    return True
+
+@firestore.async_transactional
+async def _update_owned(transaction, doc_refs, user_id: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    doc_ref = doc_refs[0]
+    snapshot = await doc_ref.get(transaction=transaction)
+    current = snapshot.to_dict() if snapshot.exists else None
+    if not current or current.get('user_id') != user_id:
+        return None
+    if data:
+        data = {**data, 'updated_at': datetime.now(timezone.utc)}
+        transaction.update(doc_ref, data)
+        # Copies get the whole document, so one never holds only some fields
+        for ref in doc_refs[1:]:
+            transaction.set(ref, {**current, **data})
+    return materialize(doc_ref.id, {**current, **data})
+
+@firestore.async_transactional
+async def _copy_missing(transaction, db, pairs) -> int:
+    """
+    Copy each (source, target) document whose target does not exist yet,
+    re-reading both in the transaction. Returns the number copied.
+    """
+    snapshots = {}
+    # get_all does not keep the order of the references
+    async for snapshot in db.get_all([ref for pair in pairs for ref in pair], transaction=transaction):
+        snapshots[snapshot.reference.path] = snapshot
+    copied = 0
+    for source, target in pairs:
+        # A target that exists was written through dual writes and is newer;
+        # a source that is gone was deleted since it was streamed
+        if snapshots[target.path].exists or not snapshots[source.path].exists:
+            continue
+        transaction.set(target, snapshots[source.path].to_dict())
+        copied += 1
+    return copied
+
+@firestore.async_transactional
+async def _delete_mood_entry(transaction, entries, rollups, tombstones, entry_refs, user_id: str) -> bool:
+    entry_ref = entry_refs[0]
+    snapshot = await entry_ref.get(transaction=transaction)
+    entry = snapshot.to_dict() if snapshot.exists else None
+    if not entry or entry.get('user_id') != user_id:
+        return False
+    # Recompute the day's rollup from the entries that remain; a day holds a
+    # handful of entries, and min/max cannot be decremented
+    generation = entry.get('generation', 0)
+    day = mood_rollups.day_key(entry['created_at'])
+    start, end = mood_rollups.day_bounds(day)
+    query = entries.where('created_at', '>=', start).where('created_at', '<', end)
+    remaining = []
+    async for doc in query.stream(transaction=transaction):
+        data = doc.to_dict() or {}
+        if doc.id != entry_ref.id and data.get('generation', 0) == generation:
+            remaining.append(data)
+    rollup_ref = rollups.document(mood_rollups.rollup_id(user_id, generation, day))
+    if remaining:
+        transaction.set(rollup_ref, mood_rollups.rollup_from_entries(user_id, generation, day, remaining))
+    else:
+        transaction.delete(rollup_ref)
+    for ref in entry_refs:
+        transaction.delete(ref)
+    _set_tombstone(transaction, tombstones, 'mood_entries', entry_ref.id, user_id)
+    return True
+
+class FirestoreService(StorageBackend):
+    def __init__(
+        self,
+        client: Optional[AsyncClient] = None,
+        layout: Optional[str] = None,
+        dual_write: Optional[bool] = None
+    ):
+        # All calls go through the async client so Firestore round trips
+        # yield to the event loop instead of blocking it
+        self._client = client
+        # Where per-user collections are read and written; with dual_write
+        # every write also goes to the other layout, so both stay complete
+        # while data is migrated (migrate_to_user_layout) and for a rollback
+        self.layout = layout or settings.FIRESTORE_LAYOUT
+        if self.layout not in (GLOBAL_LAYOUT, USER_LAYOUT):
+            raise ValueError(f"Unknown Firestore layout: {self.layout}")
+        self.dual_write = settings.FIRESTORE_DUAL_WRITE if dual_write is None else dual_write
+        # Write-through cache of the per-user singleton documents
+        # (user_settings, therapist_info), keyed by (collection, user_id)
+        self.document_cache = TTLCache(
+            maxsize=settings.DOCUMENT_CACHE_SIZE,
+            ttl=settings.DOCUMENT_CACHE_TTL
+        )
+        # Composite indexes found missing; their queries sort in Python
+        self.indexes = firestore_indexes.IndexStatus()
+
+    @property
+    def db(self) -> AsyncClient:
+        # The shared client is built on first use, not when the module is imported
+        if self._client is None:
+            self._client = get_firestore_client()
+        return self._client
+
+    @db.setter
+    def db(self, client: AsyncClient) -> None:
+        self._client = client
+
+    async def warm_up(self) -> None:
+        """Initialize Firebase (blocking file / network I/O, so on a thread) and build the client"""
+        if self._client is None:
+            await asyncio.to_thread(get_app)
+        self.db
+        if settings.FIRESTORE_INDEX_PROBE:
+            await self.probe_indexes()
+
+    async def probe_indexes(self) -> Dict[str, bool]:
+        """Find which indexes of firestore.indexes.json are missing (index description -> present)"""
+        try:
+            return await self.indexes.probe(self.db, firestore_indexes.load_manifest())
+        except Exception as e:
+            print(f"Could not check Firestore indexes: {e}")
+            return {}
+
+    def _collection(self, name: str, user_id: str, layout: Optional[str] = None):
+        """Collection holding a user's documents of name in layout (default: the service's)"""
+        if (layout or self.layout) == USER_LAYOUT and name in USER_COLLECTIONS:
+            return self.db.collection(USERS_COLLECTION).document(user_id).collection(name)
+        return self.db.collection(name)
+
+    def _partitioned(self, name: str) -> bool:
+        return self.layout == USER_LAYOUT and name in USER_COLLECTIONS
+
+    def _user_query(self, name: str, user_id: str):
+        """Query over a user's documents of a per-user collection"""
+        collection = self._collection(name, user_id)
+        return collection if self._partitioned(name) else collection.where('user_id', '==', user_id)
+
+    def _refs(self, name: str, user_id: str, doc_id: Optional[str] = None) -> List[Any]:
+        """
+        References to write for one document: in the service's layout (a new
+        id when doc_id is None), then the same id in the other layout when
+        dual writing
+        """
+        ref = self._collection(name, user_id).document(doc_id)
+        if not self.dual_write or name not in USER_COLLECTIONS:
+            return [ref]
+        other = GLOBAL_LAYOUT if self.layout == USER_LAYOUT else USER_LAYOUT
+        return [ref, self._collection(name, user_id, other).document(ref.id)]
+
+    async def _set_all(self, refs: List[Any], data: Dict[str, Any]) -> None:
+        if len(refs) == 1:
+            await refs[0].set(data)
+            return
+        batch = self.db.batch()
+        for ref in refs:
+            batch.set(ref, data)
+        await batch.commit()
+
+    async def _list_by(
+        self,
+        collection: str,
+        user_id: str,
+        field: str,
+        descending: bool = True,
+        limit: Optional[int] = None,
+        start: Any = None,
+        end: Any = None,
+        equal: Optional[Dict[str, Any]] = None,
+        after: Optional[Tuple[Any, str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        The user's documents in collection matching every equal filter, with
+        start <= field < end, ordered by (field, id), resuming after the
+        (value, id) position `after`, at most limit. Firestore does all of it
+        on the (user_id, *equal, field) index (without user_id in the user
+        layout, where a lone field needs no composite index); while that
+        index is missing every document of the user is read and the same is
+        done in Python.
+        """
+        equal = equal or {}
+        direction = 'DESCENDING' if descending else 'ASCENDING'
+        scope = () if self._partitioned(collection) else (('user_id', 'ASCENDING'),)
+        fields = scope + tuple((name, 'ASCENDING') for name in equal) + ((field, direction),)
+        index = firestore_indexes.index_key(collection, *fields) if len(fields) > 1 else None
+        query = self._user_query(collection, user_id)
+        if index is None or self.indexes.usable(index):
+            ordered = query
+            for name, value in equal.items():
+                ordered = ordered.where(name, '==', value)
+            if start is not None:
+                ordered = ordered.where(field, '>=', start)
+            if end is not None:
+                ordered = ordered.where(field, '<', end)
+            ordered = (
+                ordered.order_by(field, direction=direction)
+                .order_by(FieldPath.document_id(), direction=direction)
+            )
+            if after:
+                ordered = ordered.start_after({field: after[0], FieldPath.document_id(): after[1]})
+            if limit:
+                ordered = ordered.limit(limit)
+            try:
+                return await self._stream_materialized(ordered)
+            except FailedPrecondition as e:
+                if index is None:
+                    raise
+                self.indexes.mark_missing(index, e)
+
+        def position(value: Any, doc_id: str) -> Tuple[bool, Any, str]:
+            # Timestamps sort before strings, as in Firestore
+            return isinstance(value, str), value, doc_id
+
+        rows = []
+        async for doc in query.stream():
+            data = doc.to_dict() or {}
+            value = data.get(field)
+            # Like Firestore: documents without the field are not in its
+            # order, and range filters only match values of the bound's type
+            if value is None or any(data.get(name) != expected for name, expected in equal.items()):
+                continue
+            if start is not None and not (isinstance(value, type(start)) and value >= start):
+                continue
+            if end is not None and not (isinstance(value, type(end)) and value < end):
+                continue
+            if after and not (position(value, doc.id) < position(*after)
+                              if descending else position(value, doc.id) > position(*after)):
+                continue
+            rows.append((position(value, doc.id), data))
+        rows.sort(key=lambda row: row[0], reverse=descending)
+        return [materialize(key[2], data) for key, data in rows[:limit or None]]
+
+    def _cached(self, collection: str, user_id: str) -> Any:
+        """Cached API representation of a singleton document, or _NOT_CACHED"""
+        value = self.document_cache.get((collection, user_id), _NOT_CACHED)
+        return value if value is _NOT_CACHED else deepcopy(value)
+
+    def _remember(self, collection: str, user_id: str, document: Optional[Dict[str, Any]]) -> None:
+        self.document_cache.set((collection, user_id), deepcopy(document))
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """Size and hit ratio of the service's caches"""
+        return {'documents': self.document_cache.stats()}
     
     # Mood Entries
     async def get_mood_entries(self, user_id: str, skip: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
         """Get all mood entries for a user"""
         query = (
-            self.db.collection('mood_entries')
-            .where('user_id', '==', user_id)
+            (await self._current_mood_entries(user_id))
             .order_by('created_at', direction='DESCENDING')
             .offset(skip)
             .limit(limit)
         )
-        docs = query.stream()
         results = []
-        for doc in docs:
-            data = doc.to_dict()
-            # Convert Firestore Timestamp to ISO string
-            if 'created_at' in data and hasattr(data['created_at'], 'isoformat'):
-                data['created_at'] = data['created_at'].isoformat()
-            results.append({'id': doc.id, **data})
+        async for doc in query.stream():
+            # Convert Firestore Timestamps to ISO strings
+            results.append(materialize(doc.id, doc.to_dict()))
         return results
     
-    async def create_mood_entry(self, user_id: str, data: Dict[str, Any]) -> str:
-        """Create a new mood entry"""
-        doc_ref = self.db.collection('mood_entries').document()
+    async def get_mood_entries_page(
+        self, user_id: str, limit: int = 100, cursor: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Get one page of mood entries, newest first, using keyset pagination.
+
+        Resumes after the (created_at, id) position encoded in cursor, so a
+        deep page costs the same reads as the first one. Returns the entries
+        and the cursor of the next page (None on the last page).
+        Raises ValueError if cursor is malformed.
+        """
+        query = (
+            (await self._current_mood_entries(user_id))
+            .order_by('created_at', direction='DESCENDING')
+            .order_by(FieldPath.document_id(), direction='DESCENDING')
+        )
+        if cursor:
+            created_at, doc_id = decode_cursor(cursor)
+            query = query.start_after({'created_at': created_at, FieldPath.document_id(): doc_id})
+        # Read one extra document to know whether another page exists
+        query = query.limit(limit + 1)
+        results = []
+        async for doc in query.stream():
+            results.append(materialize(doc.id, doc.to_dict()))
+        if len(results) <= limit:
+            return results, None
+        results = results[:limit]
+        last = results[-1]
+        return results, encode_cursor(last['created_at'], last['id'])
+
+    async def create_mood_entry(self, user_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Create a new mood entry and return it as stored"""
+        doc_refs = self._refs('mood_entries', user_id)
         entry_data = {
             **data,
             'user_id': user_id,
-            'created_at': datetime.utcnow()
+            'generation': await self.get_mood_generation(user_id),
+            'created_at': datetime.now(timezone.utc)
         }
-        doc_ref.set(entry_data)
-        return doc_ref.id
-    
-    async def delete_all_mood_entries(self, user_id: str) -> int:
-        """Delete all mood entries for a user"""
+        entry_data['updated_at'] = entry_data['created_at']
+        await self._commit_mood_entries(user_id, entry_data['generation'], [(doc_refs, entry_data)])
+        return materialize(doc_refs[0].id, entry_data)
+
+    async def create_mood_entries(self, user_id: str, entries: List[Dict[str, Any]]) -> int:
+        """
+        Create mood entries in as few batched writes as possible.
+
+        Each entry keeps its own created_at (e.g. history imported from another
+        app); entries without one get the current time. Returns the count.
+        """
+        if not entries:
+            return 0
+        generation = await self.get_mood_generation(user_id)
+        now = datetime.now(timezone.utc)
+        copies = 2 if self.dual_write else 1
+        written = 0
+        chunk: List[Tuple[List[Any], Dict[str, Any]]] = []
+        days = set()
+        for data in entries:
+            entry_data = {
+                **data,
+                'user_id': user_id,
+                'generation': generation,
+                'created_at': data.get('created_at') or now,
+                'updated_at': now
+            }
+            day = mood_rollups.day_key(entry_data['created_at'])
+            # One write per entry (and copy) plus one rollup write per distinct day
+            if (len(chunk) + 1) * copies + len(days | {day}) > MAX_BATCH_WRITES:
+                written += await self._commit_mood_entries(user_id, generation, chunk)
+                chunk, days = [], set()
+            chunk.append((self._refs('mood_entries', user_id), entry_data))
+            days.add(day)
+        written += await self._commit_mood_entries(user_id, generation, chunk)
+        return written
+
+    async def _commit_mood_entries(
+        self, user_id: str, generation: int, entries: List[Tuple[List[Any], Dict[str, Any]]]
+    ) -> int:
+        """Write entries and fold them into their daily rollups in one atomic batch"""
+        if not entries:
+            return 0
+        batch = self.db.batch()
+        by_day: Dict[str, List[Dict[str, Any]]] = {}
+        for doc_refs, entry_data in entries:
+            for doc_ref in doc_refs:
+                batch.set(doc_ref, entry_data)
+            by_day.setdefault(mood_rollups.day_key(entry_data['created_at']), []).append(entry_data)
+        rollups = self.db.collection(ROLLUP_COLLECTION)
+        for day, day_entries in by_day.items():
+            batch.set(
+                rollups.document(mood_rollups.rollup_id(user_id, generation, day)),
+                mood_rollups.rollup_increments(user_id, generation, day, day_entries),
+                merge=True
+            )
+        await batch.commit()
+        return len(entries)
+
+    async def delete_mood_entry(self, user_id: str, entry_id: str) -> bool:
+        """
+        Delete one mood entry and update its daily rollup in the same
+        transaction; False if it does not exist or belongs to another user
+        """
+        return await _delete_mood_entry(
+            self.db.transaction(),
+            self._user_query('mood_entries', user_id),
+            self.db.collection(ROLLUP_COLLECTION),
+            self.db.collection(TOMBSTONE_COLLECTION),
+            self._refs('mood_entries', user_id, entry_id),
+            user_id
+        )
+
+    async def get_mood_daily_rollups(self, user_id: str, start_day: str, end_day: str) -> List[Dict[str, Any]]:
+        """
+        Get per-day (UTC) mood aggregates for start_day..end_day inclusive
+        (YYYY-MM-DD), reading one rollup document per day with entries
+        """
         query = (
-            self.db.collection('mood_entries')
+            self.db.collection(ROLLUP_COLLECTION)
             .where('user_id', '==', user_id)
+            .where('generation', '==', await self.get_mood_generation(user_id))
+            .where('day', '>=', start_day)
+            .where('day', '<=', end_day)
+            .order_by('day')
         )
-        docs = query.stream()
-        count = 0
-        for doc in docs:
-            doc.reference.delete()
-            count += 1
-        return count
+        results = []
+        async for doc in query.stream():
+            data = doc.to_dict()
+            if data and data.get('count'):
+                results.append(mood_rollups.summarize(data))
+        return results
+
+    async def rebuild_mood_rollups(self, user_id: str) -> int:
+        """
+        Recompute the user's daily rollups from raw mood entries and drop
+        rollups of cleared generations. Returns the number of days written.
+        """
+        generation = await self.get_mood_generation(user_id)
+        rebuilt: Dict[str, Dict[str, Any]] = {}
+        async for created_at, mood, energy, stress in self.stream_mood_metrics(user_id):
+            day = mood_rollups.day_key(created_at)
+            if day not in rebuilt:
+                rebuilt[day] = mood_rollups.empty_rollup(user_id, generation, day)
+            mood_rollups.add_entry(rebuilt[day], {
+                'mood_level': mood, 'energy_level': energy, 'stress_level': stress
+            })
+
+        rollups = self.db.collection(ROLLUP_COLLECTION)
+        keep = {mood_rollups.rollup_id(user_id, generation, day) for day in rebuilt}
+        batch = self.db.batch()
+        pending = 0
+        async for doc in rollups.where('user_id', '==', user_id).select(['day']).stream():
+            if doc.id not in keep:
+                batch.delete(doc.reference)
+                pending += 1
+                if pending == MAX_BATCH_WRITES:
+                    await batch.commit()
+                    batch, pending = self.db.batch(), 0
+        for day, rollup in rebuilt.items():
+            batch.set(rollups.document(mood_rollups.rollup_id(user_id, generation, day)), rollup)
+            pending += 1
+            if pending == MAX_BATCH_WRITES:
+                await batch.commit()
+                batch, pending = self.db.batch(), 0
+        if pending:
+            await batch.commit()
+        return len(rebuilt)
     
+    async def stream_mood_metrics(
+        self, user_id: str, start: Optional[datetime] = None, end: Optional[datetime] = None
+    ) -> AsyncIterator[Tuple[datetime, int, int, int]]:
+        """
+        Stream (created_at, mood_level, energy_level, stress_level) of the
+        user's current mood entries with start <= created_at < end.
+        Only those fields are fetched.
+        """
+        query = await self._current_mood_entries(user_id)
+        if start:
+            query = query.where('created_at', '>=', start)
+        if end:
+            query = query.where('created_at', '<', end)
+        query = query.select(['created_at', 'mood_level', 'energy_level', 'stress_level'])
+        async for doc in query.stream():
+            data = doc.to_dict() or {}
+            try:
+                yield data['created_at'], data['mood_level'], data['energy_level'], data['stress_level']
+            except KeyError:
+                continue
+
+    async def get_mood_generation(self, user_id: str) -> int:
+        """Get the user's current mood history generation (0 if never cleared)"""
+        doc = await self.db.collection('user_settings').document(user_id).get([MOOD_GENERATION_FIELD])
+        if doc.exists:
+            return (doc.to_dict() or {}).get(MOOD_GENERATION_FIELD, 0)
+        return 0
+
+    async def _current_mood_entries(self, user_id: str):
+        """Query over the user's mood entries of the current generation"""
+        query = self._user_query('mood_entries', user_id)
+        generation = await self.get_mood_generation(user_id)
+        if generation:
+            # Entries written before the first clear have no generation field
+            # and are excluded along with every older generation
+            query = query.where('generation', '==', generation)
+        return query
+
+    async def clear_mood_history(self, user_id: str) -> int:
+        """
+        Logically delete all mood entries for a user in O(1).
+
+        Bumps the history generation on the settings document so reads stop
+        returning older entries; purge_superseded_mood_entries() removes them
+        afterwards. Returns the new generation.
+        """
+        settings_ref = self.db.collection('user_settings').document(user_id)
+        return await _bump_mood_generation(self.db.transaction(), settings_ref)
+
+    async def get_mood_history_gc_status(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Get progress of the purge started by the last clear (None if never cleared)"""
+        doc = await self.db.collection('user_settings').document(user_id).get([MOOD_GC_FIELD])
+        status = (doc.to_dict() or {}).get(MOOD_GC_FIELD) if doc.exists else None
+        if status and hasattr(status.get('updated_at'), 'isoformat'):
+            status['updated_at'] = status['updated_at'].isoformat()
+        return status
+
+    async def purge_superseded_mood_entries(
+        self, user_id: str, batch_size: int = 500, max_batches: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Delete mood entries from cleared generations in batched writes.
+
+        Walks the user's entries in document-id order and checkpoints the last
+        id and deleted count on the settings document after every batch, so an
+        interrupted purge resumes where it stopped. Stops early (status
+        'running') after max_batches batches. Returns the progress.
+        """
+        settings_ref = self.db.collection('user_settings').document(user_id)
+        settings_doc = await settings_ref.get([MOOD_GENERATION_FIELD, MOOD_GC_FIELD])
+        settings_data = (settings_doc.to_dict() or {}) if settings_doc.exists else {}
+        generation = settings_data.get(MOOD_GENERATION_FIELD, 0)
+        progress = settings_data.get(MOOD_GC_FIELD) or {}
+        if progress.get('generation') != generation:
+            progress = {'generation': generation, 'deleted': 0, 'last_doc_id': None}
+        if progress.get('status') == 'done' or not generation:
+            return progress
+
+        # Every deleted entry is one write per copy of it
+        batch_size = min(batch_size, MAX_BATCH_WRITES // (2 if self.dual_write else 1))
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            batches += 1
+            query = (
+                self._user_query('mood_entries', user_id)
+                .order_by(FieldPath.document_id())
+                .select(['generation'])
+                .limit(batch_size)
+            )
+            if progress.get('last_doc_id'):
+                query = query.start_after({FieldPath.document_id(): progress['last_doc_id']})
+            batch = self.db.batch()
+            scanned = deleted = 0
+            async for doc in query.stream():
+                scanned += 1
+                progress['last_doc_id'] = doc.id
+                if (doc.to_dict() or {}).get('generation', 0) != generation:
+                    for ref in self._refs('mood_entries', user_id, doc.id):
+                        batch.delete(ref)
+                    deleted += 1
+            if deleted:
+                await batch.commit()
+            progress['deleted'] = progress.get('deleted', 0) + deleted
+            if scanned < batch_size:
+                await self._purge_superseded_rollups(user_id, generation)
+                progress['status'] = 'done'
+            else:
+                progress['status'] = 'running'
+            progress['updated_at'] = datetime.now(timezone.utc)
+            await settings_ref.set({MOOD_GC_FIELD: progress}, merge=True)
+            if progress['status'] == 'done':
+                break
+        return progress
+
+    async def _purge_superseded_rollups(self, user_id: str, generation: int) -> None:
+        query = (
+            self.db.collection(ROLLUP_COLLECTION)
+            .where('user_id', '==', user_id)
+            .select(['generation'])
+        )
+        batch = self.db.batch()
+        pending = 0
+        async for doc in query.stream():
+            if (doc.to_dict() or {}).get('generation') != generation:
+                batch.delete(doc.reference)
+                pending += 1
+                if pending == MAX_BATCH_WRITES:
+                    await batch.commit()
+                    batch, pending = self.db.batch(), 0
+        if pending:
+            await batch.commit()
+
     # User Settings
     async def get_user_settings(self, user_id: str) -> Dict[str, Any]:
-        """Get user settings"""
-        doc_ref = self.db.collection('user_settings').document(user_id)
-        doc = doc_ref.get()
-        if doc.exists:
-            return {'id': doc.id, **doc.to_dict()}
-        # Create default settings
-        default_settings = {'theme': 'system', 'language': 'he'}
-        doc_ref.set(default_settings)
-        return {'id': user_id, **default_settings}
+        """Get user settings; defaults (not written) if the user never saved any"""
+        cached = self._cached('user_settings', user_id)
+        if cached is not _NOT_CACHED:
+            return cached
+        doc = await self.db.collection('user_settings').document(user_id).get()
+        result = _settings_view(user_id, doc.to_dict() if doc.exists else None)
+        self._remember('user_settings', user_id, result)
+        return result
     
     async def update_user_settings(self, user_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
         """Update user settings"""
         doc_ref = self.db.collection('user_settings').document(user_id)
-        doc_ref.set(data, merge=True)
-        updated_doc = doc_ref.get()
-        return {'id': user_id, **updated_doc.to_dict()}
+        update_data = {**_public_settings(data), 'updated_at': datetime.now(timezone.utc)}
+        cached = self._cached('user_settings', user_id)
+        # Dropped first, so a write that fails leaves nothing stale behind
+        self.document_cache.pop(('user_settings', user_id))
+        await doc_ref.set(update_data, merge=True)
+        if cached is _NOT_CACHED:
+            updated_doc = await doc_ref.get()
+            result = _settings_view(user_id, updated_doc.to_dict())
+        else:
+            result = materialize(user_id, merge_fields(cached, update_data))
+        self._remember('user_settings', user_id, result)
+        return result
+    
+    async def get_user_documents(self, user_id: str) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Get the user's settings and therapist info in one batched read of
+        whichever is not cached. Settings fall back to the defaults, missing
+        therapist info is None; nothing is created.
+        """
+        documents = {
+            collection: self._cached(collection, user_id)
+            for collection in ('user_settings', 'therapist_info')
+        }
+        missing = [name for name, document in documents.items() if document is _NOT_CACHED]
+        if missing:
+            found = {}
+            # get_all does not keep the order of the references
+            refs = [self.db.collection(name).document(user_id) for name in missing]
+            async for doc in self.db.get_all(refs):
+                if doc.exists:
+                    found[doc.reference.parent.id] = doc.to_dict()
+            for name in missing:
+                if name == 'user_settings':
+                    documents[name] = _settings_view(user_id, found.get(name))
+                else:
+                    documents[name] = materialize(user_id, found[name]) if found.get(name) else None
+                self._remember(name, user_id, documents[name])
+        return documents
     
     # Emergency Contacts
-    async def get_emergency_contacts(self, user_id: str) -> List[Dict[str, Any]]:
-        """Get all emergency contacts for a user"""
+    async def get_emergency_contacts(self, user_id: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Get a user's emergency contacts, newest first, at most limit"""
         try:
-            # Remove order_by to avoid composite index requirement
-            # We'll sort in Python instead
-            query = (
-                self.db.collection('emergency_contacts')
-                .where('user_id', '==', user_id)
-            )
-            docs = query.stream()
-            results = []
-            for doc in docs:
-                data = doc.to_dict()
-                if data:
-                    if 'created_at' in data and hasattr(data['created_at'], 'isoformat'):
-                        data['created_at'] = data['created_at'].isoformat()
-                    results.append({'id': doc.id, **data})
-            # Sort by created_at descending in Python
-            results.sort(key=lambda x: x.get('created_at', ''), reverse=True)
-            return results
+            return await self._list_by('emergency_contacts', user_id, 'created_at', limit=limit)
         except Exception as e:
             print(f"Error in get_emergency_contacts: {e}")
             raise
     
-    async def create_emergency_contact(self, user_id: str, data: Dict[str, Any]) -> str:
-        """Create a new emergency contact"""
+    async def create_emergency_contact(self, user_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Create a new emergency contact and return it as stored"""
         try:
-            doc_ref = self.db.collection('emergency_contacts').document()
+            doc_refs = self._refs('emergency_contacts', user_id)
             contact_data = {
                 **data,
                 'user_id': user_id,
-                'created_at': datetime.utcnow()
+                'created_at': datetime.now(timezone.utc)
             }
-            doc_ref.set(contact_data)
-            return doc_ref.id
+            contact_data['updated_at'] = contact_data['created_at']
+            await self._set_all(doc_refs, contact_data)
+            return materialize(doc_refs[0].id, contact_data)
         except Exception as e:
             print(f"Error in create_emergency_contact: {e}")
             raise
     
-    async def delete_emergency_contact(self, contact_id: str) -> bool:
-        """Delete an emergency contact"""
+    async def delete_emergency_contact(self, user_id: str, contact_id: str) -> bool:
+        """Delete an emergency contact; False if it does not exist or belongs to another user"""
         try:
-            doc_ref = self.db.collection('emergency_contacts').document(contact_id)
-            doc_ref.delete()
-            return True
+            return await _delete_owned(
+                self.db.transaction(),
+                self._refs('emergency_contacts', user_id, contact_id),
+                user_id,
+                self.db.collection(TOMBSTONE_COLLECTION)
+            )
         except Exception as e:
             print(f"Error in delete_emergency_contact: {e}")
             raise
@@ -124,15 +742,15 @@ class FirestoreService:
     async def get_therapist_info(self, user_id: str) -> Optional[Dict[str, Any]]:
         """Get therapist info for a user"""
         try:
+            cached = self._cached('therapist_info', user_id)
+            if cached is not _NOT_CACHED:
+                return cached
             doc_ref = self.db.collection('therapist_info').document(user_id)
-            doc = doc_ref.get()
-            if doc.exists:
-                data = doc.to_dict()
-                if data:
-                    if 'updated_at' in data and hasattr(data['updated_at'], 'isoformat'):
-                        data['updated_at'] = data['updated_at'].isoformat()
-                    return {'id': doc.id, **data}
-            return None
+            doc = await doc_ref.get()
+            data = doc.to_dict() if doc.exists else None
+            result = materialize(doc.id, data) if data else None
+            self._remember('therapist_info', user_id, result)
+            return result
         except Exception as e:
             print(f"Error in get_therapist_info: {e}")
             raise
@@ -141,122 +759,317 @@ class FirestoreService:
         """Update therapist info"""
         try:
             doc_ref = self.db.collection('therapist_info').document(user_id)
-            update_data = {**data, 'updated_at': datetime.utcnow()}
-            doc_ref.set(update_data, merge=True)
-            updated_doc = doc_ref.get()
-            result = updated_doc.to_dict() if updated_doc.exists else {}
-            if result and 'updated_at' in result and hasattr(result['updated_at'], 'isoformat'):
-                result['updated_at'] = result['updated_at'].isoformat()
-            return {'id': user_id, **result}
+            update_data = {**data, 'user_id': user_id, 'updated_at': datetime.now(timezone.utc)}
+            cached = self._cached('therapist_info', user_id)
+            self.document_cache.pop(('therapist_info', user_id))
+            await doc_ref.set(update_data, merge=True)
+            if cached is _NOT_CACHED:
+                updated_doc = await doc_ref.get()
+                result = materialize(user_id, updated_doc.to_dict() if updated_doc.exists else {})
+            else:
+                result = materialize(user_id, merge_fields(cached or {}, update_data))
+            self._remember('therapist_info', user_id, result)
+            return result
         except Exception as e:
             print(f"Error in update_therapist_info: {e}")
             raise
     
     # Therapist Tasks
-    async def get_therapist_tasks(self, user_id: str) -> List[Dict[str, Any]]:
-        """Get all therapist tasks for a user"""
+    async def get_therapist_tasks(self, user_id: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Get a user's therapist tasks, newest first, at most limit"""
         try:
-            # Remove order_by to avoid composite index requirement
-            # We'll sort in Python instead
-            query = (
-                self.db.collection('therapist_tasks')
-                .where('user_id', '==', user_id)
-            )
-            docs = query.stream()
-            results = []
-            for doc in docs:
-                data = doc.to_dict()
-                if data:
-                    if 'created_at' in data and hasattr(data['created_at'], 'isoformat'):
-                        data['created_at'] = data['created_at'].isoformat()
-                    results.append({'id': doc.id, **data})
-            # Sort by created_at descending in Python
-            results.sort(key=lambda x: x.get('created_at', ''), reverse=True)
-            return results
+            return await self._list_by('therapist_tasks', user_id, 'created_at', limit=limit)
         except Exception as e:
             print(f"Error in get_therapist_tasks: {e}")
             raise
     
-    async def create_therapist_task(self, user_id: str, data: Dict[str, Any]) -> str:
-        """Create a new therapist task"""
+    async def get_therapist_tasks_page(
+        self,
+        user_id: str,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        is_completed: Optional[bool] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Get one page of a user's therapist tasks, newest first, optionally only
+        open or only completed ones, using keyset pagination on
+        (created_at, id). Returns the tasks and the cursor of the next page
+        (None on the last page). Raises ValueError if cursor is malformed.
+        """
+        after = decode_cursor(cursor) if cursor else None
+        equal = {} if is_completed is None else {'is_completed': is_completed}
+        try:
+            # Read one extra document to know whether another page exists
+            results = await self._list_by(
+                'therapist_tasks', user_id, 'created_at', limit=limit + 1, equal=equal, after=after
+            )
+        except Exception as e:
+            print(f"Error in get_therapist_tasks_page: {e}")
+            raise
+        if len(results) <= limit:
+            return results, None
+        results = results[:limit]
+        last = results[-1]
+        return results, encode_cursor(last['created_at'], last['id'])
+
+    async def count_therapist_tasks(self, user_id: str) -> Dict[str, int]:
+        """
+        Count a user's open and completed therapist tasks with two aggregation
+        queries, which read index entries instead of documents
+        """
+        tasks = self._user_query('therapist_tasks', user_id)
+        open_tasks, completed_tasks = await asyncio.gather(
+            tasks.where('is_completed', '==', False).count(alias='count').get(),
+            tasks.where('is_completed', '==', True).count(alias='count').get()
+        )
+        return {'open': open_tasks[0][0].value, 'completed': completed_tasks[0][0].value}
+    
+    async def create_therapist_task(self, user_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Create a new therapist task and return it as stored"""
         try:
-            doc_ref = self.db.collection('therapist_tasks').document()
+            doc_refs = self._refs('therapist_tasks', user_id)
             task_data = {
                 **data,
                 'user_id': user_id,
                 'is_completed': data.get('is_completed', False),
-                'created_at': datetime.utcnow()
+                'created_at': datetime.now(timezone.utc)
             }
-            doc_ref.set(task_data)
-            return doc_ref.id
+            task_data['updated_at'] = task_data['created_at']
+            await self._set_all(doc_refs, task_data)
+            return materialize(doc_refs[0].id, task_data)
         except Exception as e:
             print(f"Error in create_therapist_task: {e}")
             raise
     
-    async def update_therapist_task(self, task_id: str, data: Dict[str, Any]) -> bool:
-        """Update a therapist task"""
+    async def update_therapist_task(
+        self, user_id: str, task_id: str, data: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Update a therapist task and return it; None if it does not exist or
+        belongs to another user
+        """
         try:
-            doc_ref = self.db.collection('therapist_tasks').document(task_id)
-            doc_ref.update(data)
-            return True
+            doc_refs = self._refs('therapist_tasks', user_id, task_id)
+            return await _update_owned(self.db.transaction(), doc_refs, user_id, data)
         except Exception as e:
             print(f"Error in update_therapist_task: {e}")
             raise
     
     # Appointments
-    async def get_appointments(self, user_id: str) -> List[Dict[str, Any]]:
-        """Get all appointments for a user"""
+    async def get_appointments(
+        self,
+        user_id: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        limit: Optional[int] = None,
+        ascending: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Get a user's appointments with start <= date < end, latest date first
+        unless ascending. Filtering, ordering and the limit run in Firestore
+        on the (user_id, date) index, so only the returned documents are read.
+        Legacy string dates are invisible to the range filters; see
+        scripts/normalize_appointment_dates.py.
+        """
         try:
-            # Remove order_by to avoid composite index requirement
-            # We'll sort in Python instead
-            query = (
-                self.db.collection('appointments')
-                .where('user_id', '==', user_id)
+            return await self._list_by(
+                'appointments', user_id, 'date', descending=not ascending, limit=limit, start=start, end=end
             )
-            docs = query.stream()
-            results = []
-            for doc in docs:
-                data = doc.to_dict()
-                if data:
-                    # Convert Firestore Timestamp to ISO string
-                    if 'date' in data and hasattr(data['date'], 'isoformat'):
-                        data['date'] = data['date'].isoformat()
-                    if 'created_at' in data and hasattr(data['created_at'], 'isoformat'):
-                        data['created_at'] = data['created_at'].isoformat()
-                    results.append({'id': doc.id, **data})
-            # Sort by date descending in Python
-            results.sort(key=lambda x: x.get('date', ''), reverse=True)
-            return results
         except Exception as e:
             print(f"Error in get_appointments: {e}")
             raise
     
-    async def create_appointment(self, user_id: str, data: Dict[str, Any]) -> str:
-        """Create a new appointment"""
+    async def create_appointment(self, user_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Create a new appointment and return it as stored. The date is stored
+        as a UTC timestamp; a date that does not parse raises ValueError.
+        """
         try:
-            doc_ref = self.db.collection('appointments').document()
+            doc_refs = self._refs('appointments', user_id)
             appointment_data = {
                 **data,
+                'date': parse_appointment_date(data['date']),
                 'user_id': user_id,
-                'created_at': datetime.utcnow()
+                'created_at': datetime.now(timezone.utc)
             }
-            # Convert date to Firestore Timestamp if it's a datetime object
-            if 'date' in appointment_data and isinstance(appointment_data['date'], datetime):
-                # Already a datetime, Firestore will handle it
-                pass
-            elif 'date' in appointment_data and isinstance(appointment_data['date'], str):
-                # Convert string to datetime (ISO format)
-                try:
-                    appointment_data['date'] = datetime.fromisoformat(appointment_data['date'].replace('Z', '+00:00'))
-                except ValueError:
-                    # If parsing fails, keep as string and let Firestore handle it
-                    pass
-            doc_ref.set(appointment_data)
-            return doc_ref.id
+            appointment_data['updated_at'] = appointment_data['created_at']
+            await self._set_all(doc_refs, appointment_data)
+            return materialize(doc_refs[0].id, appointment_data)
         except Exception as e:
             print(f"Error in create_appointment: {e}")
             raise
 
+    async def normalize_appointment_dates(
+        self, user_id: Optional[str] = None, dry_run: bool = False
+    ) -> Tuple[int, List[Tuple[str, str]]]:
+        """
+        Rewrite appointment dates stored as ISO strings (by older versions of
+        create_appointment) as timestamps, for one user or everyone. Firestore
+        range filters only match values of the filter's type, so the query
+        reads just the string-dated documents. Returns the number converted
+        and the (id, date) pairs that do not parse, which are left alone.
+        """
+        if user_id:
+            query = self._user_query('appointments', user_id)
+        elif self._partitioned('appointments'):
+            # Needs the appointments.date COLLECTION_GROUP field override
+            # in firestore.indexes.json
+            query = self.db.collection_group('appointments')
+        else:
+            query = self.db.collection('appointments')
+        fixes = {}
+        invalid = []
+        async for doc in query.where('date', '>=', '').stream():
+            data = doc.to_dict() or {}
+            try:
+                fixes[doc.id] = {**data, 'date': parse_appointment_date(data.get('date'))}
+            except ValueError:
+                invalid.append((doc.id, data.get('date')))
+        if dry_run:
+            return len(fixes), invalid
+
+        now = datetime.now(timezone.utc)
+        writes = [
+            # The whole document, to every copy of it; updated_at so
+            # delta-sync clients pick up the new value
+            (ref, {**data, 'updated_at': now})
+            for doc_id, data in fixes.items()
+            for ref in self._refs('appointments', data['user_id'], doc_id)
+        ]
+        for i in range(0, len(writes), MAX_BATCH_WRITES):
+            batch = self.db.batch()
+            for ref, data in writes[i:i + MAX_BATCH_WRITES]:
+                batch.set(ref, data)
+            await batch.commit()
+        return len(fixes), invalid
+
+    # Layout migration
+    async def migrate_to_user_layout(
+        self, collection: str, batch_size: int = 200, max_batches: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Copy a per-user collection from the global layout into
+        users/{uid}/{collection}, keeping document ids.
+
+        Streams the top-level collection in document-id order and copies each
+        batch in a transaction that re-reads source and target, so documents
+        deleted meanwhile are not resurrected and copies already written
+        through dual writes are kept. Checkpoints the last id and counts on
+        migrations/user_layout after every batch, so an interrupted run
+        resumes where it stopped; stops early (status 'running') after
+        max_batches batches. Requires dual_write, or writes made during the
+        copy would reach only one layout. Returns the progress.
+        """
+        if collection not in USER_COLLECTIONS:
+            raise ValueError(f"Not a per-user collection: {collection}")
+        if not self.dual_write:
+            raise RuntimeError("Enable FIRESTORE_DUAL_WRITE before migrating")
+        checkpoint_ref = self.db.collection(MIGRATION_COLLECTION).document(USER_LAYOUT_MIGRATION)
+        checkpoint = await checkpoint_ref.get([collection])
+        progress = ((checkpoint.to_dict() or {}).get(collection) if checkpoint.exists else None) or {
+            'status': 'pending', 'copied': 0, 'skipped': 0, 'last_doc_id': None
+        }
+        if progress['status'] == 'done':
+            return progress
+
+        batch_size = min(batch_size, MAX_BATCH_WRITES)
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            batches += 1
+            query = (
+                self.db.collection(collection)
+                .order_by(FieldPath.document_id())
+                .select(['user_id'])
+                .limit(batch_size)
+            )
+            if progress['last_doc_id']:
+                query = query.start_after({FieldPath.document_id(): progress['last_doc_id']})
+            pairs = []
+            scanned = 0
+            async for doc in query.stream():
+                scanned += 1
+                progress['last_doc_id'] = doc.id
+                owner = (doc.to_dict() or {}).get('user_id')
+                if owner:
+                    pairs.append((doc.reference, self._collection(collection, owner, USER_LAYOUT).document(doc.id)))
+                else:
+                    progress['skipped'] += 1
+            if pairs:
+                copied = await _copy_missing(self.db.transaction(), self.db, pairs)
+                progress['copied'] += copied
+                progress['skipped'] += len(pairs) - copied
+            progress['status'] = 'done' if scanned < batch_size else 'running'
+            progress['updated_at'] = datetime.now(timezone.utc)
+            await checkpoint_ref.set({collection: progress}, merge=True)
+            if progress['status'] == 'done':
+                break
+        return progress
+
+    # Delta Sync
+    async def get_changes(self, user_id: str, since: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Get the user's documents created, updated or deleted after `since`.
+
+        Returns every synced collection's changed documents, the settings and
+        therapist info documents when they changed (else None), tombstones
+        of deleted documents and the collections the client must replace
+        wholesale ('reset', set after a mood history clear). With no `since`,
+        or one older than TOMBSTONE_RETENTION, it is a full snapshot ('full').
+        'synced_at' is the `since` to pass on the next call.
+        """
+        synced_at = datetime.now(timezone.utc) - SYNC_CLOCK_MARGIN
+        if since and since < synced_at - TOMBSTONE_RETENTION:
+            since = None
+        settings_doc, therapist_doc = await asyncio.gather(
+            self.db.collection('user_settings').document(user_id).get(),
+            self.db.collection('therapist_info').document(user_id).get()
+        )
+        settings_data = (settings_doc.to_dict() or {}) if settings_doc.exists else {}
+        generation = settings_data.get(MOOD_GENERATION_FIELD, 0)
+        cleared_at = settings_data.get(MOOD_CLEARED_AT_FIELD)
+        reset = ['mood_entries'] if since and cleared_at and cleared_at > since else []
+
+        queries = {}
+        for collection in SYNC_COLLECTIONS:
+            query = self._user_query(collection, user_id)
+            if collection == 'mood_entries' and generation:
+                query = query.where('generation', '==', generation)
+            if since and collection not in reset:
+                query = query.where('updated_at', '>', since)
+            queries[collection] = query
+        if since:
+            queries[TOMBSTONE_COLLECTION] = (
+                self.db.collection(TOMBSTONE_COLLECTION)
+                .where('user_id', '==', user_id)
+                .where('deleted_at', '>', since)
+            )
+        results = await asyncio.gather(*(self._stream_materialized(q) for q in queries.values()))
+        changes: Dict[str, Any] = dict(zip(queries, results))
+
+        def changed(data: Dict[str, Any]) -> bool:
+            updated_at = data.get('updated_at')
+            return bool(data) and (not since or (updated_at is not None and updated_at > since))
+
+        therapist_data = (therapist_doc.to_dict() or {}) if therapist_doc.exists else {}
+        return {
+            'full': since is None,
+            'reset': reset,
+            **{collection: changes[collection] for collection in SYNC_COLLECTIONS},
+            'user_settings': (
+                _settings_view(user_id, settings_data)
+                if since is None or changed(settings_data) else None
+            ),
+            'therapist_info': materialize(user_id, therapist_data) if changed(therapist_data) else None,
+            'deleted': [
+                {'collection': t['collection'], 'id': t['doc_id'], 'deleted_at': t['deleted_at']}
+                for t in changes.get(TOMBSTONE_COLLECTION, [])
+            ],
+            'synced_at': synced_at,
+        }
+
+    async def _stream_materialized(self, query) -> List[Dict[str, Any]]:
+        return [materialize(doc.id, doc.to_dict()) async for doc in query.stream()]
+
 # Singleton instance
 firestore_service = FirestoreService()
 
@@ -0,0 +1,139 @@
+import codecs
+import csv
+import io
+import json
+from datetime import datetime, timezone
+from typing import Any, BinaryIO, Dict, Iterator, Optional, Tuple
+from pydantic import ValidationError
+from app import schemas
+from app.services.firestore_service import MAX_BATCH_WRITES
+from app.services.storage import storage
+
+SUPPORTED_FORMATS = ('csv', 'ndjson')
+
+# Only the first errors are reported row by row, so a broken file of any
+# size produces a bounded response
+MAX_REPORTED_ERRORS = 100
+
+# Bytes checked for a non-UTF-8 encoding before anything is written; Excel
+# exports in cp1255/cp1252 show it within the first Hebrew or accented cell
+ENCODING_CHECK_BYTES = 64 * 1024
+
+class RowStreamError(ValueError):
+    """The file cannot be read past this row (bad encoding, broken CSV)"""
+
+def detect_format(filename: Optional[str], content_type: Optional[str]) -> Optional[str]:
+    """Guess the import format from the upload's file name or content type"""
+    name = (filename or '').lower()
+    if name.endswith('.csv') or content_type in ('text/csv', 'application/csv'):
+        return 'csv'
+    if name.endswith(('.ndjson', '.jsonl')) or content_type in ('application/x-ndjson', 'application/jsonl'):
+        return 'ndjson'
+    return None
+
+def iter_rows(fileobj: BinaryIO, fmt: str) -> Iterator[Tuple[int, Any]]:
+    """
+    Stream (line number, raw row) pairs from an uploaded file.
+
+    Rows are read one at a time, so memory does not grow with file size.
+    NDJSON lines that are not valid JSON are yielded as the ValueError. A
+    decode or CSV error ends the stream with a RowStreamError, numbered with
+    the line that could not be read.
+    """
+    text = io.TextIOWrapper(fileobj, encoding='utf-8-sig', errors='strict', newline='')
+    line_number = 0
+    try:
+        if fmt == 'csv':
+            reader = csv.DictReader(text)
+            for row in reader:
+                line_number = reader.line_num
+                yield line_number, row
+        else:
+            for line_number, line in enumerate(text, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    yield line_number, json.loads(line)
+                except ValueError as e:
+                    yield line_number, e
+    except UnicodeDecodeError as e:
+        yield line_number + 1, RowStreamError(f"File is not UTF-8 encoded ({e.reason}); import stopped here")
+    except csv.Error as e:
+        yield line_number + 1, RowStreamError(f"Unreadable CSV ({e}); import stopped here")
+    finally:
+        # Leave the upload's file open for the framework to clean up
+        text.detach()
+
+def check_encoding(fileobj: BinaryIO) -> None:
+    """
+    Raise ValueError if the start of the file is not UTF-8, before any row is
+    imported; the file is rewound either way
+    """
+    head = fileobj.read(ENCODING_CHECK_BYTES)
+    fileobj.seek(0)
+    try:
+        # Not final: the check may cut a multi-byte character in two
+        codecs.getincrementaldecoder('utf-8')().decode(head, final=False)
+    except UnicodeDecodeError:
+        raise ValueError("File is not UTF-8 encoded; save it as CSV UTF-8 and try again")
+
+def parse_row(row: Any) -> Dict[str, Any]:
+    """
+    Validate a raw row against MoodCreate and keep its original created_at.
+    Raises ValueError (or pydantic's ValidationError) for invalid rows.
+    """
+    if isinstance(row, RowStreamError):
+        raise row
+    if isinstance(row, Exception):
+        raise ValueError(f"Invalid JSON: {row}")
+    if not isinstance(row, dict):
+        raise ValueError("Row must be an object")
+    # CSV cells are strings: empty means missing, custom_metrics is JSON
+    data = {k: (v if v != '' else None) for k, v in row.items() if k is not None}
+    if isinstance(data.get('custom_metrics'), str):
+        data['custom_metrics'] = json.loads(data['custom_metrics'])
+    created_at = data.pop('created_at', None)
+    entry = schemas.MoodCreate.model_validate(data).model_dump()
+    if created_at is not None:
+        if not isinstance(created_at, str):
+            raise ValueError("created_at must be an ISO 8601 string")
+        timestamp = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
+        if timestamp.tzinfo is None:
+            timestamp = timestamp.replace(tzinfo=timezone.utc)
+        entry['created_at'] = timestamp
+    return entry
+
+def _describe(error: Exception) -> str:
+    if isinstance(error, ValidationError):
+        return '; '.join(
+            f"{'.'.join(str(p) for p in e['loc']) or 'row'}: {e['msg']}" for e in error.errors()
+        )
+    return str(error)
+
+async def import_mood_file(user_id: str, fileobj: BinaryIO, fmt: str) -> Dict[str, Any]:
+    """
+    Import mood entries from a CSV or NDJSON file in batched writes.
+
+    Valid rows are committed in batches of MAX_BATCH_WRITES; invalid rows are
+    skipped and reported. A file that does not start as UTF-8 raises
+    ValueError before anything is written; one that stops decoding (or
+    parsing as CSV) later is imported up to that row, which is reported.
+    Returns a MoodImportReport-shaped dict.
+    """
+    check_encoding(fileobj)
+    imported = failed = 0
+    errors = []
+    pending = []
+    for line_number, row in iter_rows(fileobj, fmt):
+        try:
+            pending.append(parse_row(row))
+        except (ValidationError, ValueError) as e:
+            failed += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append({'row': line_number, 'error': _describe(e)})
+            continue
+        if len(pending) == MAX_BATCH_WRITES:
+            imported += await storage.create_mood_entries(user_id, pending)
+            pending = []
+    imported += await storage.create_mood_entries(user_id, pending)
+    return {'imported': imported, 'failed': failed, 'errors': errors}
@@ -0,0 +1,92 @@
+import math
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Dict, Iterable, Tuple
+from google.cloud.firestore import Increment, Maximum, Minimum
+
+# Per-user, per-day (UTC) aggregates of mood entries kept in the
+# mood_daily_rollups collection so charts read one document per day
+ROLLUP_COLLECTION = 'mood_daily_rollups'
+ROLLUP_METRICS = ('mood_level', 'energy_level', 'stress_level')
+
+def day_key(created_at: datetime) -> str:
+    """UTC calendar day of a timestamp as YYYY-MM-DD"""
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return created_at.astimezone(timezone.utc).date().isoformat()
+
+def day_bounds(day: str) -> Tuple[datetime, datetime]:
+    """[start, end) of a UTC day"""
+    start = datetime.combine(date.fromisoformat(day), time.min, tzinfo=timezone.utc)
+    return start, start + timedelta(days=1)
+
+def rollup_id(user_id: str, generation: int, day: str) -> str:
+    return f"{user_id}_{generation}_{day}"
+
+def _header(user_id: str, generation: int, day: str) -> Dict[str, Any]:
+    return {'user_id': user_id, 'generation': generation, 'day': day}
+
+def rollup_increments(user_id: str, generation: int, day: str, entries: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Merge-set payload adding entries (all on `day`) to the day's rollup with
+    field transforms, so it can be written blind in the same batch as the
+    entries themselves
+    """
+    totals = rollup_from_entries(user_id, generation, day, entries)
+    payload: Dict[str, Any] = {**_header(user_id, generation, day), 'count': Increment(totals['count'])}
+    for metric in ROLLUP_METRICS:
+        stats = totals[metric]
+        if stats['count']:
+            payload[metric] = {
+                'count': Increment(stats['count']),
+                'sum': Increment(stats['sum']),
+                'sum_sq': Increment(stats['sum_sq']),
+                'min': Minimum(stats['min']),
+                'max': Maximum(stats['max']),
+            }
+    return payload
+
+def empty_rollup(user_id: str, generation: int, day: str) -> Dict[str, Any]:
+    rollup: Dict[str, Any] = {**_header(user_id, generation, day), 'count': 0}
+    for metric in ROLLUP_METRICS:
+        rollup[metric] = {'count': 0, 'sum': 0, 'sum_sq': 0, 'min': None, 'max': None}
+    return rollup
+
+def add_entry(rollup: Dict[str, Any], entry: Dict[str, Any]) -> None:
+    """Fold one entry's metrics into a rollup in place"""
+    rollup['count'] += 1
+    for metric in ROLLUP_METRICS:
+        value = entry.get(metric)
+        if value is None:
+            continue
+        stats = rollup[metric]
+        stats['count'] += 1
+        stats['sum'] += value
+        stats['sum_sq'] += value * value
+        stats['min'] = value if stats['min'] is None else min(stats['min'], value)
+        stats['max'] = value if stats['max'] is None else max(stats['max'], value)
+
+def rollup_from_entries(user_id: str, generation: int, day: str, entries: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Full rollup document computed from raw entries of one day"""
+    rollup = empty_rollup(user_id, generation, day)
+    for entry in entries:
+        add_entry(rollup, entry)
+    return rollup
+
+def summarize(rollup: Dict[str, Any]) -> Dict[str, Any]:
+    """API representation of a rollup: mean/min/max/std per metric"""
+    result: Dict[str, Any] = {'date': rollup['day'], 'count': rollup.get('count', 0)}
+    for metric in ROLLUP_METRICS:
+        stats = rollup.get(metric) or {}
+        count = stats.get('count', 0)
+        if not count:
+            result[metric] = None
+            continue
+        mean = stats['sum'] / count
+        variance = max(stats['sum_sq'] / count - mean * mean, 0.0)
+        result[metric] = {
+            'mean': mean,
+            'min': stats['min'],
+            'max': stats['max'],
+            'std': math.sqrt(variance),
+        }
+    return result
@@ -0,0 +1,154 @@
+from array import array
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Tuple
+from zoneinfo import ZoneInfo
+import numpy as np
+
+METRICS = ('mood_level', 'energy_level', 'stress_level')
+
+SECONDS_PER_DAY = 86400
+
+async def load_columns(rows: AsyncIterator[Tuple[datetime, int, int, int]]) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """
+    Collect a stream of (created_at, mood, energy, stress) rows into columns:
+    int64 epoch seconds and one float64 array per metric
+    """
+    timestamps = array('q')
+    columns = {metric: array('d') for metric in METRICS}
+    async for created_at, *values in rows:
+        timestamps.append(int(created_at.timestamp()))
+        for metric, value in zip(METRICS, values):
+            columns[metric].append(value)
+    return (
+        np.frombuffer(timestamps, dtype=np.int64) if timestamps else np.empty(0, dtype=np.int64),
+        {m: np.frombuffer(c, dtype=np.float64) if c else np.empty(0) for m, c in columns.items()},
+    )
+
+def _utc_offset(epoch: int, tz: ZoneInfo) -> int:
+    return int(datetime.fromtimestamp(epoch, tz).utcoffset().total_seconds())
+
+def offset_transitions(start: int, end: int, tz: ZoneInfo) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    The UTC offsets in force between two epoch seconds, as (since, offset)
+    arrays: offset[i] applies from since[i] (since[0] is start) until the
+    next entry.
+
+    The zone is sampled once a day and each change is bisected to the
+    second, so the cost follows the length of the range, not the number of
+    entries; zones never change offset twice within a day.
+    """
+    since, offsets = [start], [_utc_offset(start, tz)]
+    edges = list(range(start, end, SECONDS_PER_DAY)) + [end]
+    for lo, hi in zip(edges, edges[1:]):
+        after = _utc_offset(hi, tz)
+        if after == offsets[-1]:
+            continue
+        # First second of the new offset within (lo, hi]
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            if _utc_offset(mid, tz) == offsets[-1]:
+                lo = mid
+            else:
+                hi = mid
+        since.append(hi)
+        offsets.append(after)
+    return np.array(since, dtype=np.int64), np.array(offsets, dtype=np.int64)
+
+def local_days(timestamps: np.ndarray, tz: ZoneInfo) -> np.ndarray:
+    """
+    Map UTC epoch seconds to local calendar days (days since 1970-01-01),
+    looking every timestamp's offset up in the zone's transitions over the
+    range with one searchsorted
+    """
+    if not timestamps.size:
+        return np.empty(0, dtype=np.int64)
+    since, offsets = offset_transitions(int(timestamps.min()), int(timestamps.max()), tz)
+    offset = offsets[np.searchsorted(since, timestamps, side='right') - 1]
+    return (timestamps + offset) // SECONDS_PER_DAY
+
+def _summarize(keys: np.ndarray, values: Dict[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray, Dict[str, Dict[str, np.ndarray]]]:
+    buckets, inverse = np.unique(keys, return_inverse=True)
+    counts = np.bincount(inverse, minlength=buckets.size)
+    summary = {}
+    for metric, column in values.items():
+        mins = np.full(buckets.size, np.inf)
+        maxs = np.full(buckets.size, -np.inf)
+        np.minimum.at(mins, inverse, column)
+        np.maximum.at(maxs, inverse, column)
+        summary[metric] = {
+            'mean': np.bincount(inverse, weights=column, minlength=buckets.size) / counts,
+            'min': mins,
+            'max': maxs,
+        }
+    return buckets, counts, summary
+
+def _buckets(labels: List[str], counts: np.ndarray, summary: Dict[str, Dict[str, np.ndarray]]) -> List[Dict[str, Any]]:
+    stats = {
+        metric: {name: column.tolist() for name, column in parts.items()}
+        for metric, parts in summary.items()
+    }
+    return [
+        {
+            'period': label,
+            'count': int(counts[i]),
+            **{
+                metric: {name: stats[metric][name][i] for name in ('mean', 'min', 'max')}
+                for metric in stats
+            },
+        }
+        for i, label in enumerate(labels)
+    ]
+
+def _rolling(days: np.ndarray, values: Dict[str, np.ndarray], window: int) -> List[Dict[str, Any]]:
+    """Trailing `window`-day average per calendar day, over all entries in that window"""
+    first = int(days.min())
+    span = int(days.max()) - first + 1
+    offsets = days - first
+    counts = np.bincount(offsets, minlength=span)
+    padded_counts = np.concatenate(([0], np.cumsum(counts)))
+    starts = np.maximum(np.arange(span) - window + 1, 0)
+    window_counts = padded_counts[1:] - padded_counts[starts]
+    has_data = window_counts > 0
+    averages = {}
+    for metric, column in values.items():
+        sums = np.concatenate(([0.0], np.cumsum(np.bincount(offsets, weights=column, minlength=span))))
+        averages[metric] = ((sums[1:] - sums[starts])[has_data] / window_counts[has_data]).tolist()
+    dates = (np.flatnonzero(has_data) + first).astype('datetime64[D]').astype(str).tolist()
+    return [
+        {'date': date, **{metric: averages[metric][i] for metric in averages}}
+        for i, date in enumerate(dates)
+    ]
+
+def compute_mood_stats(timestamps: np.ndarray, values: Dict[str, np.ndarray], tz: ZoneInfo,
+                       window: int = 7) -> Dict[str, Any]:
+    """
+    Per-day, per-week (ISO, starting Monday) and per-month mean/min/max of
+    each metric, bucketed in the user's timezone, plus a trailing rolling
+    average per day. All aggregation is vectorized over the columns.
+    """
+    result: Dict[str, Any] = {
+        'timezone': tz.key,
+        'count': int(timestamps.size),
+        'rolling_window_days': window,
+        'daily': [],
+        'weekly': [],
+        'monthly': [],
+        'rolling': [],
+    }
+    if not timestamps.size:
+        return result
+
+    days = local_days(timestamps, tz)
+    # 1970-01-01 was a Thursday: shift so weeks start on Monday
+    weeks = days - (days + 3) % 7
+    months = days.astype('datetime64[D]').astype('datetime64[M]')
+
+    for name, keys in (('daily', days), ('weekly', weeks)):
+        buckets, counts, summary = _summarize(keys, values)
+        labels = buckets.astype('datetime64[D]').astype(str).tolist()
+        result[name] = _buckets(labels, counts, summary)
+    buckets, counts, summary = _summarize(months.astype(np.int64), values)
+    labels = buckets.astype('datetime64[M]').astype(str).tolist()
+    result['monthly'] = _buckets(labels, counts, summary)
+    result['rolling'] = _rolling(days, values, window)
+    return result
@@ -0,0 +1,576 @@
+import asyncio
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from sqlalchemy import and_, delete, distinct, func, insert, or_, select
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+from app import models
+from app.core.config import settings
+from app.core.pagination import encode_cursor, decode_cursor
+from app.database import Base, get_engine
+from app.services import mood_rollups
+from app.services.base import (
+    StorageBackend, materialize, merge_fields, parse_appointment_date,
+    DEFAULT_USER_SETTINGS, SYNC_CLOCK_MARGIN, TOMBSTONE_RETENTION
+)
+
+# Synced collection name -> model
+_SYNC_MODELS = {
+    'mood_entries': models.MoodEntry,
+    'emergency_contacts': models.EmergencyContact,
+    'therapist_tasks': models.TherapistTask,
+    'appointments': models.Appointment,
+}
+
+# Settings stored in their own columns; any other key goes to UserSettings.extra
+_SETTINGS_COLUMNS = ('theme', 'language')
+
+def _utc(value: datetime) -> datetime:
+    """Aware UTC datetime; naive values (as SQLite returns them) are UTC"""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+def _new_id() -> str:
+    return str(uuid.uuid4())
+
+def _document(row) -> Dict[str, Any]:
+    """API representation of a model instance, shaped like a Firestore document"""
+    data = {column.key: getattr(row, column.key) for column in row.__table__.columns}
+    doc_id = data.pop('id', None) or data['user_id']
+    return materialize(doc_id, data)
+
+def _fields(model, data: Dict[str, Any]) -> Dict[str, Any]:
+    """The keys of data that are columns of model"""
+    columns = model.__table__.columns
+    return {key: value for key, value in data.items() if key in columns}
+
+def _settings_document(user_id: str, row: Optional[models.UserSettings]) -> Dict[str, Any]:
+    data: Dict[str, Any] = {}
+    if row is not None:
+        data.update(row.extra or {})
+        data.update({key: getattr(row, key) for key in _SETTINGS_COLUMNS if getattr(row, key) is not None})
+        if row.updated_at is not None:
+            data['updated_at'] = row.updated_at
+    return materialize(user_id, {**DEFAULT_USER_SETTINGS, **data})
+
+class SQLService(StorageBackend):
+    """
+    StorageBackend over SQLAlchemy async: Postgres (asyncpg) or SQLite
+    (aiosqlite), using the models in app.models.
+
+    Ordering, ranges and aggregation run in the database, so there are no
+    stored daily rollups and a history clear is purged with one DELETE.
+    """
+
+    def __init__(self, engine: Optional[AsyncEngine] = None):
+        self.engine = engine or get_engine()
+        self._sessions = async_sessionmaker(self.engine, class_=AsyncSession, expire_on_commit=False)
+        self._tables_ready = not settings.SQL_CREATE_TABLES
+        self._tables_lock = asyncio.Lock()
+
+    async def create_tables(self) -> None:
+        """Create missing tables (idempotent)"""
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        self._tables_ready = True
+
+    async def warm_up(self) -> None:
+        """Create missing tables and open a first pooled connection"""
+        async with self._session() as session:
+            await session.connection()
+
+    async def close(self) -> None:
+        await self.engine.dispose()
+
+    @asynccontextmanager
+    async def _session(self) -> AsyncIterator[AsyncSession]:
+        if not self._tables_ready:
+            async with self._tables_lock:
+                if not self._tables_ready:
+                    await self.create_tables()
+        async with self._sessions() as session:
+            yield session
+
+    async def _generation(self, session: AsyncSession, user_id: str) -> int:
+        generation = await session.scalar(
+            select(models.UserSettings.mood_history_generation)
+            .where(models.UserSettings.user_id == user_id)
+        )
+        return generation or 0
+
+    def _current_moods(self, user_id: str, generation: int):
+        MoodEntry = models.MoodEntry
+        return select(MoodEntry).where(MoodEntry.user_id == user_id, MoodEntry.generation == generation)
+
+    async def _tombstone(self, session: AsyncSession, collection: str, doc_id: str, user_id: str) -> None:
+        """Record a deletion for delta sync in the deleting transaction, dropping expired ones"""
+        Tombstone = models.SyncTombstone
+        now = _now()
+        await session.execute(
+            delete(Tombstone).where(Tombstone.user_id == user_id, Tombstone.deleted_at < now - TOMBSTONE_RETENTION)
+        )
+        await session.merge(Tombstone(
+            id=f"{collection}_{doc_id}",
+            user_id=user_id,
+            collection=collection,
+            doc_id=doc_id,
+            deleted_at=now,
+        ))
+
+    async def _settings_row(self, session: AsyncSession, user_id: str) -> models.UserSettings:
+        row = await session.get(models.UserSettings, user_id, with_for_update=True)
+        if row is None:
+            row = models.UserSettings(user_id=user_id, mood_history_generation=0)
+            session.add(row)
+        return row
+
+    # Mood Entries
+    async def get_mood_entries(self, user_id: str, skip: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+        """Get all mood entries for a user"""
+        MoodEntry = models.MoodEntry
+        async with self._session() as session:
+            query = (
+                self._current_moods(user_id, await self._generation(session, user_id))
+                .order_by(MoodEntry.created_at.desc(), MoodEntry.id.desc())
+                .offset(skip)
+                .limit(limit)
+            )
+            return [_document(row) for row in await session.scalars(query)]
+
+    async def get_mood_entries_page(
+        self, user_id: str, limit: int = 100, cursor: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Get one page of mood entries, newest first, using keyset pagination.
+        Raises ValueError if cursor is malformed.
+        """
+        MoodEntry = models.MoodEntry
+        async with self._session() as session:
+            query = (
+                self._current_moods(user_id, await self._generation(session, user_id))
+                .order_by(MoodEntry.created_at.desc(), MoodEntry.id.desc())
+            )
+            if cursor:
+                created_at, doc_id = decode_cursor(cursor)
+                created_at = _utc(created_at)
+                query = query.where(or_(
+                    MoodEntry.created_at < created_at,
+                    and_(MoodEntry.created_at == created_at, MoodEntry.id < doc_id)
+                ))
+            # Read one extra row to know whether another page exists
+            results = [_document(row) for row in await session.scalars(query.limit(limit + 1))]
+        if len(results) <= limit:
+            return results, None
+        results = results[:limit]
+        last = results[-1]
+        return results, encode_cursor(last['created_at'], last['id'])
+
+    async def create_mood_entry(self, user_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Create a new mood entry and return it as stored"""
+        now = _now()
+        async with self._session() as session, session.begin():
+            entry = models.MoodEntry(
+                **_fields(models.MoodEntry, data),
+                id=_new_id(),
+                user_id=user_id,
+                generation=await self._generation(session, user_id),
+                created_at=now,
+                updated_at=now
+            )
+            session.add(entry)
+        return _document(entry)
+
+    async def create_mood_entries(self, user_id: str, entries: List[Dict[str, Any]]) -> int:
+        """Create mood entries in one multi-row insert, keeping each one's created_at"""
+        if not entries:
+            return 0
+        now = _now()
+        async with self._session() as session, session.begin():
+            generation = await self._generation(session, user_id)
+            rows = [
+                {
+                    **_fields(models.MoodEntry, data),
+                    'id': _new_id(),
+                    'user_id': user_id,
+                    'generation': generation,
+                    'created_at': _utc(data.get('created_at') or now),
+                    'updated_at': now,
+                }
+                for data in entries
+            ]
+            await session.execute(insert(models.MoodEntry), rows)
+        return len(rows)
+
+    async def delete_mood_entry(self, user_id: str, entry_id: str) -> bool:
+        """Delete one mood entry; False if it does not exist or belongs to another user"""
+        MoodEntry = models.MoodEntry
+        async with self._session() as session, session.begin():
+            result = await session.execute(
+                delete(MoodEntry).where(MoodEntry.id == entry_id, MoodEntry.user_id == user_id)
+            )
+            if not result.rowcount:
+                return False
+            await self._tombstone(session, 'mood_entries', entry_id, user_id)
+        return True
+
+    async def get_mood_daily_rollups(self, user_id: str, start_day: str, end_day: str) -> List[Dict[str, Any]]:
+        """
+        Get per-day (UTC) mood aggregates for start_day..end_day inclusive
+        (YYYY-MM-DD), computed with one GROUP BY
+        """
+        MoodEntry = models.MoodEntry
+        day = func.date(MoodEntry.created_at)
+        columns = [day.label('day'), func.count()]
+        for metric in mood_rollups.ROLLUP_METRICS:
+            value = getattr(MoodEntry, metric)
+            columns += [func.count(value), func.sum(value), func.sum(value * value), func.min(value), func.max(value)]
+        start, _ = mood_rollups.day_bounds(start_day)
+        _, end = mood_rollups.day_bounds(end_day)
+        async with self._session() as session:
+            generation = await self._generation(session, user_id)
+            rows = await session.execute(
+                select(*columns)
+                .where(
+                    MoodEntry.user_id == user_id,
+                    MoodEntry.generation == generation,
+                    MoodEntry.created_at >= start,
+                    MoodEntry.created_at < end
+                )
+                .group_by(day)
+                .order_by(day)
+            )
+        results = []
+        for row in rows:
+            rollup = {'day': str(row[0]), 'count': row[1]}
+            for i, metric in enumerate(mood_rollups.ROLLUP_METRICS):
+                count, total, total_sq, low, high = row[2 + i * 5:7 + i * 5]
+                rollup[metric] = {'count': count, 'sum': total, 'sum_sq': total_sq, 'min': low, 'max': high}
+            results.append(mood_rollups.summarize(rollup))
+        return results
+
+    async def rebuild_mood_rollups(self, user_id: str) -> int:
+        """Nothing is stored: daily aggregates are computed on read. Returns the number of days."""
+        MoodEntry = models.MoodEntry
+        async with self._session() as session:
+            generation = await self._generation(session, user_id)
+            return await session.scalar(
+                select(func.count(distinct(func.date(MoodEntry.created_at))))
+                .where(MoodEntry.user_id == user_id, MoodEntry.generation == generation)
+            )
+
+    async def stream_mood_metrics(
+        self, user_id: str, start: Optional[datetime] = None, end: Optional[datetime] = None
+    ) -> AsyncIterator[Tuple[datetime, int, int, int]]:
+        """
+        Stream (created_at, mood_level, energy_level, stress_level) of the
+        user's current mood entries with start <= created_at < end
+        """
+        MoodEntry = models.MoodEntry
+        async with self._session() as session:
+            query = (
+                select(MoodEntry.created_at, MoodEntry.mood_level, MoodEntry.energy_level, MoodEntry.stress_level)
+                .where(MoodEntry.user_id == user_id, MoodEntry.generation == await self._generation(session, user_id))
+            )
+            if start:
+                query = query.where(MoodEntry.created_at >= _utc(start))
+            if end:
+                query = query.where(MoodEntry.created_at < _utc(end))
+            result = await session.stream(query.execution_options(yield_per=1000))
+            async for created_at, mood, energy, stress in result:
+                yield _utc(created_at), mood, energy, stress
+
+    async def get_mood_generation(self, user_id: str) -> int:
+        """Get the user's current mood history generation (0 if never cleared)"""
+        async with self._session() as session:
+            return await self._generation(session, user_id)
+
+    async def clear_mood_history(self, user_id: str) -> int:
+        """
+        Logically delete all mood entries for a user by bumping the history
+        generation; purge_superseded_mood_entries() deletes the rows
+        """
+        now = _now()
+        async with self._session() as session, session.begin():
+            row = await self._settings_row(session, user_id)
+            generation = (row.mood_history_generation or 0) + 1
+            row.mood_history_generation = generation
+            row.mood_history_cleared_at = now
+            row.mood_history_gc = {
+                'generation': generation,
+                'status': 'pending',
+                'deleted': 0,
+                'last_doc_id': None,
+                'updated_at': now.isoformat(),
+            }
+        return generation
+
+    async def get_mood_history_gc_status(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Get progress of the purge started by the last clear (None if never cleared)"""
+        async with self._session() as session:
+            return await session.scalar(
+                select(models.UserSettings.mood_history_gc)
+                .where(models.UserSettings.user_id == user_id)
+            )
+
+    async def purge_superseded_mood_entries(
+        self, user_id: str, batch_size: int = 500, max_batches: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Delete mood entries from cleared generations. A single DELETE does
+        it, so batch_size and max_batches are not needed here.
+        """
+        MoodEntry = models.MoodEntry
+        async with self._session() as session, session.begin():
+            row = await session.get(models.UserSettings, user_id, with_for_update=True)
+            generation = row.mood_history_generation if row else 0
+            progress = dict(row.mood_history_gc or {}) if row else {}
+            if progress.get('generation') != generation:
+                progress = {'generation': generation, 'deleted': 0, 'last_doc_id': None}
+            if progress.get('status') == 'done' or not generation:
+                return progress
+            result = await session.execute(
+                delete(MoodEntry).where(MoodEntry.user_id == user_id, MoodEntry.generation != generation)
+            )
+            progress['deleted'] = progress.get('deleted', 0) + result.rowcount
+            progress['status'] = 'done'
+            progress['updated_at'] = _now().isoformat()
+            row.mood_history_gc = progress
+        return progress
+
+    # User Settings
+    async def get_user_settings(self, user_id: str) -> Dict[str, Any]:
+        """Get user settings; defaults (not written) if the user never saved any"""
+        async with self._session() as session:
+            return _settings_document(user_id, await session.get(models.UserSettings, user_id))
+
+    async def update_user_settings(self, user_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Update user settings"""
+        async with self._session() as session, session.begin():
+            row = await self._settings_row(session, user_id)
+            extra = dict(row.extra or {})
+            for key, value in data.items():
+                if key in _SETTINGS_COLUMNS:
+                    setattr(row, key, value)
+                elif key not in models.UserSettings.__table__.columns:
+                    extra = merge_fields(extra, {key: value})
+            row.extra = extra
+            row.updated_at = _now()
+        return _settings_document(user_id, row)
+
+    async def get_user_documents(self, user_id: str) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Get the user's settings (defaults if missing) and therapist info (None if missing)"""
+        async with self._session() as session:
+            settings_row = await session.get(models.UserSettings, user_id)
+            therapist_row = await session.get(models.TherapistInfo, user_id)
+        return {
+            'user_settings': _settings_document(user_id, settings_row),
+            'therapist_info': _document(therapist_row) if therapist_row else None,
+        }
+
+    async def _list(self, model, user_id: str, order_by, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        query = select(model).where(model.user_id == user_id).order_by(order_by)
+        if limit:
+            query = query.limit(limit)
+        async with self._session() as session:
+            return [_document(row) for row in await session.scalars(query)]
+
+    async def _create(self, model, user_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        now = _now()
+        row = model(**{**_fields(model, data), 'id': _new_id(), 'user_id': user_id, 'created_at': now, 'updated_at': now})
+        async with self._session() as session, session.begin():
+            session.add(row)
+        return _document(row)
+
+    # Emergency Contacts
+    async def get_emergency_contacts(self, user_id: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Get a user's emergency contacts, newest first, at most limit"""
+        return await self._list(models.EmergencyContact, user_id, models.EmergencyContact.created_at.desc(), limit)
+
+    async def create_emergency_contact(self, user_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Create a new emergency contact and return it as stored"""
+        return await self._create(models.EmergencyContact, user_id, data)
+
+    async def delete_emergency_contact(self, user_id: str, contact_id: str) -> bool:
+        """Delete an emergency contact; False if it does not exist or belongs to another user"""
+        Contact = models.EmergencyContact
+        async with self._session() as session, session.begin():
+            result = await session.execute(
+                delete(Contact).where(Contact.id == contact_id, Contact.user_id == user_id)
+            )
+            if not result.rowcount:
+                return False
+            await self._tombstone(session, 'emergency_contacts', contact_id, user_id)
+        return True
+
+    # Therapist Info
+    async def get_therapist_info(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Get therapist info for a user"""
+        async with self._session() as session:
+            row = await session.get(models.TherapistInfo, user_id)
+        return _document(row) if row else None
+
+    async def update_therapist_info(self, user_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Update therapist info"""
+        async with self._session() as session, session.begin():
+            row = await session.get(models.TherapistInfo, user_id, with_for_update=True)
+            if row is None:
+                row = models.TherapistInfo(user_id=user_id)
+                session.add(row)
+            for key, value in _fields(models.TherapistInfo, data).items():
+                setattr(row, key, value)
+            row.updated_at = _now()
+        return _document(row)
+
+    # Therapist Tasks
+    async def get_therapist_tasks(self, user_id: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Get a user's therapist tasks, newest first, at most limit"""
+        return await self._list(models.TherapistTask, user_id, models.TherapistTask.created_at.desc(), limit)
+
+    async def get_therapist_tasks_page(
+        self,
+        user_id: str,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        is_completed: Optional[bool] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Get one page of therapist tasks, newest first, optionally only open or
+        only completed ones, using keyset pagination.
+        Raises ValueError if cursor is malformed.
+        """
+        Task = models.TherapistTask
+        query = select(Task).where(Task.user_id == user_id).order_by(Task.created_at.desc(), Task.id.desc())
+        if is_completed is not None:
+            query = query.where(Task.is_completed == is_completed)
+        if cursor:
+            created_at, doc_id = decode_cursor(cursor)
+            created_at = _utc(created_at)
+            query = query.where(or_(
+                Task.created_at < created_at,
+                and_(Task.created_at == created_at, Task.id < doc_id)
+            ))
+        async with self._session() as session:
+            # Read one extra row to know whether another page exists
+            results = [_document(row) for row in await session.scalars(query.limit(limit + 1))]
+        if len(results) <= limit:
+            return results, None
+        results = results[:limit]
+        last = results[-1]
+        return results, encode_cursor(last['created_at'], last['id'])
+
+    async def count_therapist_tasks(self, user_id: str) -> Dict[str, int]:
+        """Count a user's open and completed therapist tasks"""
+        Task = models.TherapistTask
+        async with self._session() as session:
+            rows = await session.execute(
+                select(Task.is_completed, func.count()).where(Task.user_id == user_id).group_by(Task.is_completed)
+            )
+            counts = {bool(is_completed): count for is_completed, count in rows}
+        return {'open': counts.get(False, 0), 'completed': counts.get(True, 0)}
+
+    async def create_therapist_task(self, user_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Create a new therapist task and return it as stored"""
+        return await self._create(models.TherapistTask, user_id, {'is_completed': False, **data})
+
+    async def update_therapist_task(
+        self, user_id: str, task_id: str, data: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Update a therapist task and return it; None if it does not exist or
+        belongs to another user
+        """
+        async with self._session() as session, session.begin():
+            row = await session.get(models.TherapistTask, task_id, with_for_update=True)
+            if row is None or row.user_id != user_id:
+                return None
+            if data:
+                for key, value in _fields(models.TherapistTask, data).items():
+                    setattr(row, key, value)
+                row.updated_at = _now()
+        return _document(row)
+
+    # Appointments
+    async def get_appointments(
+        self,
+        user_id: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        limit: Optional[int] = None,
+        ascending: bool = False
+    ) -> List[Dict[str, Any]]:
+        """Get a user's appointments with start <= date < end, latest date first unless ascending"""
+        Appointment = models.Appointment
+        query = select(Appointment).where(Appointment.user_id == user_id)
+        if start:
+            query = query.where(Appointment.date >= _utc(start))
+        if end:
+            query = query.where(Appointment.date < _utc(end))
+        query = query.order_by(Appointment.date.asc() if ascending else Appointment.date.desc())
+        if limit:
+            query = query.limit(limit)
+        async with self._session() as session:
+            return [_document(row) for row in await session.scalars(query)]
+
+    async def create_appointment(self, user_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Create a new appointment and return it as stored.
+        Raises ValueError if the date is not ISO 8601.
+        """
+        return await self._create(models.Appointment, user_id, {**data, 'date': parse_appointment_date(data['date'])})
+
+    # Delta Sync
+    async def get_changes(self, user_id: str, since: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Get the user's rows created, updated or deleted after `since`, in the
+        same shape as FirestoreService.get_changes
+        """
+        synced_at = _now() - SYNC_CLOCK_MARGIN
+        since = _utc(since) if since else None
+        if since and since < synced_at - TOMBSTONE_RETENTION:
+            since = None
+        async with self._session() as session:
+            settings_row = await session.get(models.UserSettings, user_id)
+            therapist_row = await session.get(models.TherapistInfo, user_id)
+            generation = settings_row.mood_history_generation if settings_row else 0
+            cleared_at = settings_row.mood_history_cleared_at if settings_row else None
+            reset = ['mood_entries'] if since and cleared_at and _utc(cleared_at) > since else []
+
+            changes: Dict[str, Any] = {}
+            for collection, model in _SYNC_MODELS.items():
+                query = select(model).where(model.user_id == user_id)
+                if model is models.MoodEntry:
+                    query = query.where(model.generation == generation)
+                if since and collection not in reset:
+                    query = query.where(model.updated_at > since)
+                changes[collection] = [_document(row) for row in await session.scalars(query)]
+            deleted = []
+            if since:
+                Tombstone = models.SyncTombstone
+                tombstones = await session.scalars(
+                    select(Tombstone).where(Tombstone.user_id == user_id, Tombstone.deleted_at > since)
+                )
+                deleted = [
+                    {'collection': t.collection, 'id': t.doc_id, 'deleted_at': _utc(t.deleted_at).isoformat()}
+                    for t in tombstones
+                ]
+
+        def changed(row) -> bool:
+            return row is not None and (not since or (row.updated_at is not None and _utc(row.updated_at) > since))
+
+        return {
+            'full': since is None,
+            'reset': reset,
+            **changes,
+            'user_settings': (
+                _settings_document(user_id, settings_row)
+                if since is None or changed(settings_row) else None
+            ),
+            'therapist_info': _document(therapist_row) if changed(therapist_row) else None,
+            'deleted': deleted,
+            'synced_at': synced_at,
+        }
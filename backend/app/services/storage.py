@@ -0,0 +1,16 @@
+from app.core.config import settings
+from app.services.base import StorageBackend
+
+def create_storage(backend: str = None) -> StorageBackend:
+    """Storage backend selected by settings.STORAGE_BACKEND ("firestore" or "sql")"""
+    backend = (backend or settings.STORAGE_BACKEND).lower()
+    if backend == 'sql':
+        from app.services.sql_service import SQLService
+        return SQLService()
+    if backend == 'firestore':
+        from app.services.firestore_service import firestore_service
+        return firestore_service
+    raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
+
+# Instance used by the API endpoints
+storage: StorageBackend = create_storage()
@@ -0,0 +1,84 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+from firebase_admin import auth as firebase_auth
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.firebase import get_app
+
+class UserRecordService:
+    """
+    Cached Firebase Auth user-record lookups.
+
+    The Admin SDK calls are blocking HTTP requests, so they run on a bounded
+    thread pool. Records are cached by uid and by email with a short TTL, and
+    UserNotFoundError is cached for a shorter negative TTL. Concurrent lookups
+    of the same key share one remote call.
+    """
+
+    def __init__(self):
+        self.by_uid = TTLCache(maxsize=settings.USER_RECORD_CACHE_SIZE, ttl=settings.USER_RECORD_CACHE_TTL)
+        self.by_email = TTLCache(maxsize=settings.USER_RECORD_CACHE_SIZE, ttl=settings.USER_RECORD_CACHE_TTL)
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.AUTH_LOOKUP_WORKERS,
+            thread_name_prefix='firebase-auth'
+        )
+        self._inflight: Dict[Any, asyncio.Future] = {}
+
+    async def get_user(self, uid: str) -> firebase_auth.UserRecord:
+        """Get a user record by uid (raises firebase_auth.UserNotFoundError)"""
+        return await self._lookup(self.by_uid, uid, firebase_auth.get_user)
+
+    async def get_user_by_email(self, email: str) -> firebase_auth.UserRecord:
+        """Get a user record by email (raises firebase_auth.UserNotFoundError)"""
+        return await self._lookup(self.by_email, email.strip().lower(), firebase_auth.get_user_by_email)
+
+    def invalidate(self, uid: Optional[str] = None, email: Optional[str] = None) -> None:
+        """Drop cached records, e.g. after creating, updating or disabling a user"""
+        if uid:
+            record = self.by_uid.pop(uid)
+            if isinstance(record, firebase_auth.UserRecord) and record.email:
+                self.by_email.pop(record.email.lower())
+        if email:
+            record = self.by_email.pop(email.strip().lower())
+            if isinstance(record, firebase_auth.UserRecord):
+                self.by_uid.pop(record.uid)
+
+    def remember(self, record: firebase_auth.UserRecord) -> None:
+        """Populate both indexes from a record obtained elsewhere"""
+        self.by_uid.set(record.uid, record)
+        if record.email:
+            self.by_email.set(record.email.lower(), record)
+
+    async def _lookup(self, cache: TTLCache, key: str, fetch: Callable[[str], Any]) -> firebase_auth.UserRecord:
+        cached = cache.get(key)
+        if isinstance(cached, firebase_auth.UserNotFoundError):
+            raise cached
+        if cached is not None:
+            return cached
+
+        inflight_key = (id(cache), key)
+        future = self._inflight.get(inflight_key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self._executor, self._fetch, fetch, key)
+            self._inflight[inflight_key] = future
+            try:
+                record = await asyncio.shield(future)
+            except firebase_auth.UserNotFoundError as e:
+                cache.set(key, e, ttl=settings.USER_RECORD_NEGATIVE_TTL)
+                raise
+            finally:
+                self._inflight.pop(inflight_key, None)
+            self.remember(record)
+            return record
+        return await asyncio.shield(future)
+
+    @staticmethod
+    def _fetch(fetch: Callable[[str], Any], key: str) -> firebase_auth.UserRecord:
+        # Firebase is initialized lazily; make sure it is before the SDK call
+        get_app()
+        return fetch(key)
+
+# Singleton instance
+user_record_service = UserRecordService()
@@ -0,0 +1,90 @@
+"""
+Requests/sec of the API against an in-memory Firestore stand-in
+
+Runs the real FastAPI app in-process (httpx ASGI transport) with the
+FirestoreService pointed at benchmarks.fake_firestore, and fires N requests
+at a fixed concurrency. Two modes are compared:
+
+- blocking: each Firestore RPC blocks the event loop for --latency-ms
+  (the old sync-client data path)
+- async: each Firestore RPC awaits for --latency-ms (AsyncClient data path)
+
+Usage (from backend/):
+    python -m benchmarks.bench_concurrency --concurrency 50 --requests 1000
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from app.api import deps
+from app.main import app
+from app.services.firestore_service import firestore_service
+from benchmarks.fake_firestore import FakeAsyncClient
+
+USER_ID = 'bench-user'
+
+
+async def _fake_current_user() -> dict:
+    return {'id': USER_ID, 'email': 'bench@example.com', 'is_active': True}
+
+
+async def _seed(entries: int) -> None:
+    for i in range(entries):
+        await firestore_service.create_mood_entry(USER_ID, {
+            'mood_level': i % 10 + 1,
+            'energy_level': (i * 3) % 10 + 1,
+            'stress_level': (i * 7) % 10 + 1,
+            'note': f'entry {i}',
+            'custom_metrics': None,
+        })
+
+
+async def run_mode(blocking: bool, args: argparse.Namespace) -> float:
+    firestore_service.db = FakeAsyncClient()
+    await _seed(args.entries)
+    firestore_service.db.latency = args.latency_ms / 1000
+    firestore_service.db.blocking = blocking
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://bench') as client:
+        async def one_request() -> None:
+            async with semaphore:
+                response = await client.get('/api/v1/moods/', params={'limit': args.limit})
+                response.raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one_request() for _ in range(args.requests)))
+        elapsed = time.perf_counter() - started
+    return args.requests / elapsed
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description='Benchmark API throughput against a Firestore stand-in')
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--latency-ms', type=float, default=5.0, help='Simulated Firestore round trip')
+    parser.add_argument('--entries', type=int, default=200, help='Mood entries seeded for the user')
+    parser.add_argument('--limit', type=int, default=50, help='Page size requested from GET /moods')
+    args = parser.parse_args()
+
+    app.dependency_overrides[deps.get_current_user] = _fake_current_user
+    original_client = firestore_service.db
+    try:
+        before = await run_mode(True, args)
+        after = await run_mode(False, args)
+    finally:
+        firestore_service.db = original_client
+        app.dependency_overrides.clear()
+
+    print(f"GET /moods  concurrency={args.concurrency}  requests={args.requests}  "
+          f"latency={args.latency_ms}ms")
+    print(f"  blocking (sync client): {before:10.1f} req/s")
+    print(f"  async (AsyncClient):    {after:10.1f} req/s")
+    print(f"  speedup:                {after / before:10.1f}x")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,93 @@
+"""
+Serialization time and bytes on the wire for a mood history response
+
+Encodes N mood entries (as GET /moods returns them) the ways FastAPI can:
+
+- pydantic: response model dumped straight to JSON bytes (FastAPI's path
+  when no response class is set)
+- stdlib: response model dumped to Python, then json.dumps (JSONResponse)
+- orjson: response model dumped to Python, then orjson (ORJSONResponse)
+
+and reports the size of the body raw, gzipped and brotli-compressed with
+the levels configured for CompressionMiddleware.
+
+Usage (from backend/):
+    python -m benchmarks.bench_serialization --entries 1000
+"""
+import argparse
+import gzip
+import json
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, List
+
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from app import schemas
+from app.core.config import settings
+from app.core.compression import brotli
+from app.core.responses import ORJSONResponse, orjson
+
+
+def mood_history(entries: int) -> List[dict]:
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    return [
+        {
+            'id': f'{i:020d}',
+            'user_id': 'bench-user-0123456789abcdef',
+            'mood_level': i % 10 + 1,
+            'energy_level': (i * 3) % 10 + 1,
+            'stress_level': (i * 7) % 10 + 1,
+            'note': f'entry {i}' if i % 3 else None,
+            'custom_metrics': {'sleep_hours': 7 + i % 3} if i % 5 == 0 else None,
+            'created_at': (start + timedelta(hours=i * 7)).isoformat(),
+        }
+        for i in range(entries)
+    ]
+
+
+def timed(fn: Callable[[], bytes], repeat: int) -> tuple:
+    body = fn()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return body, (time.perf_counter() - started) / repeat * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Benchmark JSON encoding and compression of GET /moods')
+    parser.add_argument('--entries', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    entries = mood_history(args.entries)
+    adapter = TypeAdapter(List[schemas.Mood])
+
+    encoders = {
+        'pydantic': lambda: adapter.dump_json(adapter.validate_python(entries)),
+        'stdlib': lambda: JSONResponse(adapter.dump_python(adapter.validate_python(entries), mode='json')).body,
+    }
+    if orjson is not None:
+        encoders['orjson'] = lambda: ORJSONResponse(
+            adapter.dump_python(adapter.validate_python(entries), mode='json')
+        ).body
+
+    print(f"GET /moods body for {args.entries} entries (mean of {args.repeat} runs)")
+    body = b''
+    for name, encode in encoders.items():
+        body, ms = timed(encode, args.repeat)
+        print(f"  encode {name:<9} {ms:8.2f} ms  {len(body):>9,} bytes")
+
+    compressors = {'gzip': lambda: gzip.compress(body, compresslevel=settings.GZIP_LEVEL)}
+    if brotli is not None:
+        compressors['br'] = lambda: brotli.compress(body, quality=settings.BROTLI_QUALITY)
+    for name, compress in compressors.items():
+        compressed, ms = timed(compress, args.repeat)
+        print(f"  {name:<16} {ms:8.2f} ms  {len(compressed):>9,} bytes  "
+              f"({len(compressed) / len(body):.0%} of raw)")
+    assert json.loads(body) == json.loads(encoders['pydantic']())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,542 @@
+"""
+In-memory stand-in for google.cloud.firestore.AsyncClient
+
+Implements the subset of the async client API that FirestoreService uses so
+the data layer can be benchmarked without a Firestore project or emulator.
+Every RPC can be given an artificial round-trip latency:
+
+- blocking=False: latency is spent in asyncio.sleep (AsyncClient behaviour)
+- blocking=True: latency is spent in time.sleep, which models the sync Client
+  being called from inside an async endpoint (the event loop is blocked)
+"""
+import asyncio
+import copy
+import itertools
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from google.cloud.firestore_v1 import transforms
+
+DESCENDING = 'DESCENDING'
+DOCUMENT_ID = '__name__'
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _normalize(value: Any) -> Any:
+    """Store values the way Firestore returns them (aware UTC datetimes)"""
+    if isinstance(value, datetime) and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_normalize(v) for v in value]
+    return value
+
+
+def _apply_transform(current: Any, value: Any, commit_time: datetime) -> Any:
+    if value is transforms.SERVER_TIMESTAMP:
+        return commit_time
+    if isinstance(value, transforms.Increment):
+        return (current if isinstance(current, (int, float)) else 0) + value.value
+    if isinstance(value, transforms.Maximum):
+        return value.value if not isinstance(current, (int, float)) else max(current, value.value)
+    if isinstance(value, transforms.Minimum):
+        return value.value if not isinstance(current, (int, float)) else min(current, value.value)
+    if isinstance(value, transforms.ArrayUnion):
+        items = list(current) if isinstance(current, list) else []
+        return items + [v for v in value.values if v not in items]
+    if isinstance(value, transforms.ArrayRemove):
+        items = list(current) if isinstance(current, list) else []
+        return [v for v in items if v not in value.values]
+    return _normalize(value)
+
+
+def _merge(target: Dict[str, Any], data: Dict[str, Any], commit_time: datetime) -> None:
+    for key, value in data.items():
+        if value is transforms.DELETE_FIELD:
+            target.pop(key, None)
+        elif isinstance(value, dict) and value:
+            child = target.get(key)
+            if not isinstance(child, dict):
+                child = {}
+            _merge(child, value, commit_time)
+            target[key] = child
+        else:
+            target[key] = _apply_transform(target.get(key), value, commit_time)
+
+
+def _strip_transforms(data: Dict[str, Any], commit_time: datetime) -> Dict[str, Any]:
+    result: Dict[str, Any] = {}
+    _merge(result, data, commit_time)
+    return result
+
+
+def _get_field(data: Dict[str, Any], doc_id: str, field_path: str) -> Tuple[bool, Any]:
+    if field_path == DOCUMENT_ID:
+        return True, doc_id
+    current: Any = data
+    for part in field_path.split('.'):
+        if not isinstance(current, dict) or part not in current:
+            return False, None
+        current = current[part]
+    return True, current
+
+
+def _sort_key(value: Any) -> Tuple[int, Any]:
+    # Firestore orders values by type first, then by value
+    if value is None:
+        return (0, 0)
+    if isinstance(value, bool):
+        return (1, value)
+    if isinstance(value, (int, float)):
+        return (2, value)
+    if isinstance(value, datetime):
+        return (3, value)
+    if isinstance(value, str):
+        return (4, value)
+    if isinstance(value, FakeDocumentReference):
+        return (5, value.path)
+    return (6, repr(value))
+
+
+class FakeDocumentSnapshot:
+    def __init__(self, reference: 'FakeDocumentReference', data: Optional[Dict[str, Any]],
+                 create_time: Optional[datetime] = None, update_time: Optional[datetime] = None,
+                 read_time: Optional[datetime] = None):
+        self.reference = reference
+        self._data = data
+        self.create_time = create_time
+        self.update_time = update_time
+        self.read_time = read_time or _now()
+
+    @property
+    def id(self) -> str:
+        return self.reference.id
+
+    @property
+    def exists(self) -> bool:
+        return self._data is not None
+
+    def to_dict(self) -> Optional[Dict[str, Any]]:
+        return copy.deepcopy(self._data) if self._data is not None else None
+
+    def get(self, field_path: str) -> Any:
+        found, value = _get_field(self._data or {}, self.id, field_path)
+        if not found:
+            raise KeyError(field_path)
+        return copy.deepcopy(value)
+
+
+class WriteResult:
+    def __init__(self, update_time: datetime):
+        self.update_time = update_time
+
+
+class AggregationResult:
+    def __init__(self, alias: str, value: Any):
+        self.alias = alias
+        self.value = value
+
+
+class FakeDocumentReference:
+    def __init__(self, client: 'FakeAsyncClient', path: Tuple[str, ...]):
+        self._client = client
+        self._path = path
+
+    @property
+    def id(self) -> str:
+        return self._path[-1]
+
+    @property
+    def path(self) -> str:
+        return '/'.join(self._path)
+
+    @property
+    def parent(self) -> 'FakeCollectionReference':
+        return FakeCollectionReference(self._client, self._path[:-1])
+
+    def collection(self, name: str) -> 'FakeCollectionReference':
+        return FakeCollectionReference(self._client, self._path + (name,))
+
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, FakeDocumentReference) and other._path == self._path
+
+    def __hash__(self) -> int:
+        return hash(self._path)
+
+    def _snapshot(self) -> FakeDocumentSnapshot:
+        record = self._client._documents(self._path[:-1]).get(self.id)
+        if record is None:
+            return FakeDocumentSnapshot(self, None)
+        return FakeDocumentSnapshot(self, record['data'], record['create_time'], record['update_time'])
+
+    async def get(self, field_paths: Optional[Iterable[str]] = None, transaction: Any = None) -> FakeDocumentSnapshot:
+        await self._client._rpc()
+        snapshot = self._snapshot()
+        if field_paths is not None and snapshot.exists:
+            snapshot._data = _project(snapshot._data, self.id, field_paths)
+        return snapshot
+
+    async def set(self, document_data: Dict[str, Any], merge: bool = False) -> WriteResult:
+        await self._client._rpc()
+        return self._client._write([('set', self, document_data, merge)])[0]
+
+    async def update(self, field_updates: Dict[str, Any]) -> WriteResult:
+        await self._client._rpc()
+        return self._client._write([('update', self, field_updates, None)])[0]
+
+    async def delete(self) -> WriteResult:
+        await self._client._rpc()
+        return self._client._write([('delete', self, None, None)])[0]
+
+
+def _project(data: Dict[str, Any], doc_id: str, field_paths: Iterable[str]) -> Dict[str, Any]:
+    projected: Dict[str, Any] = {}
+    for field_path in field_paths:
+        found, value = _get_field(data, doc_id, field_path)
+        if found and field_path != DOCUMENT_ID:
+            target = projected
+            parts = field_path.split('.')
+            for part in parts[:-1]:
+                target = target.setdefault(part, {})
+            target[parts[-1]] = value
+    return projected
+
+
+class FakeQuery:
+    def __init__(self, client: 'FakeAsyncClient', collection_path: Tuple[str, ...],
+                 filters: Tuple = (), orders: Tuple = (), limit: Optional[int] = None,
+                 offset: int = 0, start_after: Any = None, projection: Optional[Tuple[str, ...]] = None,
+                 all_descendants: bool = False):
+        self._client = client
+        self._collection_path = collection_path
+        self._filters = filters
+        self._orders = orders
+        self._limit = limit
+        self._offset = offset
+        self._start_after = start_after
+        self._projection = projection
+        self._all_descendants = all_descendants
+
+    def _copy(self, **changes: Any) -> 'FakeQuery':
+        params = dict(
+            filters=self._filters, orders=self._orders, limit=self._limit, offset=self._offset,
+            start_after=self._start_after, projection=self._projection,
+            all_descendants=self._all_descendants,
+        )
+        params.update(changes)
+        return FakeQuery(self._client, self._collection_path, **params)
+
+    def where(self, field_path: Any = None, op_string: Optional[str] = None, value: Any = None,
+              *, filter: Any = None) -> 'FakeQuery':
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        return self._copy(filters=self._filters + ((str(field_path), op_string, value),))
+
+    def order_by(self, field_path: Any, direction: str = 'ASCENDING') -> 'FakeQuery':
+        return self._copy(orders=self._orders + ((str(field_path), direction),))
+
+    def limit(self, count: int) -> 'FakeQuery':
+        return self._copy(limit=count)
+
+    def offset(self, num_to_skip: int) -> 'FakeQuery':
+        return self._copy(offset=num_to_skip)
+
+    def start_after(self, document_fields_or_snapshot: Any) -> 'FakeQuery':
+        return self._copy(start_after=document_fields_or_snapshot)
+
+    def select(self, field_paths: Iterable[str]) -> 'FakeQuery':
+        return self._copy(projection=tuple(field_paths))
+
+    def count(self, alias: Optional[str] = None) -> 'FakeAggregationQuery':
+        return FakeAggregationQuery(self, alias or 'count')
+
+    def _matches(self, data: Dict[str, Any], doc_id: str) -> bool:
+        for field_path, op, expected in self._filters:
+            found, value = _get_field(data, doc_id, field_path)
+            if not found:
+                return False
+            if isinstance(value, FakeDocumentReference):
+                value = value.id
+            if isinstance(expected, FakeDocumentReference) and field_path == DOCUMENT_ID:
+                expected = expected.id
+            if op == '==' and not value == expected:
+                return False
+            if op == '!=' and not value != expected:
+                return False
+            if op in ('<', '<=', '>', '>='):
+                if value is None or _sort_key(value)[0] != _sort_key(expected)[0]:
+                    return False
+                if op == '<' and not value < expected:
+                    return False
+                if op == '<=' and not value <= expected:
+                    return False
+                if op == '>' and not value > expected:
+                    return False
+                if op == '>=' and not value >= expected:
+                    return False
+            if op == 'in' and value not in expected:
+                return False
+            if op == 'not-in' and value in expected:
+                return False
+            if op == 'array_contains' and (not isinstance(value, list) or expected not in value):
+                return False
+        return True
+
+    def _effective_orders(self) -> List[Tuple[str, str]]:
+        orders = list(self._orders)
+        # Inequality filters imply an order on that field, and every query
+        # is ultimately ordered by document name
+        for field_path, op, _ in self._filters:
+            if op in ('<', '<=', '>', '>=', '!=') and not any(o[0] == field_path for o in orders):
+                orders.insert(0, (field_path, 'ASCENDING'))
+        if not any(o[0] == DOCUMENT_ID for o in orders):
+            direction = orders[-1][1] if orders else 'ASCENDING'
+            orders.append((DOCUMENT_ID, direction))
+        return orders
+
+    def _cursor_values(self, orders: List[Tuple[str, str]]) -> Optional[List[Any]]:
+        cursor = self._start_after
+        if cursor is None:
+            return None
+        if isinstance(cursor, FakeDocumentSnapshot):
+            data = cursor._data or {}
+            return [_get_field(data, cursor.id, field)[1] for field, _ in orders]
+        values = []
+        for field, _ in orders:
+            if field in cursor:
+                value = cursor[field]
+                if field == DOCUMENT_ID and isinstance(value, FakeDocumentReference):
+                    value = value.id
+                values.append(value)
+            else:
+                break
+        return values
+
+    def _run(self) -> List[FakeDocumentSnapshot]:
+        orders = self._effective_orders()
+        rows = []
+        for collection_path, doc_id, record in self._client._scan(self._collection_path, self._all_descendants):
+            data = record['data']
+            if not self._matches(data, doc_id):
+                continue
+            keys = []
+            for field, _ in orders:
+                found, value = _get_field(data, doc_id, field)
+                if not found:
+                    break
+                keys.append(value)
+            else:
+                rows.append((keys, collection_path, doc_id, record))
+
+        def compare(a: List[Any], b: List[Any]) -> int:
+            for (field, direction), x, y in zip(orders, a, b):
+                kx, ky = _sort_key(x), _sort_key(y)
+                if kx != ky:
+                    result = -1 if kx < ky else 1
+                    return -result if direction == DESCENDING else result
+            return 0
+
+        # Stable sorts from the last order key to the first
+        for index in range(len(orders) - 1, -1, -1):
+            rows.sort(key=lambda row: _sort_key(row[0][index]), reverse=orders[index][1] == DESCENDING)
+        cursor = self._cursor_values(orders)
+        if cursor is not None:
+            rows = [row for row in rows if compare(row[0][:len(cursor)], cursor) > 0]
+        rows = rows[self._offset:]
+        if self._limit is not None:
+            rows = rows[:self._limit]
+        snapshots = []
+        for _, collection_path, doc_id, record in rows:
+            reference = FakeDocumentReference(self._client, collection_path + (doc_id,))
+            data = record['data']
+            if self._projection is not None:
+                data = _project(data, doc_id, self._projection)
+            snapshots.append(FakeDocumentSnapshot(reference, data, record['create_time'], record['update_time']))
+        return snapshots
+
+    async def stream(self, transaction: Any = None):
+        await self._client._rpc()
+        for snapshot in self._run():
+            yield snapshot
+
+    async def get(self, transaction: Any = None) -> List[FakeDocumentSnapshot]:
+        await self._client._rpc()
+        return self._run()
+
+
+class FakeAggregationQuery:
+    def __init__(self, query: FakeQuery, alias: str):
+        self._query = query
+        self._alias = alias
+
+    async def get(self, transaction: Any = None) -> List[List[AggregationResult]]:
+        await self._query._client._rpc()
+        # Aggregations ignore the projection and run server side
+        return [[AggregationResult(self._alias, len(self._query._copy(projection=None)._run()))]]
+
+
+class FakeCollectionReference(FakeQuery):
+    def __init__(self, client: 'FakeAsyncClient', path: Tuple[str, ...]):
+        super().__init__(client, path)
+
+    @property
+    def id(self) -> str:
+        return self._collection_path[-1]
+
+    def document(self, document_id: Optional[str] = None) -> FakeDocumentReference:
+        return FakeDocumentReference(self._client, self._collection_path + (document_id or uuid.uuid4().hex[:20],))
+
+    async def add(self, document_data: Dict[str, Any]) -> Tuple[datetime, FakeDocumentReference]:
+        doc_ref = self.document()
+        result = await doc_ref.set(document_data)
+        return result.update_time, doc_ref
+
+
+class FakeWriteBatch:
+    def __init__(self, client: 'FakeAsyncClient'):
+        self._client = client
+        self._writes: List[Tuple] = []
+
+    def __len__(self) -> int:
+        return len(self._writes)
+
+    def set(self, reference: FakeDocumentReference, document_data: Dict[str, Any], merge: bool = False) -> None:
+        self._writes.append(('set', reference, document_data, merge))
+
+    def update(self, reference: FakeDocumentReference, field_updates: Dict[str, Any]) -> None:
+        self._writes.append(('update', reference, field_updates, None))
+
+    def delete(self, reference: FakeDocumentReference) -> None:
+        self._writes.append(('delete', reference, None, None))
+
+    async def commit(self) -> List[WriteResult]:
+        if len(self._writes) > 500:
+            raise ValueError('maximum 500 writes allowed per request')
+        await self._client._rpc()
+        writes, self._writes = self._writes, []
+        return self._client._write(writes)
+
+
+class FakeTransaction(FakeWriteBatch):
+    """Implements the hooks google.cloud.firestore.async_transactional drives"""
+
+    def __init__(self, client: 'FakeAsyncClient', max_attempts: int = 5, read_only: bool = False):
+        super().__init__(client)
+        self._max_attempts = max_attempts
+        self._read_only = read_only
+        self._id: Optional[bytes] = None
+
+    @property
+    def in_progress(self) -> bool:
+        return self._id is not None
+
+    def _clean_up(self) -> None:
+        self._writes = []
+        self._id = None
+
+    async def _begin(self, retry_id: Optional[bytes] = None) -> None:
+        self._id = uuid.uuid4().bytes
+
+    async def _rollback(self) -> None:
+        self._clean_up()
+
+    async def _commit(self) -> List[WriteResult]:
+        results = await self.commit()
+        self._clean_up()
+        return results
+
+
+class FakeAsyncClient:
+    def __init__(self, latency: float = 0.0, blocking: bool = False):
+        self.latency = latency
+        self.blocking = blocking
+        self.rpc_count = 0
+        self._store: Dict[Tuple[str, ...], Dict[str, Dict[str, Any]]] = {}
+        self._clock = itertools.count()
+
+    async def _rpc(self) -> None:
+        self.rpc_count += 1
+        if self.latency <= 0:
+            return
+        if self.blocking:
+            time.sleep(self.latency)
+        else:
+            await asyncio.sleep(self.latency)
+
+    def _documents(self, collection_path: Tuple[str, ...]) -> Dict[str, Dict[str, Any]]:
+        return self._store.setdefault(collection_path, {})
+
+    def _scan(self, collection_path: Tuple[str, ...], all_descendants: bool):
+        if not all_descendants:
+            for doc_id, record in list(self._documents(collection_path).items()):
+                yield collection_path, doc_id, record
+            return
+        for path, documents in list(self._store.items()):
+            if path[-1] == collection_path[-1]:
+                for doc_id, record in list(documents.items()):
+                    yield path, doc_id, record
+
+    def _write(self, writes: List[Tuple]) -> List[WriteResult]:
+        commit_time = _now()
+        results = []
+        for kind, reference, data, merge in writes:
+            documents = self._documents(reference._path[:-1])
+            record = documents.get(reference.id)
+            if kind == 'delete':
+                documents.pop(reference.id, None)
+            elif kind == 'update':
+                if record is None:
+                    raise KeyError(f'No document to update: {reference.path}')
+                nested: Dict[str, Any] = {}
+                for field_path, value in data.items():
+                    target = nested
+                    parts = str(field_path).split('.')
+                    for part in parts[:-1]:
+                        target = target.setdefault(part, {})
+                    target[parts[-1]] = value
+                _merge(record['data'], nested, commit_time)
+                record['update_time'] = commit_time
+            elif merge and record is not None:
+                _merge(record['data'], data, commit_time)
+                record['update_time'] = commit_time
+            else:
+                create_time = record['create_time'] if record else commit_time
+                documents[reference.id] = {
+                    'data': _strip_transforms(data, commit_time),
+                    'create_time': create_time,
+                    'update_time': commit_time,
+                }
+            results.append(WriteResult(commit_time))
+        return results
+
+    def collection(self, *collection_path: str) -> FakeCollectionReference:
+        path: Tuple[str, ...] = tuple(itertools.chain.from_iterable(p.split('/') for p in collection_path))
+        return FakeCollectionReference(self, path)
+
+    def collection_group(self, collection_id: str) -> FakeQuery:
+        return FakeQuery(self, (collection_id,), all_descendants=True)
+
+    def document(self, *document_path: str) -> FakeDocumentReference:
+        path: Tuple[str, ...] = tuple(itertools.chain.from_iterable(p.split('/') for p in document_path))
+        return FakeDocumentReference(self, path)
+
+    def batch(self) -> FakeWriteBatch:
+        return FakeWriteBatch(self)
+
+    def transaction(self, max_attempts: int = 5, read_only: bool = False) -> FakeTransaction:
+        return FakeTransaction(self, max_attempts=max_attempts, read_only=read_only)
+
+    async def get_all(self, references: Iterable[FakeDocumentReference], field_paths: Optional[Iterable[str]] = None,
+                      transaction: Any = None):
+        await self._rpc()
+        for reference in references:
+            snapshot = reference._snapshot()
+            if field_paths is not None and snapshot.exists:
+                snapshot._data = _project(snapshot._data, reference.id, field_paths)
+            yield snapshot
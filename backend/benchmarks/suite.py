@@ -0,0 +1,297 @@
+"""
+Microbenchmark suite for the data layer and the API handlers
+
+Seeds a user with N mood entries (plus a few contacts, tasks and
+appointments) in the in-memory Firestore stand-in, then times every
+FirestoreService read/write the API uses and every GET handler (through
+the real FastAPI app over httpx's ASGI transport). For each case and size
+it records ops/sec, mean and median latency, and the peak memory allocated
+by one call (tracemalloc).
+
+Usage (from backend/):
+    python -m benchmarks.suite run                              # sizes 10, 1000, 50000
+    python -m benchmarks.suite run --sizes 10 1000 --output after.json
+    python -m benchmarks.suite run --filter moods
+    python -m benchmarks.suite compare before.json after.json --threshold 0.10
+
+compare exits with status 1 when a case got slower (ops/sec) or allocates
+more (peak memory) than the thresholds allow, so it can gate CI.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+import httpx
+
+from app.api import deps
+from app.api.endpoints import appointments, moods, sync, users
+from app.core import etag
+from app.main import app
+from app.services import mood_import, mood_stats
+from app.services.firestore_service import FirestoreService
+from benchmarks.fake_firestore import FakeAsyncClient
+
+USER_ID = 'bench-user'
+DEFAULT_SIZES = (10, 1000, 50000)
+# Modules whose storage instance is pointed at the benchmark service
+_ENDPOINT_MODULES = (appointments, moods, sync, users, mood_import)
+
+# Cases that add data; they run after the reads at each size
+WRITE_CASES = {'create_mood_entry', 'update_user_settings', 'POST /moods/'}
+
+Op = Callable[[], Awaitable[Any]]
+
+
+async def _fake_current_user() -> dict:
+    return {'id': USER_ID, 'email': 'bench@example.com', 'is_active': True}
+
+
+async def seed(service: FirestoreService, entries: int) -> None:
+    """One mood entry per hour going back from now, and a handful of everything else"""
+    now = datetime.now(timezone.utc)
+    await service.create_mood_entries(USER_ID, [
+        {
+            'mood_level': i % 10 + 1,
+            'energy_level': (i * 3) % 10 + 1,
+            'stress_level': (i * 7) % 10 + 1,
+            'note': f'entry {i}' if i % 3 else None,
+            'custom_metrics': None,
+            'created_at': now - timedelta(hours=i),
+        }
+        for i in range(entries)
+    ])
+    for i in range(5):
+        await service.create_emergency_contact(USER_ID, {'name': f'Contact {i}', 'phone': f'050-{i:07d}', 'relation': None})
+        await service.create_therapist_task(USER_ID, {'title': f'Task {i}', 'is_completed': bool(i % 2)})
+        await service.create_appointment(USER_ID, {'title': f'Session {i}', 'date': now + timedelta(days=7 * i), 'notes': None})
+    await service.update_user_settings(USER_ID, {'theme': 'dark', 'timezone': 'Asia/Jerusalem'})
+    await service.update_therapist_info(USER_ID, {'name': 'Dr. Levi', 'phone': '03-0000000'})
+
+
+def service_cases(service: FirestoreService, size: int) -> Dict[str, Op]:
+    today = datetime.now(timezone.utc).date()
+
+    async def stream_metrics() -> int:
+        return len([row async for row in service.stream_mood_metrics(USER_ID)])
+
+    async def compute_stats() -> Dict[str, Any]:
+        timestamps, values = await mood_stats.load_columns(service.stream_mood_metrics(USER_ID))
+        return mood_stats.compute_mood_stats(timestamps, values, ZoneInfo('Asia/Jerusalem'))
+
+    async def create_entry() -> Dict[str, Any]:
+        return await service.create_mood_entry(USER_ID, {
+            'mood_level': 5, 'energy_level': 5, 'stress_level': 5, 'note': None, 'custom_metrics': None
+        })
+
+    return {
+        'get_mood_entries_page': lambda: service.get_mood_entries_page(USER_ID, limit=50),
+        'get_mood_entries.offset': lambda: service.get_mood_entries(USER_ID, skip=min(size // 2, 1000), limit=50),
+        'stream_mood_metrics': stream_metrics,
+        'mood_stats.compute': compute_stats,
+        'get_mood_daily_rollups': lambda: service.get_mood_daily_rollups(
+            USER_ID, (today - timedelta(days=364)).isoformat(), today.isoformat()
+        ),
+        'get_user_settings': lambda: service.get_user_settings(USER_ID),
+        'get_user_documents': lambda: service.get_user_documents(USER_ID),
+        'get_emergency_contacts': lambda: service.get_emergency_contacts(USER_ID),
+        'get_therapist_tasks': lambda: service.get_therapist_tasks(USER_ID),
+        'get_appointments': lambda: service.get_appointments(USER_ID),
+        'get_changes.full': lambda: service.get_changes(USER_ID),
+        'get_changes.delta': lambda: service.get_changes(USER_ID, datetime.now(timezone.utc)),
+        'create_mood_entry': create_entry,
+        'update_user_settings': lambda: service.update_user_settings(USER_ID, {'language': 'he'}),
+    }
+
+
+def endpoint_cases(client: httpx.AsyncClient) -> Dict[str, Op]:
+    def call(method: str, path: str, **kwargs: Any) -> Op:
+        async def request() -> httpx.Response:
+            response = await client.request(method, f'/api/v1{path}', **kwargs)
+            response.raise_for_status()
+            return response
+        return request
+
+    return {
+        'GET /moods/': call('GET', '/moods/', params={'limit': 50}),
+        'GET /moods/stats': call('GET', '/moods/stats'),
+        'GET /moods/daily': call('GET', '/moods/daily'),
+        'POST /moods/': call('POST', '/moods/', json={'mood_level': 5, 'energy_level': 5, 'stress_level': 5}),
+        'GET /users/me/bootstrap': call('GET', '/users/me/bootstrap'),
+        'GET /users/me/settings': call('GET', '/users/me/settings'),
+        'GET /users/me/contacts': call('GET', '/users/me/contacts'),
+        'GET /users/me/therapist/info': call('GET', '/users/me/therapist/info'),
+        'GET /users/me/therapist/tasks': call('GET', '/users/me/therapist/tasks'),
+        'GET /appointments/': call('GET', '/appointments/'),
+        'GET /sync/changes': call('GET', '/sync/changes'),
+    }
+
+
+async def measure(op: Op, min_time: float, min_iterations: int = 3) -> Dict[str, Any]:
+    """Time op until min_time has passed (at least min_iterations calls), then trace one call"""
+    await op()  # warm-up
+    samples: List[float] = []
+    started = time.perf_counter()
+    while len(samples) < min_iterations or time.perf_counter() - started < min_time:
+        t0 = time.perf_counter()
+        await op()
+        samples.append(time.perf_counter() - t0)
+    total = sum(samples)
+
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        await op()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        'iterations': len(samples),
+        'ops_per_sec': len(samples) / total,
+        'mean_ms': total / len(samples) * 1000,
+        'median_ms': statistics.median(samples) * 1000,
+        'peak_kib': max(peak - baseline, 0) / 1024,
+    }
+
+
+async def run_size(size: int, args: argparse.Namespace) -> List[Dict[str, Any]]:
+    service = FirestoreService(client=FakeAsyncClient())
+    started = time.perf_counter()
+    await seed(service, size)
+    print(f"\n== {size} entries (seeded in {time.perf_counter() - started:.1f}s)")
+
+    originals = {module: module.storage for module in _ENDPOINT_MODULES}
+    for module in _ENDPOINT_MODULES:
+        module.storage = service
+    app.dependency_overrides[deps.get_current_user] = _fake_current_user
+    results = []
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://bench') as client:
+            cases = {
+                **{f'service.{name}': op for name, op in service_cases(service, size).items()},
+                **{f'endpoint.{name}': op for name, op in endpoint_cases(client).items()},
+            }
+            # Writes grow the data set, so every read runs before them
+            ordered = sorted(cases.items(), key=lambda case: case[0].split('.', 1)[1] in WRITE_CASES)
+            for name, op in ordered:
+                if args.filter and args.filter not in name:
+                    continue
+                etag.etag_cache.clear()
+                result = {'name': name, 'size': size, **await measure(op, args.min_time)}
+                results.append(result)
+                print(f"  {name:<40} {result['ops_per_sec']:>10.1f} ops/s  "
+                      f"{result['median_ms']:>9.3f} ms  {result['peak_kib']:>10.1f} KiB")
+    finally:
+        for module, original in originals.items():
+            module.storage = original
+        app.dependency_overrides.clear()
+    return results
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args: argparse.Namespace) -> None:
+    results = []
+    for size in args.sizes:
+        results.extend(await run_size(size, args))
+    report = {
+        'meta': {
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'min_time': args.min_time,
+        },
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSaved {len(results)} results to {args.output}")
+
+
+def compare_results(
+    base: List[Dict[str, Any]], new: List[Dict[str, Any]], threshold: float, memory_threshold: float
+) -> List[Tuple[Dict[str, Any], Dict[str, Any], List[str]]]:
+    """Pair results by (name, size) and list what regressed in each pair"""
+    baseline = {(r['name'], r['size']): r for r in base}
+    pairs = []
+    for result in new:
+        before = baseline.get((result['name'], result['size']))
+        if before is None:
+            continue
+        flags = []
+        if result['ops_per_sec'] < before['ops_per_sec'] * (1 - threshold):
+            flags.append('slower')
+        # Ignore noise on calls that allocate next to nothing
+        if result['peak_kib'] > max(before['peak_kib'] * (1 + memory_threshold), before['peak_kib'] + 16):
+            flags.append('more memory')
+        pairs.append((before, result, flags))
+    return pairs
+
+
+def compare(args: argparse.Namespace) -> int:
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    print(f"{args.base} ({base['meta'].get('commit')}) -> {args.new} ({new['meta'].get('commit')})")
+    regressions = 0
+    for before, after, flags in compare_results(base['results'], new['results'], args.threshold,
+                                                args.memory_threshold):
+        change = after['ops_per_sec'] / before['ops_per_sec'] - 1
+        regressions += bool(flags)
+        print(f"  {after['name']:<40} {after['size']:>6}  "
+              f"{before['ops_per_sec']:>10.1f} -> {after['ops_per_sec']:>10.1f} ops/s ({change:+.0%})  "
+              f"{before['peak_kib']:>9.1f} -> {after['peak_kib']:>9.1f} KiB"
+              f"{'  REGRESSION: ' + ', '.join(flags) if flags else ''}")
+    print(f"{regressions} regression(s)")
+    return 1 if regressions else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Benchmark the data layer and API handlers')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='Run the benchmarks and save the results as JSON')
+    run_parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES),
+                            help='Mood entries seeded for the user, one run per size')
+    run_parser.add_argument('--min-time', type=float, default=0.5, help='Seconds spent timing each case')
+    run_parser.add_argument('--filter', type=str, default=None, help='Only cases whose name contains this')
+    run_parser.add_argument('--output', type=str, default='benchmark-results.json')
+
+    compare_parser = commands.add_parser('compare', help='Compare two result files')
+    compare_parser.add_argument('base')
+    compare_parser.add_argument('new')
+    compare_parser.add_argument('--threshold', type=float, default=0.10,
+                                help='Allowed drop in ops/sec (fraction)')
+    compare_parser.add_argument('--memory-threshold', type=float, default=0.25,
+                                help='Allowed growth in peak memory (fraction)')
+
+    args = parser.parse_args()
+    if args.command == 'run':
+        # The per-request timing log would drown the table
+        logging.getLogger('app.timing').setLevel(logging.ERROR)
+        asyncio.run(run(args))
+    else:
+        sys.exit(compare(args))
+
+
+if __name__ == '__main__':
+    main()
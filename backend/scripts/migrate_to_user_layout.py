@@ -0,0 +1,40 @@
+"""
+Copy the per-user collections into users/{uid}/{collection} subcollections
+
+Resumable: progress is checkpointed in migrations/user_layout after every
+batch, so re-running continues where an interrupted run stopped. Run it
+with FIRESTORE_DUAL_WRITE=true, both here and on the deployed API, so writes
+made during the copy reach both layouts. Then:
+    1. switch the API to FIRESTORE_LAYOUT=user, still dual-writing
+    2. turn dual writes off once the new layout is final
+
+Usage (from backend/):
+    FIRESTORE_DUAL_WRITE=true python -m scripts.migrate_to_user_layout
+    FIRESTORE_DUAL_WRITE=true python -m scripts.migrate_to_user_layout --collection mood_entries --max-batches 10
+"""
+import argparse
+import asyncio
+
+from app.services.firestore_service import USER_COLLECTIONS, firestore_service
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description='Migrate per-user collections to users/{uid}/{collection}')
+    parser.add_argument('--collection', choices=USER_COLLECTIONS, action='append',
+                        help='Collection to migrate (repeatable; default: all)')
+    parser.add_argument('--batch-size', type=int, default=200, help='Documents per batch')
+    parser.add_argument('--max-batches', type=int, default=None, help='Stop after this many batches per collection')
+    args = parser.parse_args()
+
+    if not firestore_service.dual_write:
+        parser.error('set FIRESTORE_DUAL_WRITE=true (here and on the API) before migrating')
+    for collection in args.collection or USER_COLLECTIONS:
+        progress = await firestore_service.migrate_to_user_layout(
+            collection, batch_size=args.batch_size, max_batches=args.max_batches
+        )
+        print(f"[{progress['status'].upper()}] {collection}: "
+              f"{progress['copied']} copied, {progress['skipped']} skipped")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,36 @@
+"""
+Convert appointment dates stored as strings into Firestore timestamps
+
+Older versions of create_appointment kept the date as a string when it did
+not parse, and string dates never match the date range queries behind
+GET /appointments?from=&to=. Run once after deploying; dates that still do
+not parse are listed and left as they are.
+
+Usage (from backend/):
+    python -m scripts.normalize_appointment_dates --all --dry-run
+    python -m scripts.normalize_appointment_dates --user UID
+    python -m scripts.normalize_appointment_dates --all
+"""
+import argparse
+import asyncio
+
+from app.services.firestore_service import firestore_service
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description='Normalize legacy appointment dates')
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--user', type=str, help='Normalize a single user id')
+    group.add_argument('--all', action='store_true', help='Normalize every appointment')
+    parser.add_argument('--dry-run', action='store_true', help='Report without writing')
+    args = parser.parse_args()
+
+    converted, invalid = await firestore_service.normalize_appointment_dates(args.user, dry_run=args.dry_run)
+    verb = 'Would convert' if args.dry_run else 'Converted'
+    print(f"{verb} {converted} appointment date(s)")
+    for doc_id, value in invalid:
+        print(f"[SKIP] {doc_id}: unparseable date {value!r}")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
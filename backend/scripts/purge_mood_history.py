@@ -0,0 +1,41 @@
+"""
+Purge mood entries left behind by 'Clean History'
+
+DELETE /moods only bumps the user's history generation and starts the purge
+in the background. If an instance stops before that purge finishes, this
+script resumes it from the checkpoint stored on the settings document.
+
+Usage (from backend/):
+    python -m scripts.purge_mood_history             # every unfinished purge
+    python -m scripts.purge_mood_history --user UID  # a single user
+"""
+import argparse
+import asyncio
+
+from app.services.firestore_service import firestore_service, MOOD_GC_FIELD
+
+
+async def pending_users():
+    query = (
+        firestore_service.db.collection('user_settings')
+        .where(f'{MOOD_GC_FIELD}.status', 'in', ['pending', 'running'])
+    )
+    async for doc in query.stream():
+        yield doc.id
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description='Resume purging of cleared mood history')
+    parser.add_argument('--user', type=str, default=None, help='Only purge this user id')
+    parser.add_argument('--batch-size', type=int, default=500)
+    args = parser.parse_args()
+
+    users = [args.user] if args.user else [uid async for uid in pending_users()]
+    print(f"Purging cleared mood history for {len(users)} user(s)")
+    for uid in users:
+        progress = await firestore_service.purge_superseded_mood_entries(uid, batch_size=args.batch_size)
+        print(f"[OK] {uid}: deleted {progress.get('deleted', 0)} entries ({progress.get('status')})")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
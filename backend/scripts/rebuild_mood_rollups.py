@@ -0,0 +1,38 @@
+"""
+Rebuild daily mood rollups from raw mood entries
+
+Rollups are maintained on every write; run this after changing the rollup
+format, after restoring data, or to backfill entries written before rollups
+existed.
+
+Usage (from backend/):
+    python -m scripts.rebuild_mood_rollups --user UID
+    python -m scripts.rebuild_mood_rollups --all
+"""
+import argparse
+import asyncio
+
+from app.services.firestore_service import firestore_service
+
+
+async def all_users():
+    async for doc in firestore_service.db.collection('user_settings').select([]).stream():
+        yield doc.id
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description='Rebuild daily mood rollups')
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--user', type=str, help='Rebuild a single user id')
+    group.add_argument('--all', action='store_true', help='Rebuild every user with settings')
+    args = parser.parse_args()
+
+    users = [args.user] if args.user else [uid async for uid in all_users()]
+    print(f"Rebuilding mood rollups for {len(users)} user(s)")
+    for uid in users:
+        days = await firestore_service.rebuild_mood_rollups(uid)
+        print(f"[OK] {uid}: {days} day(s)")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
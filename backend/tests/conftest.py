@@ -1,6 +1,7 @@
 """
 קובץ conftest.py עבור pytest
 """
+import asyncio
 import pytest
 import os
 from fastapi.testclient import TestClient
@@ -19,9 +20,45 @@ except ImportError:
     pass
 
 from app.main import app
+from app.services.firestore_service import FirestoreService
+from benchmarks.fake_firestore import FakeAsyncClient
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def make_service(client=None, **options) -> FirestoreService:
+    """A FirestoreService over an in-memory Firestore (a fresh one unless given)"""
+    return FirestoreService(client=FakeAsyncClient() if client is None else client, **options)
+
+
+def mood(level: int, **extra) -> dict:
+    return {'mood_level': level, 'energy_level': 5, 'stress_level': 5, 'note': None, 'custom_metrics': None, **extra}
 
 
 @pytest.fixture
 def client():
     """Create a test client"""
     return TestClient(app)
+
+
+@pytest.fixture
+def fake_db(client, monkeypatch):
+    """
+    Point the endpoints at a FirestoreService over an in-memory Firestore
+    and authenticate every request as user-a. Yields the fake client.
+    """
+    from app.api import deps
+    from app.api.endpoints import appointments, moods, users
+    from app.core import etag
+
+    db = FakeAsyncClient()
+    service = make_service(db)
+    for module in (users, appointments, moods):
+        monkeypatch.setattr(module, 'storage', service)
+    app.dependency_overrides[deps.get_current_user] = lambda: {'id': 'user-a', 'email': 'a@example.com'}
+    etag.etag_cache.clear()
+    yield db
+    app.dependency_overrides.clear()
+    etag.etag_cache.clear()
@@ -0,0 +1,43 @@
+"""
+בדיקות עבור טווחי תאריכים בנתיב התורים
+"""
+
+
+def create(client, title, date):
+    response = client.post('/api/v1/appointments/', json={'title': title, 'date': date})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_range_limit_and_order_are_applied(client, fake_db):
+    first = create(client, 'A', '2024-05-01T09:00:00Z')
+    second = create(client, 'B', '2024-05-02T09:00:00Z')
+    third = create(client, 'C', '2024-05-03T09:00:00Z')
+
+    everything = client.get('/api/v1/appointments/')
+    assert [a['id'] for a in everything.json()] == [third['id'], second['id'], first['id']]
+
+    upcoming = client.get('/api/v1/appointments/', params={'from': '2024-05-01T12:00:00Z', 'order': 'asc', 'limit': 1})
+    assert [a['id'] for a in upcoming.json()] == [second['id']]
+    assert upcoming.headers['etag']
+
+    window = client.get('/api/v1/appointments/', params={'from': '2024-05-01', 'to': '2024-05-03'})
+    assert [a['id'] for a in window.json()] == [second['id'], first['id']]
+
+
+def test_filtered_views_follow_writes(client, fake_db):
+    create(client, 'A', '2024-05-01T09:00:00Z')
+    params = {'from': '2024-05-01T00:00:00Z'}
+    tag = client.get('/api/v1/appointments/', params=params).headers['etag']
+    create(client, 'B', '2024-05-02T09:00:00Z')
+
+    again = client.get('/api/v1/appointments/', params=params, headers={'If-None-Match': tag})
+    assert again.status_code == 200 and len(again.json()) == 2
+
+
+def test_invalid_dates_and_ranges_are_rejected(client, fake_db):
+    assert client.post('/api/v1/appointments/', json={'title': 'A', 'date': 'next tuesday'}).status_code == 422
+    assert client.get('/api/v1/appointments/', params={'from': 'soon'}).status_code == 422
+    assert client.get('/api/v1/appointments/', params={'limit': 0}).status_code == 422
+    response = client.get('/api/v1/appointments/', params={'from': '2024-05-02', 'to': '2024-05-01'})
+    assert response.status_code == 400
@@ -0,0 +1,118 @@
+"""
+בדיקות עבור מטמון האימות ב-deps.get_current_user
+"""
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+
+from app.api import deps
+from app.core.cache import TTLCache
+
+
+def bearer(token: str) -> HTTPAuthorizationCredentials:
+    return HTTPAuthorizationCredentials(scheme='Bearer', credentials=token)
+
+
+@pytest.fixture(autouse=True)
+def clear_token_cache():
+    deps.token_cache.clear()
+    yield
+    deps.token_cache.clear()
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.stats()['hits'] == 2
+
+
+def test_ttl_cache_respects_wall_clock_expiry():
+    cache = TTLCache(maxsize=2)
+    cache.set('expired', 1, expires_at=time.time() - 1)
+    cache.set('valid', 2, expires_at=time.time() + 60)
+    assert cache.get('expired') is None
+    assert cache.get('valid') == 2
+
+
+def test_verified_token_is_cached_until_invalidated(monkeypatch):
+    calls = []
+
+    def verify_id_token(token):
+        calls.append(token)
+        return {'uid': 'user-1', 'email': 'a@example.com', 'exp': time.time() + 3600}
+
+    monkeypatch.setattr(deps.firebase_auth, 'verify_id_token', verify_id_token)
+
+    for _ in range(3):
+        user = asyncio.run(deps.get_current_user(bearer('token-1')))
+        assert user['id'] == 'user-1'
+    assert len(calls) == 1
+
+    deps.invalidate_token('token-1')
+    asyncio.run(deps.get_current_user(bearer('token-1')))
+    assert len(calls) == 2
+
+
+def test_rejected_token_is_not_cached(monkeypatch):
+    def verify_id_token(token):
+        raise ValueError('bad token')
+
+    monkeypatch.setattr(deps.firebase_auth, 'verify_id_token', verify_id_token)
+
+    with pytest.raises(HTTPException):
+        asyncio.run(deps.get_current_user(bearer('not-a-jwt')))
+    assert len(deps.token_cache) == 0
+
+
+def test_user_records_are_cached_by_uid_and_email(monkeypatch):
+    from app.services.user_records import UserRecordService
+
+    calls = []
+
+    def get_user_by_email(email):
+        calls.append(email)
+        return deps.firebase_auth.UserRecord({'localId': 'user-1', 'email': email})
+
+    monkeypatch.setattr(deps.firebase_auth, 'get_user_by_email', get_user_by_email)
+    monkeypatch.setattr(deps.firebase_auth, 'get_user', lambda uid: pytest.fail('uid lookup should be cached'))
+    service = UserRecordService()
+
+    async def lookups():
+        records = await asyncio.gather(*(service.get_user_by_email('A@example.com') for _ in range(5)))
+        return records, await service.get_user('user-1')
+
+    records, by_uid = asyncio.run(lookups())
+    assert calls == ['a@example.com']
+    assert {r.uid for r in records} == {'user-1'}
+    assert by_uid.email == 'a@example.com'
+
+
+def test_missing_users_are_negatively_cached(monkeypatch):
+    from app.services.user_records import UserRecordService
+
+    calls = []
+
+    def get_user(uid):
+        calls.append(uid)
+        raise deps.firebase_auth.UserNotFoundError('No user record found')
+
+    monkeypatch.setattr(deps.firebase_auth, 'get_user', get_user)
+    service = UserRecordService()
+
+    for _ in range(3):
+        with pytest.raises(deps.firebase_auth.UserNotFoundError):
+            asyncio.run(service.get_user('ghost'))
+    assert calls == ['ghost']
+
+    service.invalidate(uid='ghost')
+    with pytest.raises(deps.firebase_auth.UserNotFoundError):
+        asyncio.run(service.get_user('ghost'))
+    assert len(calls) == 2
@@ -0,0 +1,32 @@
+"""
+בדיקות עבור חבילת המדידות: הרצה קצרה והשוואה בין הרצות
+"""
+import argparse
+import asyncio
+
+from benchmarks import suite
+
+
+def result(name: str, ops: float, peak: float) -> dict:
+    return {'name': name, 'size': 10, 'ops_per_sec': ops, 'peak_kib': peak}
+
+
+def test_every_case_runs_against_a_small_data_set():
+    args = argparse.Namespace(min_time=0, filter=None)
+    results = asyncio.run(suite.run_size(10, args))
+
+    names = [r['name'] for r in results]
+    assert 'service.get_mood_entries_page' in names and 'endpoint.GET /sync/changes' in names
+    # Writes come last so reads see the seeded size
+    assert {name.split('.', 1)[1] for name in names[-3:]} == suite.WRITE_CASES
+    assert all(r['ops_per_sec'] > 0 and r['iterations'] >= 3 for r in results)
+
+
+def test_compare_flags_slower_and_hungrier_cases():
+    base = [result('a', 100, 10), result('b', 100, 100), result('c', 100, 100)]
+    new = [result('a', 95, 12), result('b', 80, 100), result('c', 100, 200), result('d', 1, 1)]
+
+    pairs = suite.compare_results(base, new, threshold=0.1, memory_threshold=0.25)
+    assert [(after['name'], flags) for _, after, flags in pairs] == [
+        ('a', []), ('b', ['slower']), ('c', ['more memory'])
+    ]
@@ -0,0 +1,35 @@
+"""
+בדיקות עבור GET /users/me/bootstrap
+"""
+from app.api.endpoints import users
+
+
+def test_bootstrap_returns_every_section_in_one_call(client, fake_db):
+    client.put('/api/v1/users/me/settings', json={'theme': 'dark'})
+    client.post('/api/v1/users/me/contacts', json={'name': 'Dana', 'phone': '050'})
+    client.post('/api/v1/users/me/therapist/tasks', json={'title': 'Walk'})
+    for level in (1, 2, 3):
+        client.post('/api/v1/moods/', json={'mood_level': level, 'energy_level': 5, 'stress_level': 5})
+
+    body = client.get('/api/v1/users/me/bootstrap', params={'mood_limit': 2}).json()
+    assert body['errors'] == []
+    assert body['settings']['theme'] == 'dark' and body['settings']['email'] == 'a@example.com'
+    assert body['therapist_info']['name'] is None
+    assert [c['name'] for c in body['emergency_contacts']] == ['Dana']
+    assert [t['title'] for t in body['therapist_tasks']] == ['Walk']
+    assert body['appointments'] == []
+    assert [m['mood_level'] for m in body['mood_entries']] == [3, 2]
+    assert body['next_mood_cursor']
+
+
+def test_bootstrap_reports_failed_sections(client, fake_db, monkeypatch):
+    async def unavailable(user_id):
+        raise TimeoutError('deadline exceeded')
+
+    monkeypatch.setattr(users.storage, 'get_therapist_tasks', unavailable)
+    response = client.get('/api/v1/users/me/bootstrap')
+    assert response.status_code == 200
+    body = response.json()
+    assert body['therapist_tasks'] is None
+    assert body['errors'] == [{'section': 'therapist_tasks', 'error': 'TimeoutError'}]
+    assert body['settings'] == {'id': 'user-a', 'theme': 'system', 'language': 'he', 'email': 'a@example.com'}
@@ -0,0 +1,36 @@
+"""
+בדיקות עבור דחיסת תגובות (brotli / gzip)
+"""
+from app.core.compression import accepts_encoding
+
+
+def seed_contacts(client, count):
+    for i in range(count):
+        client.post('/api/v1/users/me/contacts', json={'name': f'Contact {i}', 'phone': f'050-{i:07d}'})
+
+
+def test_large_lists_are_compressed_with_the_preferred_encoding(client, fake_db):
+    seed_contacts(client, 40)
+    plain = client.get('/api/v1/users/me/contacts', headers={'Accept-Encoding': 'identity'})
+    assert 'content-encoding' not in plain.headers
+    assert len(plain.content) >= 1024 and plain.headers['etag'].startswith('"')
+
+    for accept, encoding in (('gzip, deflate, br', 'br'), ('gzip', 'gzip'), ('br;q=0, gzip', 'gzip')):
+        response = client.get('/api/v1/users/me/contacts', headers={'Accept-Encoding': accept})
+        assert response.headers['content-encoding'] == encoding
+        assert response.json() == plain.json()
+        assert 'accept-encoding' in response.headers['vary'].lower()
+        # The ETag describes the uncompressed body
+        assert response.headers['etag'] == f"W/{plain.headers['etag']}"
+
+
+def test_small_bodies_are_sent_as_is(client, fake_db):
+    seed_contacts(client, 1)
+    response = client.get('/api/v1/users/me/contacts', headers={'Accept-Encoding': 'br, gzip'})
+    assert 'content-encoding' not in response.headers
+
+
+def test_accept_encoding_parsing():
+    assert accepts_encoding('gzip, br;q=0.5', 'br')
+    assert not accepts_encoding('gzip, br;q=0', 'br')
+    assert not accepts_encoding('gzip', 'br')
@@ -0,0 +1,38 @@
+"""
+בדיקות עבור ETag ו-If-None-Match בנתיבי המשתמש
+"""
+from app.core import etag
+
+
+def test_matching_etag_gets_304_without_reading_firestore(client, fake_db):
+    client.post('/api/v1/users/me/contacts', json={'name': 'Dana', 'phone': '050'})
+    first = client.get('/api/v1/users/me/contacts')
+    tag = first.headers['etag']
+    assert first.status_code == 200 and tag.startswith('"')
+
+    reads = fake_db.rpc_count
+    again = client.get('/api/v1/users/me/contacts', headers={'If-None-Match': f'W/{tag}'})
+    assert again.status_code == 304 and again.headers['etag'] == tag and again.content == b''
+    assert fake_db.rpc_count == reads
+
+
+def test_write_changes_the_etag(client, fake_db):
+    tag = client.get('/api/v1/users/me/therapist/tasks').headers['etag']
+    task = client.post('/api/v1/users/me/therapist/tasks', json={'title': 'Walk'}).json()
+
+    changed = client.get('/api/v1/users/me/therapist/tasks', headers={'If-None-Match': tag})
+    assert changed.status_code == 200 and changed.json()[0]['id'] == task['id']
+    assert changed.headers['etag'] != tag
+
+    # The same content hashes to the same ETag even after the memo is gone
+    etag.etag_cache.clear()
+    assert client.get(
+        '/api/v1/users/me/therapist/tasks', headers={'If-None-Match': changed.headers['etag']}
+    ).status_code == 304
+
+
+def test_etag_matching_rules():
+    assert etag.etag_matches('"a", W/"b"', '"b"')
+    assert etag.etag_matches('*', '"a"')
+    assert not etag.etag_matches(None, '"a"')
+    assert not etag.etag_matches('"ab"', '"a"')
@@ -0,0 +1,187 @@
+"""
+בדיקות עבור קובץ האינדקסים של Firestore ונפילה חזרה למיון ב-Python כשאינדקס חסר
+"""
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from google.api_core.exceptions import FailedPrecondition
+
+from app.services import firestore_indexes
+from app.services.firestore_service import FirestoreService
+from benchmarks.fake_firestore import FakeQuery
+from tests.conftest import make_service, run
+
+RANGE_OPS = ('<', '<=', '>', '>=', '!=')
+
+
+def required_index(query: FakeQuery):
+    """
+    The composite index a query needs, as an index key with the equality
+    fields sorted, or None when single-field indexes serve it
+    """
+    equalities = sorted({field for field, op, _ in query._filters if op not in RANGE_OPS})
+    orders = [(field, direction) for field, direction in query._orders if field != '__name__']
+    for field, op, _ in query._filters:
+        if op in RANGE_OPS and not any(o[0] == field for o in orders):
+            orders.insert(0, (field, 'ASCENDING'))
+    if not orders or (not equalities and len(orders) == 1):
+        return None
+    fields = [(field, 'ASCENDING') for field in equalities if field not in dict(orders)] + orders
+    return firestore_indexes.index_key(query._collection_path[-1], *fields)
+
+
+def normalized(index):
+    collection, fields = index
+    *equalities, last = fields
+    return collection, tuple(sorted(equalities)) + (last,)
+
+
+def record_queries(monkeypatch, missing=()):
+    """Record the index each query needs; queries needing a missing one fail like Firestore does"""
+    needed = set()
+    missing = {normalized(index) for index in missing}
+    original = FakeQuery._run
+
+    def _run(self):
+        index = required_index(self)
+        if index is not None:
+            needed.add(index)
+            if index in missing:
+                raise FailedPrecondition('The query requires an index')
+        return original(self)
+
+    monkeypatch.setattr(FakeQuery, '_run', _run)
+    return needed
+
+
+async def exercise(service: FirestoreService) -> None:
+    """Call every FirestoreService method that queries a collection"""
+    user = 'user-a'
+    started = datetime.now(timezone.utc) - timedelta(seconds=10)
+    entry = await service.create_mood_entry(user, {'mood_level': 5, 'energy_level': 5, 'stress_level': 5})
+    await service.get_mood_entries(user)
+    await service.get_mood_entries_page(user, limit=1)
+    async for _ in service.stream_mood_metrics(user, started, started + timedelta(days=1)):
+        pass
+    await service.get_mood_daily_rollups(user, '2024-01-01', '2099-01-01')
+    await service.rebuild_mood_rollups(user)
+    await service.delete_mood_entry(user, entry['id'])
+    await service.create_mood_entry(user, {'mood_level': 5, 'energy_level': 5, 'stress_level': 5})
+    await service.get_changes(user, since=started)
+    await service.clear_mood_history(user)
+    await service.get_mood_entries(user)
+    await service.get_mood_entries_page(user)
+    await service.get_changes(user, since=started)
+    await service.purge_superseded_mood_entries(user)
+    await service.create_emergency_contact(user, {'name': 'Dana', 'phone': '050'})
+    await service.get_emergency_contacts(user, limit=5)
+    await service.create_therapist_task(user, {'title': 'Walk'})
+    await service.create_therapist_task(user, {'title': 'Read'})
+    await service.get_therapist_tasks(user)
+    _, cursor = await service.get_therapist_tasks_page(user, limit=1, is_completed=False)
+    await service.get_therapist_tasks_page(user, limit=1, cursor=cursor)
+    await service.count_therapist_tasks(user)
+    await service.create_appointment(user, {'title': 'A', 'date': started})
+    await service.get_appointments(user, start=started, end=started + timedelta(days=1), limit=3, ascending=True)
+    await service.get_appointments(user)
+    await service.normalize_appointment_dates(user)
+
+
+@pytest.mark.parametrize('layout', ['global', 'user'])
+def test_manifest_covers_every_query_the_service_issues(monkeypatch, layout):
+    needed = record_queries(monkeypatch)
+    run(exercise(make_service(layout=layout)))
+
+    manifest = {normalized(index) for index in firestore_indexes.load_manifest()}
+    assert needed and not {normalized(index) for index in needed} - manifest
+
+
+def test_manifest_enables_collection_group_fields_the_service_filters_on(monkeypatch):
+    needed = set()
+    original = FakeQuery._run
+
+    def _run(self):
+        if self._all_descendants:
+            fields = {field for field, _, _ in self._filters} | {field for field, _ in self._orders}
+            needed.update((self._collection_path[-1], field) for field in fields - {'__name__'})
+        return original(self)
+
+    monkeypatch.setattr(FakeQuery, '_run', _run)
+    service = make_service(layout='user')
+    run(service.create_appointment('user-a', {'title': 'A', 'date': datetime(2024, 5, 1, tzinfo=timezone.utc)}))
+    run(service.normalize_appointment_dates())
+
+    with open(firestore_indexes.MANIFEST_PATH) as f:
+        overrides = json.load(f)['fieldOverrides']
+    enabled = {
+        (override['collectionGroup'], override['fieldPath'])
+        for override in overrides
+        if any(index.get('queryScope') == 'COLLECTION_GROUP' for index in override['indexes'])
+    }
+    assert needed and not needed - enabled
+
+
+def test_probe_reports_missing_indexes_and_queries_fall_back_to_python(monkeypatch):
+    async def scenario(service):
+        for day in (3, 1, 2):
+            await service.create_appointment('user-a', {'title': str(day), 'date': datetime(2024, 5, day, tzinfo=timezone.utc)})
+        await service.create_appointment('user-b', {'title': 'other', 'date': datetime(2024, 5, 2, tzinfo=timezone.utc)})
+        return (
+            await service.get_appointments('user-a', start=datetime(2024, 5, 2, tzinfo=timezone.utc), limit=1, ascending=True),
+            await service.get_appointments('user-a', end=datetime(2024, 5, 3, tzinfo=timezone.utc)),
+            await service.get_appointments('user-a', limit=2),
+        )
+
+    indexed = run(scenario(make_service()))
+
+    ascending = firestore_indexes.index_key('appointments', ('user_id', 'ASCENDING'), ('date', 'ASCENDING'))
+    descending = firestore_indexes.index_key('appointments', ('user_id', 'ASCENDING'), ('date', 'DESCENDING'))
+    record_queries(monkeypatch, missing=[ascending, descending])
+    service = make_service()
+    report = run(service.probe_indexes())
+    assert report[firestore_indexes.describe(ascending)] is False
+    assert [index for index, present in report.items() if not present] == [
+        firestore_indexes.describe(ascending), firestore_indexes.describe(descending)
+    ]
+    assert service.indexes.missing == {ascending, descending}
+
+    fallback = run(scenario(service))
+    assert [[a['title'] for a in rows] for rows in fallback] == [['2'], ['2', '1'], ['3', '2']]
+    assert [[a['title'] for a in rows] for rows in indexed] == [['2'], ['2', '1'], ['3', '2']]
+
+
+def test_query_failing_for_want_of_an_index_marks_it_missing(monkeypatch):
+    tasks = firestore_indexes.index_key('therapist_tasks', ('user_id', 'ASCENDING'), ('created_at', 'DESCENDING'))
+    record_queries(monkeypatch, missing=[tasks])
+    service = make_service()
+
+    async def scenario():
+        first = await service.create_therapist_task('user-a', {'title': 'First'})
+        second = await service.create_therapist_task('user-a', {'title': 'Second'})
+        return first, second, await service.get_therapist_tasks('user-a', limit=1)
+
+    _, second, latest = run(scenario())
+    assert latest == [second]
+    assert not service.indexes.usable(tasks)
+
+
+def test_task_pages_fall_back_to_python_without_their_index(monkeypatch):
+    open_tasks = firestore_indexes.index_key(
+        'therapist_tasks', ('user_id', 'ASCENDING'), ('is_completed', 'ASCENDING'), ('created_at', 'DESCENDING')
+    )
+    record_queries(monkeypatch, missing=[open_tasks])
+    service = make_service()
+
+    async def scenario():
+        for i in range(5):
+            await service.create_therapist_task('user-a', {'title': str(i), 'is_completed': i == 2})
+        seen, cursor = [], None
+        while True:
+            page, cursor = await service.get_therapist_tasks_page('user-a', limit=2, cursor=cursor, is_completed=False)
+            seen += [task['title'] for task in page]
+            if cursor is None:
+                return seen
+
+    assert run(scenario()) == ['4', '3', '1', '0']
+    assert not service.indexes.usable(open_tasks)
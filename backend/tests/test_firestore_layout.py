@@ -0,0 +1,83 @@
+"""
+בדיקות עבור מבנה אוסף-לכל-משתמש (users/{uid}/...) ומיגרציה עם כתיבה כפולה
+"""
+import pytest
+
+from benchmarks.fake_firestore import FakeAsyncClient
+from tests.conftest import make_service, mood, run
+
+
+async def stored(client, *path):
+    return (await client.document(*path).get()).to_dict()
+
+
+def test_user_layout_keeps_documents_under_the_user_and_dual_writes_the_global_copy():
+    client = FakeAsyncClient()
+    service = make_service(client, layout='user', dual_write=True)
+
+    async def scenario():
+        task = await service.create_therapist_task('user-a', {'title': 'Walk'})
+        await service.update_therapist_task('user-a', task['id'], {'is_completed': True})
+        contact = await service.create_emergency_contact('user-a', {'name': 'Dana', 'phone': '050'})
+        await service.delete_emergency_contact('user-a', contact['id'])
+
+        partitioned = await stored(client, 'users', 'user-a', 'therapist_tasks', task['id'])
+        assert partitioned['is_completed'] is True
+        assert await stored(client, 'therapist_tasks', task['id']) == partitioned
+        assert await stored(client, 'users', 'user-a', 'emergency_contacts', contact['id']) is None
+        assert await stored(client, 'emergency_contacts', contact['id']) is None
+
+        # Without dual writes only the user's partition is written
+        single = make_service(client, layout='user')
+        other = await single.create_therapist_task('user-a', {'title': 'Read'})
+        assert await stored(client, 'therapist_tasks', other['id']) is None
+        assert [t['id'] for t in await single.get_therapist_tasks('user-a')] == [other['id'], task['id']]
+
+    run(scenario())
+
+
+def test_unknown_layout_is_rejected():
+    with pytest.raises(ValueError):
+        make_service(layout='nested')
+
+
+def test_migration_resumes_from_checkpoint_and_keeps_newer_copies():
+    client = FakeAsyncClient()
+    legacy = make_service(client)
+    dual = make_service(client, dual_write=True)
+    partitioned = make_service(client, layout='user')
+
+    async def scenario():
+        for user in ('user-a', 'user-b'):
+            for level in range(1, 4):
+                await legacy.create_mood_entry(user, mood(level))
+        tasks = [await legacy.create_therapist_task('user-a', {'title': str(i)}) for i in range(3)]
+        await client.collection('therapist_tasks').document('orphan').set({'title': 'no owner'})
+
+        with pytest.raises(RuntimeError):
+            await legacy.migrate_to_user_layout('therapist_tasks')
+
+        progress = await dual.migrate_to_user_layout('therapist_tasks', batch_size=1, max_batches=1)
+        assert progress['status'] == 'running' and progress['copied'] == 1
+        # Writes while the copy runs reach both layouts and are not overwritten
+        await dual.update_therapist_task('user-a', tasks[2]['id'], {'is_completed': True})
+        ordered = sorted(tasks, key=lambda t: t['id'])
+        deleted = next(t for t in ordered[1:] if t['id'] != tasks[2]['id'])
+        await client.collection('therapist_tasks').document(deleted['id']).delete()
+
+        progress = await dual.migrate_to_user_layout('therapist_tasks', batch_size=1)
+        assert progress['status'] == 'done'
+        assert progress['copied'] + progress['skipped'] == 3  # every task left, and the orphan
+        assert await dual.migrate_to_user_layout('therapist_tasks') == progress
+
+        moods = await dual.migrate_to_user_layout('mood_entries', batch_size=4)
+        assert (moods['status'], moods['copied']) == ('done', 6)
+
+        assert await partitioned.get_therapist_tasks('user-a') == await legacy.get_therapist_tasks('user-a')
+        remaining = await partitioned.get_therapist_tasks('user-a')
+        assert deleted['id'] not in [t['id'] for t in remaining]
+        assert next(t for t in remaining if t['id'] == tasks[2]['id'])['is_completed'] is True
+        for user in ('user-a', 'user-b'):
+            assert await partitioned.get_mood_entries(user) == await legacy.get_mood_entries(user)
+
+    run(scenario())
@@ -0,0 +1,262 @@
+"""
+בדיקות עבור FirestoreService מול Firestore מדומה בזיכרון
+"""
+import pytest
+
+from tests.conftest import make_service, mood, run
+
+
+def test_mood_entries_are_scoped_to_user_and_newest_first():
+    service = make_service()
+    for level in (1, 2, 3):
+        run(service.create_mood_entry('user-a', mood(level)))
+    run(service.create_mood_entry('user-b', mood(9)))
+
+    entries = run(service.get_mood_entries('user-a'))
+    assert [e['mood_level'] for e in entries] == [3, 2, 1]
+    assert all(e['user_id'] == 'user-a' for e in entries)
+    assert isinstance(entries[0]['created_at'], str)
+
+
+def test_clear_hides_history_immediately_and_purge_only_touches_user():
+    service = make_service()
+    run(service.create_mood_entry('user-a', mood(1)))
+    run(service.create_mood_entry('user-b', mood(2)))
+
+    assert run(service.clear_mood_history('user-a')) == 1
+    assert run(service.get_mood_entries('user-a')) == []
+    kept = run(service.create_mood_entry('user-a', mood(3)))
+    assert run(service.get_mood_entries('user-a')) == [kept]
+
+    progress = run(service.purge_superseded_mood_entries('user-a'))
+    assert progress['status'] == 'done' and progress['deleted'] == 1
+    assert run(service.get_mood_entries('user-a')) == [kept]
+    assert len(run(service.get_mood_entries('user-b'))) == 1
+    assert 'mood_history_generation' not in run(service.get_user_settings('user-a'))
+
+
+def test_purge_resumes_from_checkpoint():
+    service = make_service()
+    for level in range(1, 6):
+        run(service.create_mood_entry('user-a', mood(level)))
+    run(service.clear_mood_history('user-a'))
+
+    first = run(service.purge_superseded_mood_entries('user-a', batch_size=2, max_batches=1))
+    assert first['status'] == 'running' and first['deleted'] == 2
+    assert run(service.get_mood_history_gc_status('user-a'))['status'] == 'running'
+
+    final = run(service.purge_superseded_mood_entries('user-a', batch_size=2))
+    assert final['status'] == 'done' and final['deleted'] == 5
+
+
+def test_create_returns_the_stored_document():
+    service = make_service()
+    created = run(service.create_mood_entry('user-a', mood(7)))
+    assert created['id'] and created['user_id'] == 'user-a'
+    assert run(service.get_mood_entries('user-a')) == [created]
+
+    task = run(service.create_therapist_task('user-a', {'title': 'Journal', 'is_completed': False}))
+    assert run(service.get_therapist_tasks('user-a')) == [task]
+
+
+def test_keyset_pages_cover_history_without_overlap():
+    service = make_service()
+    created = [run(service.create_mood_entry('user-a', mood(i % 10 + 1))) for i in range(7)]
+
+    seen, cursor = [], None
+    while True:
+        page, cursor = run(service.get_mood_entries_page('user-a', limit=3, cursor=cursor))
+        seen.extend(entry['id'] for entry in page)
+        if cursor is None:
+            break
+    assert seen == [entry['id'] for entry in reversed(created)]
+
+
+def test_invalid_cursor_is_rejected():
+    service = make_service()
+    with pytest.raises(ValueError):
+        run(service.get_mood_entries_page('user-a', cursor='not-a-cursor'))
+
+
+def test_mutations_check_ownership_with_point_lookups():
+    service = make_service()
+    contact = run(service.create_emergency_contact('user-a', {'name': 'Dana', 'phone': '050', 'relation': None}))
+    task = run(service.create_therapist_task('user-a', {'title': 'Walk', 'is_completed': False}))
+
+    assert run(service.delete_emergency_contact('user-b', contact['id'])) is False
+    assert run(service.update_therapist_task('user-b', task['id'], {'is_completed': True})) is None
+    assert run(service.update_therapist_task('user-a', 'missing', {'is_completed': True})) is None
+
+    updated = run(service.update_therapist_task('user-a', task['id'], {'is_completed': True}))
+    assert updated == {**task, 'is_completed': True, 'updated_at': updated['updated_at']}
+    assert updated['updated_at'] > task['updated_at']
+    assert run(service.delete_emergency_contact('user-a', contact['id'])) is True
+    assert run(service.get_emergency_contacts('user-a')) == []
+
+
+def test_import_streams_rows_in_batches_and_reports_errors(monkeypatch):
+    import io
+    from app.services import mood_import
+
+    service = make_service()
+    monkeypatch.setattr(mood_import, 'storage', service)
+    lines = ['mood_level,energy_level,stress_level,note,created_at']
+    lines += [f'{i % 10 + 1},5,5,,2023-01-01T00:{i // 60 % 60:02d}:{i % 60:02d}Z' for i in range(1200)]
+    lines += ['not-a-number,5,5,,', '3,3,3,"quoted, note",2022-12-31T23:00:00']
+    upload = io.BytesIO('\n'.join(lines).encode())
+
+    report = run(mood_import.import_mood_file('user-a', upload, 'csv'))
+    assert report['imported'] == 1201 and report['failed'] == 1
+    assert report['errors'][0]['row'] == 1202 and 'mood_level' in report['errors'][0]['error']
+
+    entries = run(service.get_mood_entries('user-a', limit=2000))
+    assert len(entries) == 1201
+    assert entries[-1]['note'] == 'quoted, note'
+    assert entries[-1]['created_at'].startswith('2022-12-31T23:00:00')
+
+
+def test_import_rejects_or_stops_at_non_utf8_bytes(monkeypatch):
+    import io
+    from app.services import mood_import
+
+    service = make_service()
+    monkeypatch.setattr(mood_import, 'storage', service)
+    header = 'mood_level,energy_level,stress_level,note\n'
+    with pytest.raises(ValueError, match='UTF-8'):
+        run(mood_import.import_mood_file('user-a', io.BytesIO((header + '5,5,5,יום טוב\n').encode('cp1255')), 'csv'))
+    assert run(service.get_mood_entries('user-a')) == []
+
+    # Past the up-front check the import stops at the bad byte and reports it
+    rows = [f'{i % 10 + 1},5,5,note {i}' for i in range(6000)]
+    upload = io.BytesIO((header + '\n'.join(rows[:5000])).encode() + b'\n5,5,5,\xff\n' + '\n'.join(rows[5000:]).encode())
+    report = run(mood_import.import_mood_file('user-a', upload, 'csv'))
+    assert report['failed'] == 1 and 'not UTF-8' in report['errors'][0]['error']
+    assert 2 < report['errors'][0]['row'] <= 5002
+    assert report['imported'] == report['errors'][0]['row'] - 2
+    assert len(run(service.get_mood_entries('user-a', limit=5000))) == report['imported']
+
+
+def test_daily_rollups_track_writes_deletes_and_rebuild():
+    from datetime import datetime, timezone
+
+    service = make_service()
+    day = datetime(2024, 5, 1, 9, tzinfo=timezone.utc)
+    run(service.create_mood_entries('user-a', [
+        {**mood(2), 'created_at': day},
+        {**mood(8), 'created_at': day.replace(hour=20)},
+        {**mood(5), 'created_at': day.replace(day=2)},
+    ]))
+    rollups = run(service.get_mood_daily_rollups('user-a', '2024-05-01', '2024-05-31'))
+    assert [(r['date'], r['count']) for r in rollups] == [('2024-05-01', 2), ('2024-05-02', 1)]
+    assert rollups[0]['mood_level'] == {'mean': 5.0, 'min': 2, 'max': 8, 'std': 3.0}
+
+    lowest = next(e for e in run(service.get_mood_entries('user-a')) if e['mood_level'] == 2)
+    assert run(service.delete_mood_entry('user-b', lowest['id'])) is False
+    assert run(service.delete_mood_entry('user-a', lowest['id'])) is True
+    rollups = run(service.get_mood_daily_rollups('user-a', '2024-05-01', '2024-05-01'))
+    assert rollups[0]['count'] == 1 and rollups[0]['mood_level']['min'] == 8
+
+    assert run(service.rebuild_mood_rollups('user-a')) == 2
+    assert run(service.get_mood_daily_rollups('user-a', '2024-05-01', '2024-05-31')) == [
+        rollups[0], run(service.get_mood_daily_rollups('user-a', '2024-05-02', '2024-05-02'))[0]
+    ]
+
+    run(service.clear_mood_history('user-a'))
+    assert run(service.get_mood_daily_rollups('user-a', '2024-05-01', '2024-05-31')) == []
+
+
+def test_changes_feed_returns_only_what_changed_since():
+    from datetime import datetime, timedelta, timezone
+
+    service = make_service()
+    contact = run(service.create_emergency_contact('user-a', {'name': 'Dana', 'phone': '050', 'relation': None}))
+    task = run(service.create_therapist_task('user-a', {'title': 'Walk', 'is_completed': False}))
+    old_mood = run(service.create_mood_entry('user-a', mood(3)))
+    run(service.create_mood_entry('user-b', mood(9)))
+
+    snapshot = run(service.get_changes('user-a'))
+    assert snapshot['full'] and snapshot['deleted'] == []
+    assert [e['id'] for e in snapshot['mood_entries']] == [old_mood['id']]
+    assert snapshot['emergency_contacts'] == [contact] and snapshot['therapist_tasks'] == [task]
+    assert snapshot['synced_at'] < datetime.now(timezone.utc)
+
+    since = datetime.now(timezone.utc)
+    assert run(service.get_changes('user-a', since))['therapist_tasks'] == []
+    run(service.update_therapist_task('user-a', task['id'], {'is_completed': True}))
+    run(service.delete_emergency_contact('user-a', contact['id']))
+    new_mood = run(service.create_mood_entry('user-a', mood(6)))
+    run(service.update_user_settings('user-a', {'theme': 'dark'}))
+
+    delta = run(service.get_changes('user-a', since))
+    assert not delta['full'] and delta['reset'] == []
+    assert delta['mood_entries'] == [new_mood]
+    assert [t['is_completed'] for t in delta['therapist_tasks']] == [True]
+    assert delta['emergency_contacts'] == [] and delta['appointments'] == []
+    assert [(d['collection'], d['id']) for d in delta['deleted']] == [('emergency_contacts', contact['id'])]
+    assert delta['user_settings']['theme'] == 'dark' and delta['therapist_info'] is None
+
+    since = datetime.now(timezone.utc)
+    run(service.clear_mood_history('user-a'))
+    assert run(service.get_changes('user-a', since))['reset'] == ['mood_entries']
+    assert 'mood_history_cleared_at' not in run(service.get_user_settings('user-a'))
+
+    stale = run(service.get_changes('user-a', since - timedelta(days=365)))
+    assert stale['full'] and stale['mood_entries'] == []
+
+
+def test_singleton_documents_are_cached_write_through():
+    service = make_service()
+    defaults = run(service.get_user_settings('user-a'))
+    assert defaults == {'id': 'user-a', 'theme': 'system', 'language': 'he'}
+    # Defaults are served, not written
+    assert not run(service.db.collection('user_settings').document('user-a').get()).exists
+
+    rpcs = service.db.rpc_count
+    assert run(service.get_user_settings('user-a')) == defaults
+    updated = run(service.update_user_settings('user-a', {'theme': 'dark', 'reminders': {'hour': 9}}))
+    assert service.db.rpc_count == rpcs + 1
+    assert run(service.get_user_settings('user-a')) == updated
+    assert updated['theme'] == 'dark' and updated['language'] == 'he'
+
+    merged = run(service.update_user_settings('user-a', {'reminders': {'enabled': True}}))
+    service.document_cache.clear()
+    assert run(service.get_user_settings('user-a')) == merged
+    assert merged['reminders'] == {'hour': 9, 'enabled': True}
+
+    assert run(service.get_therapist_info('user-a')) is None
+    info = run(service.update_therapist_info('user-a', {'name': 'Dr. Levi'}))
+    assert run(service.get_therapist_info('user-a')) == info
+    assert service.cache_stats()['documents']['hit_ratio'] > 0.5
+
+    # Callers may mutate what they get back without touching the cache
+    run(service.get_user_settings('user-a'))['theme'] = 'light'
+    assert run(service.get_user_settings('user-a'))['theme'] == 'dark'
+
+
+def test_legacy_string_dates_are_normalized_to_timestamps():
+    from datetime import datetime, timezone
+
+    service = make_service()
+    appointments = service.db.collection('appointments')
+
+    async def scenario():
+        await appointments.document('legacy').set({'user_id': 'user-a', 'title': 'A', 'date': '2024-05-01T10:00:00Z'})
+        await appointments.document('broken').set({'user_id': 'user-a', 'title': 'B', 'date': 'next tuesday'})
+        await appointments.document('other').set({'user_id': 'user-b', 'title': 'C', 'date': '2024-05-02'})
+        current = await service.create_appointment('user-a', {'title': 'D', 'date': '2024-06-01T10:00:00Z'})
+
+        # String dates are invisible to range queries until normalized
+        since_may = datetime(2024, 5, 1, tzinfo=timezone.utc)
+        assert [a['id'] for a in await service.get_appointments('user-a', start=since_may)] == [current['id']]
+
+        assert await service.normalize_appointment_dates('user-a', dry_run=True) == (1, [('broken', 'next tuesday')])
+        assert await service.normalize_appointment_dates('user-a') == (1, [('broken', 'next tuesday')])
+        assert [a['id'] for a in await service.get_appointments('user-a', start=since_may)] == [current['id'], 'legacy']
+        legacy = (await appointments.document('legacy').get()).to_dict()
+        assert legacy['date'] == datetime(2024, 5, 1, 10, tzinfo=timezone.utc) and legacy['updated_at']
+        assert (await appointments.document('other').get()).to_dict()['date'] == '2024-05-02'
+
+        assert await service.normalize_appointment_dates() == (1, [('broken', 'next tuesday')])
+        assert await service.normalize_appointment_dates() == (0, [('broken', 'next tuesday')])
+
+    run(scenario())
@@ -0,0 +1,91 @@
+"""
+בדיקות עבור נקודת הקצה /metrics: היסטוגרמות לפי נתיב ולפי קריאת אחסון
+"""
+import asyncio
+import time
+
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+
+from app.api import deps
+from app.api.endpoints import moods
+from app.core import metrics, timing
+
+
+def sample(text: str, prefix: str) -> float:
+    return sum(float(line.rsplit(' ', 1)[1]) for line in text.splitlines() if line.startswith(prefix))
+
+
+def test_requests_and_storage_calls_are_histogrammed_by_template(client, fake_db):
+    route = ('DELETE', '/api/v1/moods/{entry_id}', '404')
+    before = metrics.http_request_duration.count(*route)
+    calls = metrics.storage_call_duration.count('delete_mood_entry')
+
+    assert client.delete('/api/v1/moods/missing-1').status_code == 404
+    assert client.delete('/api/v1/moods/missing-2').status_code == 404
+    assert metrics.http_request_duration.count(*route) == before + 2
+    assert metrics.storage_call_duration.count('delete_mood_entry') == calls + 2
+
+    client.get('/no/such/path')
+    body = client.get('/metrics')
+    assert body.headers['content-type'].startswith('text/plain; version=0.0.4')
+    text = body.text
+    assert '# TYPE http_request_duration_seconds histogram' in text
+    assert sample(text, 'http_request_duration_seconds_count{method="DELETE",route="/api/v1/moods/{entry_id}",status="404"}') == before + 2
+    assert 'route="<unmatched>"' in text and 'missing-1' not in text
+    assert 'storage_call_duration_seconds_bucket{method="delete_mood_entry",le="+Inf"}' in text
+    assert 'cache_hit_ratio{cache="documents"}' in text and 'cache_entries{cache="auth_tokens"}' in text
+
+
+def test_background_purge_is_not_part_of_the_request(client, fake_db, monkeypatch):
+    purge = moods.storage.purge_superseded_mood_entries
+
+    @timing.timed(timing.DB, 'purge_superseded_mood_entries')
+    async def slow_purge(*args, **kwargs):
+        await asyncio.sleep(0.3)
+        return await purge(*args, **kwargs)
+
+    monkeypatch.setattr(moods.storage, 'purge_superseded_mood_entries', slow_purge)
+    route = ('DELETE', '/api/v1/moods/', '200')
+    before = metrics.http_request_duration._series.get(route, [[], 0.0])[1]
+    purges = metrics.storage_call_duration.count('purge_superseded_mood_entries')
+    clears = metrics.storage_call_duration.count('clear_mood_history')
+
+    assert client.delete('/api/v1/moods/').status_code == 200
+    assert metrics.http_request_duration._series[route][1] - before < 0.3
+    assert metrics.storage_call_duration.count('clear_mood_history') == clears + 1
+    assert metrics.storage_call_duration.count('purge_superseded_mood_entries') == purges
+
+
+def test_auth_outcomes_are_counted(monkeypatch):
+    def verify_id_token(token):
+        if token != 'id-token':
+            raise ValueError('not an ID token')
+        return {'uid': 'user-a', 'exp': time.time() + 60}
+
+    monkeypatch.setattr(deps.firebase_auth, 'verify_id_token', verify_id_token)
+    before = {outcome: metrics.auth_verifications.value(outcome) for outcome in ('id_token', 'cached', 'rejected')}
+
+    for token in ('id-token', 'id-token', 'not-a-jwt'):
+        try:
+            asyncio.run(deps.get_current_user(HTTPAuthorizationCredentials(scheme='Bearer', credentials=token)))
+        except HTTPException:
+            pass
+    deps.invalidate_token('id-token')
+
+    assert {outcome: metrics.auth_verifications.value(outcome) - count for outcome, count in before.items()} == {
+        'id_token': 1, 'cached': 1, 'rejected': 1
+    }
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = metrics.Histogram('t_seconds', 'test', ('op',), buckets=(0.1, 1))
+    for value in (0.05, 0.5, 5):
+        histogram.observe(value, 'x')
+    assert list(histogram.samples()) == [
+        't_seconds_bucket{op="x",le="0.1"} 1',
+        't_seconds_bucket{op="x",le="1"} 2',
+        't_seconds_bucket{op="x",le="+Inf"} 3',
+        't_seconds_sum{op="x"} 5.55',
+        't_seconds_count{op="x"} 3',
+    ]
@@ -0,0 +1,69 @@
+"""
+בדיקות עבור סטטיסטיקות מצב רוח (mood_stats)
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+from app.services.mood_stats import compute_mood_stats, load_columns, local_days
+
+
+def columns(rows):
+    async def stream():
+        for row in rows:
+            yield row
+    return asyncio.run(load_columns(stream()))
+
+
+def test_buckets_follow_the_users_timezone():
+    # 22:30 UTC on March 30 is already March 31 in Jerusalem (UTC+3)
+    timestamps, values = columns([
+        (datetime(2024, 3, 30, 22, 30, tzinfo=timezone.utc), 2, 4, 6),
+        (datetime(2024, 3, 31, 8, 0, tzinfo=timezone.utc), 4, 6, 8),
+    ])
+    utc = compute_mood_stats(timestamps, values, ZoneInfo('UTC'))
+    local = compute_mood_stats(timestamps, values, ZoneInfo('Asia/Jerusalem'))
+
+    assert [b['period'] for b in utc['daily']] == ['2024-03-30', '2024-03-31']
+    assert [b['period'] for b in local['daily']] == ['2024-03-31']
+    assert local['daily'][0]['mood_level'] == {'mean': 3.0, 'min': 2.0, 'max': 4.0}
+    assert local['weekly'][0]['period'] == '2024-03-25'
+    assert local['monthly'][0]['period'] == '2024-03'
+
+
+def test_rolling_average_spans_calendar_days():
+    start = datetime(2024, 1, 1, 12, tzinfo=timezone.utc)
+    timestamps, values = columns([
+        (start, 2, 2, 2),
+        (start + timedelta(days=1), 4, 4, 4),
+        (start + timedelta(days=5), 10, 10, 10),
+    ])
+    result = compute_mood_stats(timestamps, values, ZoneInfo('UTC'), window=2)
+    rolling = {r['date']: r['mood_level'] for r in result['rolling']}
+    assert rolling == {'2024-01-01': 2.0, '2024-01-02': 3.0, '2024-01-03': 4.0, '2024-01-06': 10.0}
+
+
+def test_local_days_handles_dst_transitions():
+    zone = ZoneInfo('America/New_York')
+    # 2024-03-10 06:59 UTC is 01:59 EST, 07:01 UTC is 03:01 EDT
+    timestamps = np.array([
+        int(datetime(2024, 3, 10, 6, 59, tzinfo=timezone.utc).timestamp()),
+        int(datetime(2024, 3, 11, 3, 59, tzinfo=timezone.utc).timestamp()),
+    ])
+    days = local_days(timestamps, zone).astype('datetime64[D]').astype(str).tolist()
+    assert days == ['2024-03-10', '2024-03-10']
+
+
+def test_local_days_match_per_entry_conversion_across_a_year():
+    zone = ZoneInfo('Asia/Jerusalem')
+    start = int(datetime(2024, 1, 1, tzinfo=timezone.utc).timestamp())
+    timestamps = np.sort(np.random.default_rng(7).integers(start, start + 366 * 86400, 5000))
+    expected = [datetime.fromtimestamp(int(t), zone).date().isoformat() for t in timestamps]
+    assert local_days(timestamps, zone).astype('datetime64[D]').astype(str).tolist() == expected
+
+
+def test_empty_history():
+    timestamps, values = columns([])
+    assert compute_mood_stats(timestamps, values, ZoneInfo('UTC'))['daily'] == []
@@ -0,0 +1,79 @@
+"""
+בדיקות עבור ספק הסודות: מטמון מקומי, בדיקת גרסה ונפילה למשתני סביבה
+"""
+import asyncio
+import os
+import time
+from types import SimpleNamespace
+
+from app.core import secrets
+from app.core.config import settings
+
+SECRET = 'projects/p/secrets/firebase-service-account'
+
+
+class FakeSecretManager:
+    def __init__(self, version: int = 1, fail: bool = False):
+        self.version = version
+        self.fail = fail
+        self.calls = []
+
+    async def access_secret_version(self, request):
+        self.calls.append('access')
+        if self.fail:
+            raise ConnectionError('unreachable')
+        return SimpleNamespace(
+            name=f'{SECRET}/versions/{self.version}',
+            payload=SimpleNamespace(data=f'payload-{self.version}'.encode()),
+        )
+
+    async def get_secret_version(self, request):
+        self.calls.append('get')
+        return SimpleNamespace(name=f'{SECRET}/versions/{self.version}')
+
+
+def provider(tmp_path, client, ttl=300.0):
+    return secrets.SecretProvider(SECRET, str(tmp_path), ttl=ttl, timeout=1.0, client_factory=lambda: client)
+
+
+def test_secret_is_fetched_once_and_then_served_from_the_cache(tmp_path):
+    client = FakeSecretManager()
+    assert asyncio.run(provider(tmp_path, client).get()) == 'payload-1'
+    # A second worker / restart on the same instance
+    assert asyncio.run(provider(tmp_path, client).get()) == 'payload-1'
+    assert client.calls == ['access']
+    [cached] = os.listdir(tmp_path)
+    assert os.stat(tmp_path / cached).st_mode & 0o077 == 0
+
+
+def test_stale_cache_is_served_and_rechecked_by_version(tmp_path):
+    client = FakeSecretManager()
+    asyncio.run(provider(tmp_path, client).get())
+    [cached] = os.listdir(tmp_path)
+    old = time.time() - 3600
+    os.utime(tmp_path / cached, (old, old))
+
+    async def boot(stale: secrets.SecretProvider) -> str:
+        value = await stale.get()
+        await stale._refresh_task
+        return value
+
+    # Same version: only the metadata is read, and the copy counts as fresh again
+    assert asyncio.run(boot(provider(tmp_path, client, ttl=60))) == 'payload-1'
+    assert client.calls == ['access', 'get'] and os.path.getmtime(tmp_path / cached) > old
+
+    # New version: served stale this boot, fetched for the next one
+    client.version = 2
+    os.utime(tmp_path / cached, (old, old))
+    assert asyncio.run(boot(provider(tmp_path, client, ttl=60))) == 'payload-1'
+    assert asyncio.run(provider(tmp_path, client).get()) == 'payload-2'
+
+
+def test_unreachable_secret_manager_falls_back_to_the_environment(tmp_path, monkeypatch):
+    client = FakeSecretManager(fail=True)
+    monkeypatch.setattr(secrets, '_firebase_secret', provider(tmp_path, client))
+    monkeypatch.setattr(settings, 'FIREBASE_SERVICE_ACCOUNT_JSON', '{"from": "env"}')
+
+    assert asyncio.run(secrets.load_cloud_secrets()) is False
+    assert settings.FIREBASE_SERVICE_ACCOUNT_JSON == '{"from": "env"}'
+    assert os.listdir(tmp_path) == []
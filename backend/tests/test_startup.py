@@ -0,0 +1,66 @@
+"""
+בדיקות עבור זמן עלייה: ייבוא ללא אתחול, ואתחול מלא ב-lifespan
+"""
+import json
+import logging
+import os
+import subprocess
+import sys
+
+from fastapi.testclient import TestClient
+
+from app.core import startup
+from app.main import app
+from app.services.firestore_service import FirestoreService
+from benchmarks.fake_firestore import FakeAsyncClient
+
+# Generous for a slow CI machine; importing app.main takes about 1s here
+IMPORT_TIME_BUDGET_SECONDS = 3.0
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import sys, time
+started = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - started
+import firebase_admin
+from app.core import firebase
+print(elapsed)
+print(bool(firebase_admin._apps), firebase._db is not None)
+print(sorted(m for m in ('sqlalchemy', 'google.cloud.secretmanager') if m in sys.modules))
+"""
+
+
+def test_importing_the_app_initializes_nothing_and_stays_within_budget():
+    # On Cloud Run the old import fetched the secret; no credentials at all here
+    env = {key: value for key, value in os.environ.items() if not key.startswith('FIREBASE_')}
+    env.update({'K_SERVICE': 'import-probe', 'GOOGLE_CLOUD_PROJECT': 'import-probe', 'STORAGE_BACKEND': 'firestore'})
+    result = subprocess.run(
+        [sys.executable, '-c', PROBE], cwd=BACKEND_DIR, env=env, capture_output=True, text=True, timeout=60
+    )
+    assert result.returncode == 0, result.stderr
+    elapsed, initialized, modules = result.stdout.strip().splitlines()[-3:]
+    assert initialized == 'False False'
+    assert modules == '[]'
+    assert float(elapsed) < IMPORT_TIME_BUDGET_SECONDS
+
+
+def test_lifespan_initializes_everything_and_reports_phases(monkeypatch, caplog):
+    storage_module = sys.modules['app.services.storage']
+
+    calls = []
+    service = FirestoreService(client=FakeAsyncClient())
+    monkeypatch.setattr(storage_module, 'storage', service)
+    monkeypatch.setattr(startup.firebase, 'get_app', lambda: calls.append('firebase'))
+
+    with caplog.at_level(logging.INFO, logger='app.startup'):
+        with TestClient(app) as client:
+            assert client.get('/health').status_code == 200
+            report = app.state.startup
+
+    assert calls == ['firebase']
+    assert set(report['phases']) == {'secrets', 'firebase', 'storage'}
+    assert report['import_ms'] > 0
+    [line] = [json.loads(r.getMessage()) for r in caplog.records if r.name == 'app.startup']
+    assert line == report
@@ -0,0 +1,199 @@
+"""
+בדיקות משותפות לכל מימושי האחסון (Firestore ו-SQL)
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.services.sql_service import SQLService
+from app.database import create_engine
+from tests.conftest import make_service, mood
+
+
+@pytest.fixture(params=['firestore', 'firestore-user-layout', 'sql'])
+def backend(request):
+    if request.param == 'firestore':
+        return make_service
+    if request.param == 'firestore-user-layout':
+        # Per-user subcollections, still dual-writing the global collections
+        return lambda: make_service(layout='user', dual_write=True)
+    return lambda: SQLService(engine=create_engine('sqlite+aiosqlite:///:memory:'))
+
+
+def scenario(make_service):
+    """Run an async test body against a fresh service in a single event loop"""
+    def decorator(body):
+        return asyncio.run(body(make_service()))
+    return decorator
+
+
+def test_mood_entries_round_trip_and_paginate(backend):
+    @scenario(backend)
+    async def _(service):
+        created = [await service.create_mood_entry('user-a', mood(i + 1)) for i in range(5)]
+        await service.create_mood_entry('user-b', mood(9))
+
+        assert await service.get_mood_entries('user-a', limit=2) == created[::-1][:2]
+        seen, cursor = [], None
+        while True:
+            page, cursor = await service.get_mood_entries_page('user-a', limit=2, cursor=cursor)
+            seen.extend(page)
+            if cursor is None:
+                break
+        assert seen == created[::-1]
+        with pytest.raises(ValueError):
+            await service.get_mood_entries_page('user-a', cursor='bogus')
+
+        assert await service.delete_mood_entry('user-b', created[0]['id']) is False
+        assert await service.delete_mood_entry('user-a', created[0]['id']) is True
+        assert len(await service.get_mood_entries('user-a')) == 4
+
+
+def test_bulk_import_aggregates_and_metrics(backend):
+    @scenario(backend)
+    async def _(service):
+        day = datetime(2024, 5, 1, 9, tzinfo=timezone.utc)
+        assert await service.create_mood_entries('user-a', [
+            mood(2, created_at=day),
+            mood(8, created_at=day.replace(hour=20)),
+            mood(5, created_at=day.replace(day=2)),
+        ]) == 3
+        rollups = await service.get_mood_daily_rollups('user-a', '2024-05-01', '2024-05-31')
+        assert [(r['date'], r['count']) for r in rollups] == [('2024-05-01', 2), ('2024-05-02', 1)]
+        assert rollups[0]['mood_level'] == {'mean': 5.0, 'min': 2, 'max': 8, 'std': 3.0}
+        assert await service.rebuild_mood_rollups('user-a') == 2
+
+        rows = [row async for row in service.stream_mood_metrics('user-a', day, day + timedelta(days=1))]
+        assert sorted(row[1] for row in rows) == [2, 8]
+        assert all(row[0].tzinfo is not None for row in rows)
+
+
+def test_clear_history_and_purge(backend):
+    @scenario(backend)
+    async def _(service):
+        await service.create_mood_entry('user-a', mood(1))
+        await service.create_mood_entry('user-b', mood(2))
+        assert await service.clear_mood_history('user-a') == 1
+        assert await service.get_mood_generation('user-a') == 1
+        assert await service.get_mood_entries('user-a') == []
+        assert (await service.get_mood_history_gc_status('user-a'))['status'] == 'pending'
+
+        kept = await service.create_mood_entry('user-a', mood(3))
+        progress = await service.purge_superseded_mood_entries('user-a')
+        assert progress['status'] == 'done' and progress['deleted'] == 1
+        assert await service.get_mood_entries('user-a') == [kept]
+        assert len(await service.get_mood_entries('user-b')) == 1
+
+
+def test_settings_and_therapist_info(backend):
+    @scenario(backend)
+    async def _(service):
+        assert await service.get_user_settings('user-a') == {'id': 'user-a', 'theme': 'system', 'language': 'he'}
+        updated = await service.update_user_settings('user-a', {'theme': 'dark', 'reminders': {'hour': 9}})
+        await service.update_user_settings('user-a', {'reminders': {'enabled': True}})
+        current = await service.get_user_settings('user-a')
+        assert current['theme'] == 'dark' and current['language'] == 'he'
+        assert current['reminders'] == {'hour': 9, 'enabled': True}
+        assert updated['updated_at']
+
+        assert await service.get_therapist_info('user-a') is None
+        info = await service.update_therapist_info('user-a', {'name': 'Dr. Levi', 'phone': '03'})
+        await service.update_therapist_info('user-a', {'phone': '04'})
+        stored = await service.get_therapist_info('user-a')
+        assert (stored['name'], stored['phone']) == ('Dr. Levi', '04') and info['updated_at']
+
+        documents = await service.get_user_documents('user-a')
+        assert documents['user_settings'] == current and documents['therapist_info'] == stored
+        assert (await service.get_user_documents('user-b'))['therapist_info'] is None
+
+
+def test_contacts_tasks_and_appointments(backend):
+    @scenario(backend)
+    async def _(service):
+        contact = await service.create_emergency_contact('user-a', {'name': 'Dana', 'phone': '050', 'relation': None})
+        assert await service.get_emergency_contacts('user-a') == [contact]
+        assert await service.delete_emergency_contact('user-b', contact['id']) is False
+        assert await service.delete_emergency_contact('user-a', contact['id']) is True
+        assert await service.get_emergency_contacts('user-a') == []
+
+        task = await service.create_therapist_task('user-a', {'title': 'Walk'})
+        assert task['is_completed'] is False
+        assert await service.update_therapist_task('user-b', task['id'], {'is_completed': True}) is None
+        updated = await service.update_therapist_task('user-a', task['id'], {'is_completed': True})
+        assert updated['is_completed'] is True and updated['updated_at'] > task['updated_at']
+        assert await service.get_therapist_tasks('user-a') == [updated]
+
+        early = await service.create_appointment('user-a', {'title': 'A', 'date': '2024-05-01T10:00:00Z', 'notes': None})
+        late = await service.create_appointment('user-a', {'title': 'B', 'date': datetime(2024, 6, 1, tzinfo=timezone.utc), 'notes': None})
+        assert [a['id'] for a in await service.get_appointments('user-a')] == [late['id'], early['id']]
+        assert early['date'] == '2024-05-01T10:00:00+00:00'
+
+
+
+def test_appointment_date_ranges(backend):
+    @scenario(backend)
+    async def _(service):
+        days = [
+            await service.create_appointment('user-a', {'title': str(day), 'date': datetime(2024, 5, day, 9, tzinfo=timezone.utc)})
+            for day in (1, 2, 3, 4)
+        ]
+        await service.create_appointment('user-b', {'title': 'other', 'date': datetime(2024, 5, 2, tzinfo=timezone.utc)})
+        ids = lambda rows: [row['id'] for row in rows]
+
+        in_range = await service.get_appointments('user-a', start=datetime(2024, 5, 2, tzinfo=timezone.utc),
+                                                  end=datetime(2024, 5, 4, 9, tzinfo=timezone.utc))
+        assert ids(in_range) == [days[2]['id'], days[1]['id']]
+        upcoming = await service.get_appointments('user-a', start=datetime(2024, 5, 1, 10, tzinfo=timezone.utc),
+                                                  limit=2, ascending=True)
+        assert ids(upcoming) == [days[1]['id'], days[2]['id']]
+        with pytest.raises(ValueError):
+            await service.create_appointment('user-a', {'title': 'bad', 'date': 'next tuesday'})
+        naive = await service.create_appointment('user-a', {'title': 'naive', 'date': '2024-05-05T09:00:00'})
+        assert naive['date'] == '2024-05-05T09:00:00+00:00'
+
+
+
+def test_task_pages_filters_and_counts(backend):
+    @scenario(backend)
+    async def _(service):
+        tasks = [await service.create_therapist_task('user-a', {'title': str(i)}) for i in range(5)]
+        await service.create_therapist_task('user-b', {'title': 'other'})
+        for task in tasks[:2]:
+            await service.update_therapist_task('user-a', task['id'], {'is_completed': True})
+        assert await service.count_therapist_tasks('user-a') == {'open': 3, 'completed': 2}
+        assert await service.count_therapist_tasks('nobody') == {'open': 0, 'completed': 0}
+
+        seen, cursor = [], None
+        while True:
+            page, cursor = await service.get_therapist_tasks_page('user-a', limit=2, cursor=cursor, is_completed=False)
+            seen += [task['title'] for task in page]
+            if cursor is None:
+                break
+        assert seen == ['4', '3', '2']
+        done, cursor = await service.get_therapist_tasks_page('user-a', limit=2, is_completed=True)
+        assert [task['title'] for task in done] == ['1', '0'] and cursor is None
+        with pytest.raises(ValueError):
+            await service.get_therapist_tasks_page('user-a', cursor='not-a-cursor')
+
+
+def test_changes_feed(backend):
+    @scenario(backend)
+    async def _(service):
+        contact = await service.create_emergency_contact('user-a', {'name': 'Dana', 'phone': '050', 'relation': None})
+        task = await service.create_therapist_task('user-a', {'title': 'Walk'})
+        snapshot = await service.get_changes('user-a')
+        assert snapshot['full'] and snapshot['user_settings']['theme'] == 'system'
+        assert snapshot['emergency_contacts'] == [contact] and snapshot['therapist_tasks'] == [task]
+
+        since = datetime.now(timezone.utc)
+        await service.delete_emergency_contact('user-a', contact['id'])
+        entry = await service.create_mood_entry('user-a', mood(4))
+        delta = await service.get_changes('user-a', since)
+        assert not delta['full'] and delta['therapist_tasks'] == [] and delta['mood_entries'] == [entry]
+        assert [(d['collection'], d['id']) for d in delta['deleted']] == [('emergency_contacts', contact['id'])]
+        assert delta['user_settings'] is None and delta['therapist_info'] is None
+
+        since = datetime.now(timezone.utc)
+        await service.clear_mood_history('user-a')
+        assert (await service.get_changes('user-a', since))['reset'] == ['mood_entries']
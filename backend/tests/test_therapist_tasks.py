@@ -0,0 +1,32 @@
+"""
+בדיקות עבור סינון, דפדוף וספירה של משימות המטפל
+"""
+from app.core.pagination import NEXT_CURSOR_HEADER
+
+
+def test_open_tasks_are_paged_with_a_cursor(client, fake_db):
+    tasks = [client.post('/api/v1/users/me/therapist/tasks', json={'title': str(i)}).json() for i in range(3)]
+    client.put(f"/api/v1/users/me/therapist/tasks/{tasks[0]['id']}", json={'title': '0', 'is_completed': True})
+
+    first = client.get('/api/v1/users/me/therapist/tasks', params={'is_completed': 'false', 'limit': 1})
+    assert [t['title'] for t in first.json()] == ['2']
+    second = client.get('/api/v1/users/me/therapist/tasks', params={
+        'is_completed': 'false', 'limit': 1, 'cursor': first.headers[NEXT_CURSOR_HEADER]
+    })
+    assert [t['title'] for t in second.json()] == ['1'] and NEXT_CURSOR_HEADER not in second.headers
+
+    assert len(client.get('/api/v1/users/me/therapist/tasks').json()) == 3
+    assert client.get('/api/v1/users/me/therapist/tasks', params={'cursor': 'bogus'}).status_code == 400
+
+
+def test_counts_follow_writes_and_honour_etags(client, fake_db):
+    task = client.post('/api/v1/users/me/therapist/tasks', json={'title': 'Walk'}).json()
+    assert client.get('/api/v1/users/me/therapist/tasks/counts').json() == {'open': 1, 'completed': 0, 'total': 1}
+
+    client.put(f"/api/v1/users/me/therapist/tasks/{task['id']}", json={'title': 'Walk', 'is_completed': True})
+    counts = client.get('/api/v1/users/me/therapist/tasks/counts')
+    assert counts.json() == {'open': 0, 'completed': 1, 'total': 1}
+
+    reads = fake_db.rpc_count
+    again = client.get('/api/v1/users/me/therapist/tasks/counts', headers={'If-None-Match': counts.headers['etag']})
+    assert again.status_code == 304 and fake_db.rpc_count == reads
@@ -0,0 +1,100 @@
+"""
+בדיקות עבור מדידת זמני בקשה: כותרת Server-Timing ושורת לוג לכל בקשה
+"""
+import asyncio
+import json
+import logging
+
+from fastapi.security import HTTPAuthorizationCredentials
+from starlette.applications import Starlette
+from starlette.background import BackgroundTask
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from fastapi.testclient import TestClient
+
+from app.api import deps
+from app.core import timing
+from app.services.firestore_service import FirestoreService
+from benchmarks.fake_firestore import FakeAsyncClient
+
+
+def record(coro_factory):
+    """Run a coroutine inside a request context and return its spans"""
+    async def main():
+        timings = timing.RequestTimings()
+        token = timing._current.set(timings)
+        try:
+            await coro_factory()
+        finally:
+            timing._current.reset(token)
+        return timings
+    return asyncio.run(main())
+
+
+def test_endpoint_response_carries_server_timing(client, fake_db):
+    client.post('/api/v1/users/me/contacts', json={'name': 'Dana', 'phone': '050'})
+    header = client.get('/api/v1/users/me/contacts').headers['server-timing']
+
+    metrics = {part.split(';')[0]: part for part in header.split(', ')}
+    assert set(metrics) == {'auth', 'db', 'app', 'render', 'total'}
+    assert 'Storage (1 calls)' in metrics['db']
+
+
+def test_storage_calls_and_auth_are_recorded_once_each():
+    service = FirestoreService(client=FakeAsyncClient())
+
+    async def calls():
+        await service.create_mood_entry('user-a', {'mood_level': 5, 'energy_level': 5, 'stress_level': 5})
+        await service.get_user_documents('user-a')
+        rows = [row async for row in service.stream_mood_metrics('user-a')]
+        assert len(rows) == 1
+
+    timings = record(calls)
+    assert [name for phase, name, _ in timings.spans] == [
+        'create_mood_entry', 'get_user_documents', 'stream_mood_metrics'
+    ]
+    assert all(phase == timing.DB for phase, _, _ in timings.spans)
+
+    deps.token_cache.set(deps._token_key('token'), {'id': 'user-a'}, ttl=60)
+    credentials = HTTPAuthorizationCredentials(scheme='Bearer', credentials='token')
+    timings = record(lambda: deps.get_current_user(credentials))
+    assert [(phase, name) for phase, name, _ in timings.spans] == [(timing.AUTH, 'get_current_user')]
+    deps.invalidate_token('token')
+
+
+def test_slow_requests_log_every_span(caplog):
+    async def slow(request):
+        with timing.span(timing.DB, 'lookup'):
+            await asyncio.sleep(0.01)
+        return PlainTextResponse('ok')
+
+    app = timing.ServerTimingMiddleware(Starlette(routes=[Route('/slow', slow)]), slow_request_ms=5)
+    with caplog.at_level(logging.INFO, logger='app.timing'):
+        response = TestClient(app).get('/slow')
+
+    assert response.headers['server-timing'].startswith('auth;dur=0.0')
+    [entry] = [r for r in caplog.records if r.name == 'app.timing']
+    line = json.loads(entry.getMessage())
+    assert entry.levelno == logging.WARNING and line['event'] == 'slow_request'
+    assert line['path'] == '/slow' and line['status'] == 200 and line['db_calls'] == 1
+    assert line['spans'][0]['name'] == 'lookup' and line['spans'][0]['ms'] >= 10
+
+
+def test_background_tasks_are_not_timed_as_part_of_the_request(caplog):
+    async def purge():
+        with timing.span(timing.DB, 'purge'):
+            await asyncio.sleep(0.3)
+
+    async def clean(request):
+        with timing.span(timing.DB, 'clear'):
+            pass
+        return PlainTextResponse('ok', background=BackgroundTask(purge))
+
+    app = timing.ServerTimingMiddleware(Starlette(routes=[Route('/clean', clean)]), slow_request_ms=0)
+    with caplog.at_level(logging.INFO, logger='app.timing'):
+        TestClient(app).get('/clean')
+
+    [entry] = [r for r in caplog.records if r.name == 'app.timing']
+    line = json.loads(entry.getMessage())
+    assert line['status'] == 200 and line['total_ms'] < 300
+    assert [span['name'] for span in line['spans']] == ['clear']